@@ -0,0 +1,102 @@
+"""
+Time decode.decode_page against json.loads on synthetic /schools pages, alone
+and followed by process_data and transform_fact_programs.
+
+Usage:
+    python benchmarks/bench_decode.py [n_pages] [per_page] [max_programs]
+
+Whole-record pages carry every field of the synthetic records; projected
+pages are what the API returns for transform.projection_fields(), flat
+dotted keys. Decoding includes what fetch_page does to get nested records:
+untyped projected records go through extract.unflatten_record. The
+transform column adds process_data and transform_fact_programs. Timings
+are the best of five runs over every page. The peak column is the
+tracemalloc peak of decoding one page, and the retained column is what the
+decoded records still hold. Defaults to 20 pages of 100 schools with up to
+30 programs each.
+"""
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+import decode
+import extract
+import transform
+from synthetic import generate_schools, project
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def memory(func):
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 2 ** 20, current / 2 ** 20
+
+
+def decoders(fields):
+    # Each decoder returns the page's records as the transforms receive them from fetch_page
+    def nest(results):
+        return [record if decode.is_typed(record) else extract.unflatten_record(record, fields)
+                for record in results] if fields else results
+    candidates = {
+        'json.loads': lambda body: nest(json.loads(body)['results']),
+        f'decode_page ({decode.DECODER})': lambda body: nest(decode.decode_page(body, fields=fields)['results'])
+    }
+    if orjson is not None and decode.DECODER != 'orjson':
+        candidates['orjson.loads'] = lambda body: nest(orjson.loads(body)['results'])
+    return candidates
+
+
+def main(n_pages=20, per_page=100, max_programs=30):
+    logging.getLogger().setLevel(logging.WARNING)
+    records = generate_schools(n_pages * per_page, max_programs=max_programs)
+    fields = transform.projection_fields()
+    layouts = {
+        'whole': [records[start:start + per_page] for start in range(0, len(records), per_page)],
+        'projected': [[project(record, fields) for record in records[start:start + per_page]]
+                      for start in range(0, len(records), per_page)]
+    }
+
+    print(f"{n_pages} pages of {per_page} schools, up to {max_programs} programs each")
+    print(f"{'pages':<10} {'decoder':<22} {'decode (ms/page)':>17} {'+ transform (ms/page)':>22} "
+          f"{'peak (MB)':>10} {'retained (MB)':>14}")
+    for layout, pages in layouts.items():
+        bodies = [json.dumps({'metadata': {'total': len(records)}, 'results': page}).encode('utf-8')
+                  for page in pages]
+        for name, decoder in decoders(fields if layout == 'projected' else ()).items():
+            decoded = best_of(lambda: [decoder(body) for body in bodies])
+
+            def pipeline():
+                pages = [decoder(body) for body in bodies]
+                transform.process_data(record for page in pages for record in page)
+                transform.transform_fact_programs(record for page in pages for record in page)
+            total = best_of(pipeline)
+            peak, retained = memory(lambda: decoder(bodies[0]))
+            print(f"{layout:<10} {name:<22} {1000 * decoded / len(bodies):>17.2f} "
+                  f"{1000 * total / len(bodies):>22.2f} {peak:>10.2f} {retained:>14.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
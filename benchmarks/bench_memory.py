@@ -0,0 +1,53 @@
+"""
+Report the memory of each transform stage's frame with and without the
+compact dtype plan (transform.PROCESS_DATA_DTYPES).
+
+Usage:
+    python benchmarks/bench_memory.py [n_records ...]
+
+Sizes are DataFrame.memory_usage(deep=True). The star-schema tables share
+their columns with the cleaned frame, so their total overlaps with it.
+Defaults to 6,400 (today's API size) and 100,000 records.
+"""
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+import transform
+from synthetic import generate_schools
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def stage_sizes(data, compact):
+    processed = transform.process_data(data, compact=compact)
+    ranked = transform.process_and_rank_colleges(processed)
+    cleaned = transform.clean_college_data(ranked)
+    tables = transform.transform_schools_data(cleaned)
+    sizes = {
+        'process_data': frame_mb(processed),
+        'rank_colleges_advanced': frame_mb(ranked),
+        'clean_college_data': frame_mb(cleaned)
+    }
+    sizes.update({table: frame_mb(df) for table, df in tables.items()})
+    return sizes
+
+
+def main(sizes):
+    logging.getLogger().setLevel(logging.WARNING)
+    for n in sizes:
+        data = generate_schools(n, max_programs=3)
+        before = stage_sizes(data, compact=False)
+        after = stage_sizes(data, compact=True)
+        print(f"\n{n} schools")
+        print(f"{'stage':<24} {'before (MB)':>12} {'after (MB)':>11} {'saved':>7}")
+        for stage in before:
+            print(f"{stage:<24} {before[stage]:>12.2f} {after[stage]:>11.2f} {1 - after[stage] / before[stage]:>7.0%}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [6400, 100000])
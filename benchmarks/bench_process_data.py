@@ -0,0 +1,96 @@
+"""
+Benchmark transform.process_data against the original row-by-row flattening.
+
+Usage:
+    python benchmarks/bench_process_data.py [n_records ...]
+
+Defaults to 6,400 (today's API size) and 100,000 records.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+import pandas as pd
+import transform
+from synthetic import generate_schools
+
+
+def process_data_rowwise(data):
+    """The original process_data: one dict per school, then pd.DataFrame(rows)"""
+    processed_data = []
+    for result in data:
+        try:
+            school = result['latest']['school']
+            student = result['latest']['student']
+            admission = result['latest']['admissions']
+            cost = result['latest']['cost']
+            aid = result['latest']['aid']
+            completion = result['latest']['completion']
+            row = {
+                'Id': result.get('id'),
+                'School_Name': school['name'],
+                'Address': school['address'],
+                'State': school['state'],
+                'City': school['city'],
+                'Highest_Degree': school['degrees_awarded']['highest'],
+                'Predominant_Degree': school['degrees_awarded']['predominant'],
+                'Predominant_Recoded': school['degrees_awarded']['predominant_recoded'],
+                'Accreditor_Code': school['accreditor_code'],
+                'Institution_Level': school['institutional_characteristics']['level'],
+                'Religious_affiliation': school['religious_affiliation'],
+                'Student_Size': student['size'],
+                'Demographics_men': student['demographics']['men'],
+                'Demographics_women': student['demographics']['women'],
+                'Admission_Rate_Overall': admission['admission_rate'].get('overall'),
+                'Admission_Rate_by_OPE_ID': admission['admission_rate'].get('by_ope_id'),
+                'Consumer_Admission_Rate': admission['admission_rate'].get('consumer_rate'),
+                'In_State_Tuition': cost['tuition'].get('in_state'),
+                'Out_of_State_Tuition': cost['tuition'].get('out_of_state'),
+                'Loan_Principal': aid.get('loan_principal'),
+                'Pell_Grant_Rate': aid.get('pell_grant_rate'),
+                'Federal_Loan_Rate': aid.get('federal_loan_rate'),
+                'Completion_Rate': completion.get('consumer_rate')
+            }
+            for percentile, subjects in admission.get('act_scores', {}).items():
+                for subject, score in subjects.items():
+                    row[f'ACT_{percentile}_{subject}'] = score
+            for score_type, scores in admission.get('sat_scores', {}).items():
+                for subject, score in scores.items():
+                    row[f'SAT_{score_type}_{subject}'] = score
+            for category, rates in completion.get('transfer_rate', {}).items():
+                for rate_type, rate in rates.items():
+                    row[f'Transfer_Rate_{category}_{rate_type}'] = rate
+            if 'latest' in result and 'programs' in result['latest']:
+                for item in result['latest']['programs'].get('cip_4_digit') or []:
+                    row['type_of_school'] = (item.get('school') or {}).get('type')
+            processed_data.append(row)
+        except KeyError as e:
+            logging.error(f"Missing key in data: {e}")
+    return pd.DataFrame(processed_data)
+
+
+def best_of(func, data, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(sizes):
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'records':>10} {'rowwise (s)':>12} {'columnar (s)':>13} {'speedup':>8}  same columns")
+    for n in sizes:
+        data = generate_schools(n, max_programs=3)
+        legacy_time, legacy = best_of(process_data_rowwise, data)
+        columnar_time, columnar = best_of(transform.process_data, data)
+        same = list(legacy.columns) == list(columnar.columns)
+        print(f"{n:>10} {legacy_time:>12.3f} {columnar_time:>13.3f} {legacy_time / columnar_time:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [6400, 100000])
@@ -0,0 +1,116 @@
+"""
+Time typical dashboard queries against pandas-inferred tables and against
+the init.sql schema with the managed indexes.
+
+The "inferred" load is the original one: to_sql(if_exists='replace') with
+pandas-chosen types, no keys and no indexes. The "declared" load is
+load.load_tables, which creates the tables from init.sql and builds
+schema.MANAGED_INDEXES.
+
+Usage:
+    python benchmarks/bench_queries.py [n_records]
+
+Runs against a temporary SQLite file; set BENCH_DATABASE_URI to a PostgreSQL
+URI to run there as well. Defaults to 100,000 records.
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+from sqlalchemy import create_engine, text
+import load
+import transform
+from synthetic import generate_schools
+
+QUERIES = {
+    'top 25 by rank': (
+        'SELECT s.school_name, f.rank FROM "Fact_CollegeMetrics" f '
+        'JOIN "Dim_School" s ON s.id = f.school_id ORDER BY f.rank LIMIT 25'
+    ),
+    'schools in a state': (
+        'SELECT s.school_name, f.ranking_score FROM "Dim_School" s '
+        'JOIN "Fact_CollegeMetrics" f ON f.school_id = s.id WHERE s.state = \'NY\''
+    ),
+    'tuition by school type': (
+        'SELECT s.type_of_school, AVG(f.in_state_tuition) FROM "Dim_School" s '
+        'JOIN "Fact_CollegeMetrics" f ON f.school_id = s.id WHERE s.type_of_school = \'Public\' '
+        'GROUP BY s.type_of_school'
+    ),
+    'one school profile': (
+        'SELECT * FROM "Dim_School" s JOIN "Dim_Admission" a ON a.school_id = s.id '
+        'JOIN "Dim_TestScores" t ON t.school_id = s.id WHERE s.id = \'100500\''
+    ),
+    'programs for a CIP code': (
+        'SELECT s.school_name, p.median_earnings_4yr FROM "Fact_Programs" p '
+        'JOIN "Dim_School" s ON s.id = p.school_id WHERE p.cip_code = \'1107\''
+    )
+}
+
+
+def build_tables(n):
+    data = generate_schools(n, max_programs=10)
+    cleaned = transform.clean_college_data(transform.process_and_rank_colleges(transform.process_data(data)))
+    tables = {
+        'dim_school': transform.transform_dim_school(cleaned),
+        'dim_admission': transform.transform_dim_admission(cleaned),
+        'dim_test_scores': transform.transform_dim_test_scores(cleaned),
+        'fact_college_metrics': transform.transform_fact_college_metrics(cleaned),
+        'fact_programs': transform.transform_fact_programs(data)
+    }
+    # Keys as the VARCHAR the schema declares, so both loads compare like with like
+    for df in tables.values():
+        for col in ('id', 'school_id'):
+            if col in df:
+                df[col] = df[col].astype(str)
+    return tables
+
+
+def load_inferred(engine, tables):
+    for key, df in tables.items():
+        df.to_sql(load.TABLE_MAPPINGS[key], engine, if_exists='replace', index=False)
+
+
+def time_queries(engine, repeat=5):
+    timings = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(text(sql)).fetchall()
+                best = min(best, time.perf_counter() - started)
+            timings[name] = best * 1000
+    return timings
+
+
+def main(n):
+    logging.getLogger().setLevel(logging.WARNING)
+    tables = build_tables(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [('sqlite', create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}"))]
+        if os.getenv('BENCH_DATABASE_URI'):
+            targets.append(('postgresql', create_engine(os.environ['BENCH_DATABASE_URI'])))
+
+        for target, engine in targets:
+            load_inferred(engine, tables)
+            before = time_queries(engine)
+            # Drop the inferred tables (they have no keys to drop in order)
+            with engine.begin() as connection:
+                for table_name in reversed(list(load.TABLE_MAPPINGS.values())):
+                    connection.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+            load.load_tables(engine, tables)
+            after = time_queries(engine)
+
+            print(f"\n{target}, {n} schools, {len(tables['fact_programs'])} programs")
+            print(f"{'query':<26} {'inferred (ms)':>14} {'declared (ms)':>14} {'speedup':>8}")
+            for name in QUERIES:
+                print(f"{name:<26} {before[name]:>14.2f} {after[name]:>14.2f} {before[name] / after[name]:>7.1f}x")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,58 @@
+"""
+Time ranking.what_if_ranks and ranking.rank_stability (all scenarios in one
+matrix product) against re-running ranking.rank_colleges once per weight
+scenario.
+
+Usage:
+    python benchmarks/bench_what_if.py [n_scenarios ...]
+
+Scenarios sweep the completion weight from 0 to 0.6 over 6,400 synthetic
+schools. The loop baseline is timed on the first 100 scenarios and scaled;
+the batch timings are the best of three runs. rank_stability adds the
+per-school statistics (the median dominates) to what_if_ranks.
+Defaults to 100, 1,000 and 5,000 scenarios.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+import numpy as np
+import ranking
+import transform
+from synthetic import generate_schools
+
+
+def best_of(func, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(sizes, n_schools=6400):
+    logging.getLogger().setLevel(logging.WARNING)
+    processed = transform.process_data(generate_schools(n_schools, max_programs=1))
+
+    sample = [{'completion': weight} for weight in np.linspace(0, 0.6, 100)]
+    started = time.perf_counter()
+    for weights in sample:
+        ranking.rank_colleges(processed, weights, segments={})
+    loop_per_scenario = (time.perf_counter() - started) / len(sample)
+
+    print(f"{n_schools} schools")
+    print(f"{'scenarios':>10} {'loop (s)':>10} {'ranks (s)':>10} {'stability (s)':>14} {'speedup':>8}")
+    for n in sizes:
+        weight_sets = [{'completion': weight} for weight in np.linspace(0, 0.6, n)]
+        ranks = best_of(ranking.what_if_ranks, processed, weight_sets)
+        stability = best_of(ranking.rank_stability, processed, weight_sets)
+        loop = loop_per_scenario * n
+        print(f"{n:>10} {loop:>10.2f} {ranks:>10.3f} {stability:>14.3f} {loop / ranks:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000])
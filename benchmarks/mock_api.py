@@ -0,0 +1,336 @@
+"""
+Local stand-in for the College Scorecard /schools endpoint with latency and
+fault injection.
+
+Usage:
+    python benchmarks/mock_api.py [--schools N | --records PATH] [--port 8000] [fault options]
+    SCORECARD_URL=http://127.0.0.1:8000/schools python dags/data_pipeline.py
+
+Pages are served like the real API: ``page`` (from 0) and ``per_page`` (at
+most 100) select the records, ``metadata`` carries total/page/per_page, and
+``fields=`` returns flat dotted keys, as extract.unflatten_record expects.
+Responses carry an ETag, and a matching If-None-Match gets a 304. Records
+are synthetic (synthetic.py) or recorded: a JSON file holding a list of
+records or one page payload (optionally gzipped), or an extraction journal
+run directory (.journal/<run_id>).
+
+Faults are drawn from one seeded generator in the order requests arrive, so
+a run with the same seed and request order sees the same faults:
+    --latency/--jitter     delay before every response
+    --rate-limit           X-RateLimit-* headers, and 429 with Retry-After once
+                           the window's quota is spent
+    --throttle-rate        random 429s with Retry-After
+    --error-rate           chance a request starts a burst of --burst-length 5xx
+    --truncate-rate        announce the full Content-Length, send half, hang up
+    --slow-rate            drip the body over --slow-seconds (slow loris)
+GET /stats returns the request counters as JSON.
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+from synthetic import generate_schools, project
+
+SCHOOLS_PATHS = ('/schools', '/ed/collegescorecard/v1/schools')
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+SERVER_ERRORS = (500, 502, 503, 504)
+
+
+def load_records(path):
+    """
+    Read recorded school records
+
+    :param path: JSON(.gz) file with a list of records or a page payload, or
+        an extraction journal run directory of page_*.json.gz files
+    :return: List of nested school records
+    """
+    if os.path.isdir(path):
+        records = []
+        for page_path in sorted(glob.glob(os.path.join(path, 'page_*.json.gz'))):
+            with gzip.open(page_path, 'rt') as f:
+                records.extend(json.load(f)['results'])
+        return records
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        payload = json.load(f)
+    return payload['results'] if isinstance(payload, dict) else payload
+
+
+class MockScorecardAPI:
+    """
+    Pages, faults and counters behind the mock server.
+
+    Thread-safe: the request handler threads share one instance. Every
+    request draws the same number of values from the seeded generator, so
+    the fault sequence only depends on the seed and the request order.
+    """
+
+    def __init__(self, records, seed=0, latency=0.0, jitter=0.0, rate_limit=0, rate_window=3600,
+                 throttle_rate=0.0, retry_after=1, error_rate=0.0, burst_length=3, truncate_rate=0.0,
+                 slow_rate=0.0, slow_seconds=10.0, slow_chunks=50, api_key=None):
+        self.records = records
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.burst_length = burst_length
+        self.truncate_rate = truncate_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.slow_chunks = max(1, slow_chunks)
+        self.api_key = api_key
+
+        self.rnd = random.Random(seed)
+        self.burst_left = 0
+        self.window_started = time.monotonic()
+        self.window_count = 0
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'rate_limited': 0, 'throttled': 0,
+                      'server_errors': 0, 'truncated': 0, 'slow': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def next_fault(self):
+        """
+        Decide how to answer the next request
+
+        :return: Tuple of (fault, delay, headers); fault is None, 'rate_limited',
+            'throttled', a 5xx status code, 'truncated' or 'slow'
+        """
+        with self.lock:
+            self.stats['requests'] += 1
+            draws = [self.rnd.random() for _ in range(5)]
+            error_status = self.rnd.choice(SERVER_ERRORS)
+            delay = self.latency + draws[0] * self.jitter
+
+            headers = {}
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self.window_started >= self.rate_window:
+                    self.window_started, self.window_count = now, 0
+                self.window_count += 1
+                headers['X-RateLimit-Limit'] = str(self.rate_limit)
+                headers['X-RateLimit-Remaining'] = str(max(0, self.rate_limit - self.window_count))
+                if self.window_count > self.rate_limit:
+                    reset = self.rate_window - (now - self.window_started)
+                    headers['Retry-After'] = str(max(1, math.ceil(reset)))
+                    return 'rate_limited', delay, headers
+
+            if draws[1] < self.throttle_rate:
+                headers['Retry-After'] = str(self.retry_after)
+                return 'throttled', delay, headers
+            if self.burst_left or draws[2] < self.error_rate:
+                self.burst_left = (self.burst_left or self.burst_length) - 1
+                return error_status, delay, headers
+            if draws[3] < self.truncate_rate:
+                return 'truncated', delay, headers
+            if draws[4] < self.slow_rate:
+                return 'slow', delay, headers
+            return None, delay, headers
+
+    def page(self, query):
+        """
+        Build the response payload for a /schools query
+
+        :param query: Parsed query string (parse_qs)
+        :return: Dictionary with ``metadata`` and ``results``
+        :raises ValueError: If page or per_page is not a non-negative integer
+        """
+        pg = int(query.get('page', ['0'])[0])
+        per_page = min(MAX_PER_PAGE, int(query.get('per_page', [str(DEFAULT_PER_PAGE)])[0]))
+        if pg < 0 or per_page < 0:
+            raise ValueError("page and per_page must not be negative")
+        records = self.records[pg * per_page:(pg + 1) * per_page]
+        fields = [field for value in query.get('fields', []) for field in value.split(',') if field]
+        if fields:
+            records = [project(record, fields) for record in records]
+        return {
+            'metadata': {'page': pg, 'total': len(self.records), 'per_page': per_page},
+            'results': records
+        }
+
+
+class MockScorecardHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the extractor's pooled session reuses connections
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status, message, headers=None):
+        self._send(status, json.dumps({'errors': [{'error': message}]}).encode('utf-8'), headers)
+
+    def do_GET(self):
+        api = self.server.api
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            with api.lock:
+                self._send(200, json.dumps(api.stats).encode('utf-8'))
+            return
+        if url.path.rstrip('/') not in SCHOOLS_PATHS:
+            self._send_error_json(404, f"No route {url.path}")
+            return
+
+        query = parse_qs(url.query)
+        if api.api_key is not None and query.get('api_key', [None])[0] != api.api_key:
+            self._send_error_json(403, "API_KEY_INVALID")
+            return
+
+        fault, delay, headers = api.next_fault()
+        time.sleep(delay)
+        if fault in ('rate_limited', 'throttled'):
+            api.count(fault)
+            self._send_error_json(429, "OVER_RATE_LIMIT", headers)
+            return
+        if fault in SERVER_ERRORS:
+            api.count('server_errors')
+            self._send_error_json(fault, "Simulated server error", headers)
+            return
+
+        try:
+            body = json.dumps(api.page(query)).encode('utf-8')
+        except ValueError as e:
+            self._send_error_json(400, str(e), headers)
+            return
+        headers['ETag'] = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == headers['ETag']:
+            api.count('not_modified')
+            self._send(304, headers=headers)
+            return
+
+        if fault == 'truncated':
+            # The client expects the whole body, gets half and then a closed connection
+            api.count('truncated')
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            return
+        if fault == 'slow':
+            # Headers at once, then a few bytes at a time: every read succeeds, none finishes
+            api.count('slow')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            chunk = -(-len(body) // api.slow_chunks)
+            for start in range(0, len(body), chunk):
+                self.wfile.write(body[start:start + chunk])
+                self.wfile.flush()
+                time.sleep(api.slow_seconds / api.slow_chunks)
+        else:
+            self._send(200, body, headers)
+        api.count('ok')
+        api.count('bytes', len(body))
+
+
+def make_server(api, host='127.0.0.1', port=0):
+    """
+    Bind a threaded HTTP server for ``api``
+
+    :param api: MockScorecardAPI to serve
+    :param host: Interface to bind
+    :param port: Port to bind; 0 picks a free one
+    :return: ThreadingHTTPServer; its ``url`` attribute is the /schools URL
+    """
+    server = ThreadingHTTPServer((host, port), MockScorecardHandler)
+    server.daemon_threads = True
+    server.api = api
+    server.url = f"http://{host}:{server.server_address[1]}/schools"
+    return server
+
+
+def start_server(api, host='127.0.0.1', port=0):
+    """
+    Serve ``api`` from a background thread, e.g. inside a benchmark
+
+    :return: The running server (see make_server); stop it with ``shutdown()``
+    """
+    server = make_server(api, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Mock College Scorecard /schools API with fault injection")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--schools', type=int, default=6400, help="Synthetic schools to serve")
+    parser.add_argument('--programs', type=int, default=30, help="Maximum cip_4_digit programs per synthetic school")
+    parser.add_argument('--records', help="Serve recorded records (JSON file or journal run directory) instead")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic records and the faults")
+    parser.add_argument('--api-key', help="Answer 403 unless the request carries this api_key")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra seconds per response")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per window; 0 disables the quota")
+    parser.add_argument('--rate-window', type=float, default=3600, help="Quota window in seconds")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Chance of a random 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on a random 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Chance a request starts a 5xx burst")
+    parser.add_argument('--burst-length', type=int, default=3, help="Consecutive 5xx responses per burst")
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help="Chance a body is cut off")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="Chance a body is dripped slowly")
+    parser.add_argument('--slow-seconds', type=float, default=10.0, help="Time to drip a slow body")
+    parser.add_argument('--slow-chunks', type=int, default=50, help="Pieces a slow body is dripped in")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    records = load_records(args.records) if args.records else generate_schools(
+        args.schools, seed=args.seed, max_programs=args.programs)
+    api = MockScorecardAPI(
+        records, seed=args.seed, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+        rate_window=args.rate_window, throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        error_rate=args.error_rate, burst_length=args.burst_length, truncate_rate=args.truncate_rate,
+        slow_rate=args.slow_rate, slow_seconds=args.slow_seconds, slow_chunks=args.slow_chunks,
+        api_key=args.api_key
+    )
+    server = make_server(api, args.host, args.port)
+    logging.info(f"Serving {len(records)} schools at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logging.info(f"Request counters: {api.stats}")
+
+
+if __name__ == "__main__":
+    main()
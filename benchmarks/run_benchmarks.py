@@ -0,0 +1,249 @@
+"""
+Stage benchmark suite: time and peak memory of every pipeline stage.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes N [N ...]] [--output FILE]
+                                        [--baseline FILE] [--no-memory]
+
+Synthetic Scorecard records (see synthetic.py) go through the pipeline's
+stages in order: process_data, rank_colleges_advanced, clean_college_data,
+transform_schools_data, transform_fact_programs and load.load_college_data.
+The load writes into a temporary SQLite file, so neither the API nor
+PostgreSQL is needed.
+
+Each stage keeps its best time over --repeat passes. Its peak memory is
+then measured with tracemalloc on one more pass, because tracing makes
+pandas several times slower. The peak is measured above the memory held when the stage starts.
+Sizes above --stream-above are fed to the stages straight from the
+generator instead of a list. Their process_data and transform_fact_programs
+times then include making the records, which the 'generate' stage reports
+on its own.
+
+Results are written as JSON to --output. With --baseline, any stage slower
+or larger than in the baseline file by more than the tolerances is listed,
+and the script exits with status 1. Defaults to 1,000, 10,000 and 100,000
+schools. Add 1000000 for the 1M run.
+"""
+import argparse
+import collections
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dags'))
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+import load
+import transform
+from synthetic import generate_schools, iter_schools
+
+STAGES = (
+    'generate',
+    'process_data',
+    'rank_colleges_advanced',
+    'clean_college_data',
+    'transform_schools_data',
+    'transform_fact_programs',
+    'load_college_data'
+)
+
+
+def timed(stages):
+    """Stage runner that records each stage's best wall time so far in ``stages``"""
+    def measure(stage, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = round(time.perf_counter() - started, 4)
+        numbers = stages.setdefault(stage, {})
+        numbers['seconds'] = min(seconds, numbers.get('seconds', seconds))
+        return result
+    return measure
+
+
+def traced(stages):
+    """Stage runner that records each stage's tracemalloc peak in ``stages``"""
+    def measure(stage, func, *args, **kwargs):
+        gc.collect()
+        tracemalloc.reset_peak()
+        held = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+        stages.setdefault(stage, {}).update({
+            'peak_mb': round((peak - held) / 2 ** 20, 2),
+            'retained_mb': round((current - held) / 2 ** 20, 2)
+        })
+        return result
+    return measure
+
+
+def run_pipeline(measure, records, database_uri):
+    """
+    Run every stage once, the way etl.transform_college_data and etl.load_college_data chain them
+
+    :param measure: Stage runner from timed or traced
+    :param records: Callable returning the school records (a list, or a fresh generator)
+    :param database_uri: SQLite URI the tables are loaded into
+    :return: Rows per star-schema table
+    """
+    processed = measure('process_data', transform.process_data, records())
+    ranked = measure('rank_colleges_advanced', transform.rank_colleges_advanced, processed)
+    cleaned = measure('clean_college_data', transform.clean_college_data, ranked)
+    tables = measure('transform_schools_data', transform.transform_schools_data, cleaned)
+    programs = measure('transform_fact_programs', transform.transform_fact_programs, records())
+    tables['fact_programs'] = programs[programs['school_id'].isin(tables['dim_school']['id'])]
+    measure('load_college_data', load.load_college_data, tables, database_uri, 'replace')
+    return {table: len(df) for table, df in tables.items()}
+
+
+def benchmark_size(n, seed, programs, streamed, memory, repeat, directory):
+    """
+    Benchmark every stage on ``n`` schools
+
+    :return: Result entry for the JSON report
+    """
+    stages = {}
+    passes = [(timed(stages), False)] * repeat + ([(traced(stages), True)] if memory else [])
+    rows = None
+    for number, (measure, tracing) in enumerate(passes):
+        if tracing:
+            tracemalloc.start()
+        if streamed:
+            measure('generate', collections.deque, iter_schools(n, seed, max_programs=programs), 0)
+            data = None
+            records = lambda: iter_schools(n, seed, max_programs=programs)
+        else:
+            data = measure('generate', generate_schools, n, seed, max_programs=programs)
+            records = lambda data=data: data
+        database_uri = f"sqlite:///{os.path.join(directory, f'bench_{n}_{number}.db')}"
+        rows = run_pipeline(measure, records, database_uri)
+        del data, records
+        if tracing:
+            tracemalloc.stop()
+        gc.collect()
+    return {
+        'schools': n,
+        'streamed': streamed,
+        'rows': rows,
+        'stages': {stage: stages[stage] for stage in STAGES}
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sqlalchemy': sqlalchemy.__version__
+    }
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance, min_seconds, min_mb):
+    """
+    List the stages that regressed against a previous report
+
+    Stages faster than ``min_seconds`` or smaller than ``min_mb`` in both
+    reports are too noisy to judge and are compared against those floors.
+    Sizes missing from the baseline, or run in a different (list/stream)
+    mode, are skipped.
+
+    :return: List of human-readable regression lines
+    """
+    previous = {result['schools']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['schools'])
+        if before is None or before.get('streamed') != result['streamed']:
+            continue
+        for stage, now in result['stages'].items():
+            then = before['stages'].get(stage)
+            if then is None:
+                continue
+            limit = max(then['seconds'], min_seconds) * (1 + time_tolerance)
+            if now['seconds'] > limit:
+                regressions.append(f"{result['schools']} schools {stage}: {now['seconds']:.3f}s "
+                                   f"vs {then['seconds']:.3f}s")
+            if 'peak_mb' in now and 'peak_mb' in then:
+                limit = max(then['peak_mb'], min_mb) * (1 + memory_tolerance)
+                if now['peak_mb'] > limit:
+                    regressions.append(f"{result['schools']} schools {stage}: peak {now['peak_mb']:.1f}MB "
+                                       f"vs {then['peak_mb']:.1f}MB")
+    return regressions
+
+
+def print_result(result):
+    mode = ' (streamed)' if result['streamed'] else ''
+    print(f"\n{result['schools']} schools{mode}, {sum(result['rows'].values())} table rows")
+    print(f"{'stage':<24} {'seconds':>9} {'peak (MB)':>10} {'retained (MB)':>14}")
+    for stage, numbers in result['stages'].items():
+        peak = f"{numbers['peak_mb']:>10.2f}" if 'peak_mb' in numbers else f"{'-':>10}"
+        retained = f"{numbers['retained_mb']:>14.2f}" if 'retained_mb' in numbers else f"{'-':>14}"
+        print(f"{stage:<24} {numbers['seconds']:>9.3f} {peak} {retained}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time and measure every pipeline stage on synthetic data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Numbers of schools")
+    parser.add_argument('--seed', type=int, default=42, help="Generator seed")
+    parser.add_argument('--programs', type=int, default=3, help="Maximum cip_4_digit programs per school")
+    parser.add_argument('--stream-above', type=int, default=100000,
+                        help="Feed larger sizes from the generator instead of a list")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes; each stage keeps its best time")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="Skip the tracemalloc pass")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON report to write")
+    parser.add_argument('--baseline', help="Previous JSON report to check for regressions")
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help="Allowed slowdown, e.g. 0.5 for +50%%")
+    parser.add_argument('--memory-tolerance', type=float, default=0.1, help="Allowed growth of peak memory")
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Time floor for comparisons")
+    parser.add_argument('--min-mb', type=float, default=1.0, help="Memory floor for comparisons")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.disable(logging.INFO)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.sizes:
+            result = benchmark_size(n, args.seed, args.programs, n > args.stream_above, args.memory,
+                                    max(1, args.repeat), directory)
+            print_result(result)
+            results.append(result)
+
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'settings': {'seed': args.seed, 'programs': args.programs, 'stream_above': args.stream_above,
+                     'repeat': args.repeat},
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance,
+                              args.min_seconds, args.min_mb)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Seeded generator of synthetic College Scorecard school records.
+
+Records mimic the nested layout of the /schools endpoint closely enough to
+exercise the transforms: school, student, admissions (with act_scores and
+sat_scores), cost, aid, completion (with transfer_rate) and a
+programs.cip_4_digit array. The same seed always yields the same records.
+"""
+import random
+
+STATES = ['AL', 'AZ', 'CA', 'CO', 'FL', 'GA', 'IL', 'MA', 'MI', 'NC', 'NJ', 'NY', 'OH', 'PA', 'PR', 'TX', 'VA', 'WA']
+ACCREDITORS = ['ACCET', 'ACCSC', 'HLC', 'MSCHE', 'NECHE', 'SACSCOC', 'WSCUC', None]
+SCHOOL_TYPES = ['Public', 'Private, nonprofit', 'Private, for-profit']
+# Same as transform.ARRAY_FIELDS; kept here so the benchmarks' helpers do not import the pipeline
+ARRAY_FIELDS = ('latest.programs.cip_4_digit',)
+
+
+def _maybe(rnd, value, missing_rate):
+    return None if rnd.random() < missing_rate else value
+
+
+def _scores(rnd, subjects, low, high, missing_rate):
+    if rnd.random() < missing_rate:
+        # Most schools report no test scores at all
+        return {
+            percentile: {subject: None for subject in subjects}
+            for percentile in ('25th_percentile', '75th_percentile', 'midpoint')
+        }
+    base = rnd.randint(low, high - (high - low) // 4)
+    spread = (high - low) // 8
+    return {
+        '25th_percentile': {subject: base for subject in subjects},
+        '75th_percentile': {subject: base + 2 * spread for subject in subjects},
+        'midpoint': {subject: base + spread for subject in subjects}
+    }
+
+
+def _program(rnd, school_type):
+    code = rnd.randint(100, 5299)
+    return {
+        'code': f"{code:04d}",
+        'title': f"Program {code}",
+        'credential': {'level': rnd.randint(1, 8), 'title': rnd.choice(['Certificate', "Associate's Degree", "Bachelor's Degree", "Master's Degree"])},
+        'school': {'type': school_type, 'main_campus': rnd.random() < 0.8},
+        'distance': rnd.randint(1, 2),
+        'counts': {'ipeds_awards1': _maybe(rnd, rnd.randint(0, 400), 0.3), 'ipeds_awards2': _maybe(rnd, rnd.randint(0, 400), 0.3)},
+        'earnings': {'4_yr': {'overall_median_earnings': _maybe(rnd, rnd.randint(18000, 120000), 0.6)}},
+        'debt': {'staff_grad_plus': {'all': {'eval_inst': {'median': _maybe(rnd, rnd.randint(5000, 60000), 0.6)}}}}
+    }
+
+
+def generate_school(school_id, rnd, max_programs=30, missing_rate=0.2):
+    """
+    Generate one nested school record
+
+    :param school_id: Value of the record's ``id``
+    :param rnd: random.Random instance driving the generator
+    :param max_programs: Upper bound on the length of cip_4_digit
+    :param missing_rate: Probability that an optional metric is null
+    :return: Dictionary shaped like a /schools result
+    """
+    school_type = rnd.choice(SCHOOL_TYPES)
+    men = _maybe(rnd, round(rnd.random(), 4), missing_rate)
+    return {
+        'id': school_id,
+        'latest': {
+            'school': {
+                'name': f"Synthetic College {school_id}",
+                'address': f"{rnd.randint(1, 9999)} College Ave",
+                'state': rnd.choice(STATES),
+                'city': f"City {rnd.randint(1, 500)}",
+                'degrees_awarded': {
+                    'highest': rnd.randint(0, 4),
+                    'predominant': rnd.randint(0, 4),
+                    'predominant_recoded': rnd.randint(0, 4)
+                },
+                'accreditor_code': rnd.choice(ACCREDITORS),
+                'institutional_characteristics': {'level': rnd.randint(1, 3)},
+                'religious_affiliation': _maybe(rnd, rnd.randint(22, 107), 0.85)
+            },
+            'student': {
+                'size': _maybe(rnd, rnd.randint(10, 60000), missing_rate),
+                'demographics': {'men': men, 'women': None if men is None else round(1 - men, 4)}
+            },
+            'admissions': {
+                'admission_rate': {
+                    'overall': _maybe(rnd, round(rnd.random(), 4), 0.5),
+                    'by_ope_id': _maybe(rnd, round(rnd.random(), 4), 0.5),
+                    'consumer_rate': _maybe(rnd, round(rnd.random(), 4), 0.5)
+                },
+                'act_scores': _scores(rnd, ('cumulative', 'english', 'math', 'writing'), 12, 36, 0.7),
+                'sat_scores': dict(
+                    _scores(rnd, ('critical_reading', 'math', 'writing'), 350, 800, 0.7),
+                    average={'overall': _maybe(rnd, rnd.randint(800, 1550), 0.7), 'by_ope_id': _maybe(rnd, rnd.randint(800, 1550), 0.7)}
+                )
+            },
+            'cost': {
+                'tuition': {
+                    'in_state': _maybe(rnd, rnd.randint(1000, 65000), missing_rate),
+                    'out_of_state': _maybe(rnd, rnd.randint(1000, 65000), missing_rate)
+                }
+            },
+            'aid': {
+                'loan_principal': _maybe(rnd, rnd.randint(2000, 40000), missing_rate),
+                'pell_grant_rate': _maybe(rnd, round(rnd.random(), 4), missing_rate),
+                'federal_loan_rate': _maybe(rnd, round(rnd.random(), 4), missing_rate)
+            },
+            'completion': {
+                'consumer_rate': _maybe(rnd, round(rnd.random(), 4), missing_rate),
+                'transfer_rate': {
+                    '4yr': {'full_time': _maybe(rnd, round(rnd.random(), 4), 0.6), 'full_time_pooled': _maybe(rnd, round(rnd.random(), 4), 0.6)},
+                    'less_than_4yr': {'full_time': _maybe(rnd, round(rnd.random(), 4), 0.4), 'full_time_pooled': _maybe(rnd, round(rnd.random(), 4), 0.4)}
+                }
+            },
+            'programs': {
+                'cip_4_digit': [_program(rnd, school_type) for _ in range(rnd.randint(0, max_programs))]
+            }
+        }
+    }
+
+
+def iter_schools(n, seed=42, **kwargs):
+    """
+    Yield ``n`` school records one at a time
+
+    Yields exactly the records generate_schools returns for the same
+    arguments, without holding them all (about 9 KB each) in memory.
+
+    :param n: Number of schools
+    :param seed: Seed for reproducible output
+    :return: Iterator of nested school records
+    """
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield generate_school(100000 + i, rnd, **kwargs)
+
+
+def generate_schools(n, seed=42, **kwargs):
+    """
+    Generate ``n`` school records
+
+    :param n: Number of schools
+    :param seed: Seed for reproducible output
+    :return: List of nested school records
+    """
+    return list(iter_schools(n, seed, **kwargs))
+
+
+def _get(record, parts):
+    for part in parts:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(part)
+    return record
+
+
+def project(record, fields):
+    """
+    Flatten a nested record to the requested dotted fields, as ``fields=`` does
+
+    Sub-fields of an array of objects come back as one list per sub-field,
+    e.g. ``latest.programs.cip_4_digit.code: ['5202', '1107']``.
+
+    :param record: Nested school record
+    :param fields: API field paths
+    :return: Dictionary keyed by field path
+    """
+    flat = {}
+    for field in fields:
+        array_field = next((f for f in ARRAY_FIELDS if field.startswith(f + '.')), None)
+        if array_field is None:
+            flat[field] = _get(record, field.split('.'))
+            continue
+        items = _get(record, array_field.split('.')) or []
+        parts = field[len(array_field) + 1:].split('.')
+        flat[field] = [_get(item, parts) for item in items]
+    return flat
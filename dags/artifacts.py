@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pandas as pd
+from config import ARTIFACT_DIR
+import decode
+from journal import default_run_id, expire_runs
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    :param path: File to hash
+    :return: Hex SHA-256 digest of the file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Run-scoped store for the outputs handed from one DAG task to the next.
+
+    DataFrames are written as Parquet and raw API records as gzipped JSON
+    under ``<directory>/<run_id>``. Writers return a small reference (path,
+    SHA-256 and row count) meant for XCom; readers verify the checksum before
+    loading, so a task reads exactly what its upstream task wrote and can be
+    re-run on its own. Point ARTIFACT_DIR at shared storage when tasks run
+    on separate workers. Runs untouched for RUN_RETENTION_DAYS are removed
+    when a store is opened.
+    """
+
+    def __init__(self, run_id=None, directory=ARTIFACT_DIR):
+        self.run_id = run_id or default_run_id()
+        self.directory = os.path.abspath(os.path.join(directory, self.run_id))
+        expire_runs(directory, keep=self.run_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _reference(self, path, rows):
+        return {'path': path, 'sha256': file_sha256(path), 'rows': rows}
+
+    def _write(self, path, write):
+        # Write next to the target and rename, so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def put_frame(self, name, dataframe):
+        """
+        Store a DataFrame as Parquet
+
+        :param name: Artifact name, unique within the run
+        :param dataframe: DataFrame to store
+        :return: Reference dictionary with path, sha256 and rows
+        """
+        path = os.path.join(self.directory, f"{name}.parquet")
+        self._write(path, lambda tmp_path: dataframe.to_parquet(tmp_path, index=False))
+        logging.info(f"Stored {len(dataframe)} rows as {path}")
+        return self._reference(path, len(dataframe))
+
+    def put_tables(self, name, tables):
+        """
+        Store a dictionary of DataFrames, one Parquet file each
+
+        :param name: Artifact name, unique within the run
+        :param tables: Dictionary of DataFrames
+        :return: Dictionary of references keyed like ``tables``
+        """
+        return {key: self.put_frame(f"{name}.{key}", dataframe) for key, dataframe in tables.items()}
+
+    def put_records(self, name, records):
+        """
+        Store raw API records as gzipped JSON
+
+        :param name: Artifact name, unique within the run
+        :param records: List of nested dictionaries or decode.SchoolRecords
+        :return: Reference dictionary with path, sha256 and rows
+        """
+        path = os.path.join(self.directory, f"{name}.json.gz")
+
+        def write(tmp_path):
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(decode.encode(records))
+
+        self._write(path, write)
+        logging.info(f"Stored {len(records)} records as {path}")
+        return self._reference(path, len(records))
+
+    @staticmethod
+    def verify(reference):
+        """
+        Check that an artifact is still what its writer stored
+
+        :param reference: Reference returned by a put method
+        :raises ValueError: If the file is missing or its checksum differs
+        """
+        path = reference['path']
+        if not os.path.exists(path):
+            raise ValueError(f"Artifact {path} is missing")
+        if file_sha256(path) != reference['sha256']:
+            raise ValueError(f"Artifact {path} does not match its checksum")
+
+    @classmethod
+    def get_frame(cls, reference):
+        cls.verify(reference)
+        return pd.read_parquet(reference['path'])
+
+    @classmethod
+    def get_tables(cls, references):
+        return {key: cls.get_frame(reference) for key, reference in references.items()}
+
+    @classmethod
+    def get_records(cls, reference):
+        cls.verify(reference)
+        with gzip.open(reference['path'], 'rt', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import CACHE_DIR, CACHE_TTL_SECONDS, CACHE_MAX_BYTES
+
+# Query parameters that identify the caller rather than the data
+IGNORED_PARAMS = {'api_key'}
+
+
+def cache_key(url):
+    """
+    Build a cache key from a normalized request URL
+
+    Scheme and host are lowercased, query parameters are sorted and the API
+    key is dropped, so the same page requested with a rotated key or a
+    different parameter order maps to the same entry. ``page`` and
+    ``per_page`` are part of the query, so every page gets its own entry.
+
+    :param url: Request URL including pagination parameters
+    :return: Hex digest identifying the cached response
+    """
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ''))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of API response bodies.
+
+    Bodies are stored gzip-compressed, one file per key, next to an index that
+    records size, age, last access and the ETag/Last-Modified validators.
+    Entries older than ``ttl`` seconds are stale and must be revalidated; when
+    the cache grows past ``max_bytes`` the least recently used entries are evicted.
+    Access times are saved with the index, on every write and on flush(), so
+    the eviction order carries over from one run to the next.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Every get() is a hit (fresh), stale (revalidation needed) or a miss;
+        # revalidated counts the stale entries the server confirmed with a 304
+        self.stats = {'hits': 0, 'stale': 0, 'revalidated': 0, 'misses': 0, 'evicted': 0}
+        self.dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._read_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE)) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose body went missing
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _write_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    def flush(self):
+        """Save the access times recorded by get() since the index was last written"""
+        with self.lock:
+            if self.dirty:
+                self._write_index()
+
+    def summary(self):
+        """
+        :return: The stats plus lookups and hit_rate, the share of lookups
+            answered without downloading the body (fresh hits and 304s)
+        """
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale'] + stats['misses']
+        stats['lookups'] = lookups
+        stats['hit_rate'] = round((stats['hits'] + stats['revalidated']) / lookups, 3) if lookups else None
+        return stats
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        :param key: Key from cache_key()
+        :return: Dictionary with body, fresh flag and validators, or None on a miss
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            try:
+                with gzip.open(self._path(key), 'rb') as f:
+                    body = f.read()
+            except OSError as e:
+                logging.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self.index.pop(key, None)
+                self.dirty = True
+                self.stats['misses'] += 1
+                return None
+
+            entry['last_access'] = time.time()
+            self.dirty = True
+            fresh = time.time() - entry['stored_at'] < self.ttl
+            self.stats['hits' if fresh else 'stale'] += 1
+            return {
+                'body': body,
+                'fresh': fresh,
+                'etag': entry.get('etag'),
+                'last_modified': entry.get('last_modified')
+            }
+
+    def put(self, key, body, etag=None, last_modified=None):
+        """
+        Store a response body, evicting least recently used entries if needed
+
+        :param key: Key from cache_key()
+        :param body: Raw (uncompressed) response body
+        :param etag: ETag header of the response, if any
+        :param last_modified: Last-Modified header of the response, if any
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            now = time.time()
+            self.index[key] = {
+                'size': os.path.getsize(path),
+                'stored_at': now,
+                'last_access': now,
+                'etag': etag,
+                'last_modified': last_modified
+            }
+            self._evict()
+            self._write_index()
+
+    def refresh(self, key):
+        """Mark an entry fresh again after the server answered 304 Not Modified"""
+        with self.lock:
+            if key in self.index:
+                self.index[key]['stored_at'] = time.time()
+                self.stats['revalidated'] += 1
+                self._write_index()
+
+    def conditional_headers(self, entry):
+        """
+        Revalidation headers for a stale entry
+
+        :param entry: Result of get()
+        :return: If-None-Match / If-Modified-Since headers the server can answer with 304
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)['size']
+            self.stats['evicted'] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
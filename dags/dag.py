@@ -4,10 +4,10 @@ from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.utils.dates import days_ago
 from etl import (
-    extract_college_data,
-    transform_college_data,
-    load_college_data,
-    validate_data
+    extract_stage,
+    validate_stage,
+    transform_stage,
+    load_stage
 )
 
 # Default arguments for the DAG
@@ -30,31 +30,29 @@ dag = DAG(
     catchup=False
 )
 
-# Define tasks using PythonOperator
+# Define tasks using PythonOperator; they exchange artifact references (paths and
+# checksums) through XCom while the data itself stays in the artifact store
 extract_task = PythonOperator(
     task_id='extract_college_data',
-    python_callable=extract_college_data,
+    python_callable=extract_stage,
     dag=dag
 )
 
 validate_task = PythonOperator(
     task_id='validate_extracted_data',
-    python_callable=validate_data,
-    op_args=['{{ task_instance.xcom_pull(task_ids="extract_college_data") }}'],
+    python_callable=validate_stage,
     dag=dag
 )
 
 transform_task = PythonOperator(
     task_id='transform_college_data',
-    python_callable=transform_college_data,
-    op_args=['{{ task_instance.xcom_pull(task_ids="validate_extracted_data") }}'],
+    python_callable=transform_stage,
     dag=dag
 )
 
 load_task = PythonOperator(
     task_id='load_college_data',
-    python_callable=load_college_data,
-    op_args=['{{ task_instance.xcom_pull(task_ids="transform_college_data") }}'],
+    python_callable=load_stage,
     dag=dag
 )
 
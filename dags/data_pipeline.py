@@ -12,7 +12,11 @@ from etl import (
     transform_college_data, 
     load_college_data
 )
-from config import DATABASE_URI, URL
+from config import DATABASE_URI, URL, STREAM_CHUNK_SIZE
+import extract
+import transform
+import load
+import sink
 
 def run_full_pipeline():
     """
@@ -48,6 +52,33 @@ def run_full_pipeline():
         logger.error(f"ETL Pipeline failed: {e}")
         raise
 
+def run_streaming_pipeline():
+    """
+    Execute the ETL pipeline as a stream of chunks with bounded memory
+
+    Pages flow from the extractor through flattening, cleaning and the
+    star-schema split to the loader one chunk at a time; ranking runs as a
+    final pass over the fact columns.
+    """
+    logging.basicConfig(
+        level=logging.INFO, 
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+
+    try:
+        logger.info("Starting streaming Extract -> Transform -> Load")
+        pages = extract.iter_pages(URL)
+        table_chunks = transform.stream_schools_data(pages, chunk_size=STREAM_CHUNK_SIZE)
+        load_results = load.load_college_data_stream(table_chunks, DATABASE_URI)
+        
+        logger.info("Streaming ETL Pipeline completed successfully")
+        return load_results
+    
+    except Exception as e:
+        logger.error(f"Streaming ETL Pipeline failed: {e}")
+        raise
+
 def generate_pipeline_report(load_results):
     """
     Generate a report of the ETL pipeline run
@@ -55,7 +86,10 @@ def generate_pipeline_report(load_results):
     report = {
         'timestamp': datetime.now().isoformat(),
         'status': 'success',
-        'load_details': load_results
+        'extract_details': dict(extract.last_run_report),
+        'load_details': load_results,
+        'load_timings': dict(load.last_load_report),
+        'output_details': dict(sink.last_write_report)
     }
     
     # Optional: Save report to a file
@@ -68,7 +102,10 @@ def generate_pipeline_report(load_results):
 
 if __name__ == "__main__":
     try:
-        results = run_full_pipeline()
+        if '--stream' in sys.argv:
+            results = run_streaming_pipeline()
+        else:
+            results = run_full_pipeline()
         report = generate_pipeline_report(results)
         print("Pipeline completed successfully")
     except Exception as e:
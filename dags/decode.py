@@ -0,0 +1,345 @@
+import functools
+import json
+import logging
+import typing
+from typing import Dict, List, Optional
+
+# Optional fast decoders, best first; the stdlib json module is the fallback
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if msgspec is not None:
+    # Declared schema of the fields process_data and Fact_Programs read, typed as
+    # the transforms use them. Fields not declared here, such as the bulk of every
+    # cip_4_digit program, are skipped while decoding. A subtree the API leaves
+    # out decodes to None, so process_data still drops that record; a missing
+    # leaf decodes to None. Records hold no cycles, so the structs skip the GC.
+    Number = Optional[float]
+    Text = Optional[str]
+    ScoreTable = Optional[Dict[str, Dict[str, Number]]]
+
+    class Record(msgspec.Struct, gc=False):
+        pass
+
+    class Degrees(Record):
+        highest: Number = None
+        predominant: Number = None
+        predominant_recoded: Number = None
+
+    class InstitutionalCharacteristics(Record):
+        level: Number = None
+
+    class School(Record):
+        name: Text = None
+        address: Text = None
+        state: Text = None
+        city: Text = None
+        degrees_awarded: Optional[Degrees] = None
+        accreditor_code: Text = None
+        institutional_characteristics: Optional[InstitutionalCharacteristics] = None
+        religious_affiliation: Number = None
+
+    class Demographics(Record):
+        men: Number = None
+        women: Number = None
+
+    class Student(Record):
+        size: Number = None
+        demographics: Optional[Demographics] = None
+
+    class AdmissionRate(Record):
+        overall: Number = None
+        by_ope_id: Number = None
+        consumer_rate: Number = None
+
+    class Admissions(Record):
+        admission_rate: Optional[AdmissionRate] = None
+        act_scores: ScoreTable = None
+        sat_scores: ScoreTable = None
+
+    class Tuition(Record):
+        in_state: Number = None
+        out_of_state: Number = None
+
+    class Cost(Record):
+        tuition: Optional[Tuition] = None
+
+    class Aid(Record):
+        loan_principal: Number = None
+        pell_grant_rate: Number = None
+        federal_loan_rate: Number = None
+
+    class Completion(Record):
+        consumer_rate: Number = None
+        transfer_rate: ScoreTable = None
+
+    class ProgramSchool(Record):
+        type: Text = None
+
+    class Credential(Record):
+        level: Number = None
+        title: Text = None
+
+    class ProgramCounts(Record):
+        ipeds_awards1: Number = None
+        ipeds_awards2: Number = None
+
+    class EarningsWindow(Record):
+        overall_median_earnings: Number = None
+
+    class ProgramEarnings(Record):
+        four_yr: Optional[EarningsWindow] = msgspec.field(default=None, name='4_yr')
+
+    class DebtStatistics(Record):
+        median: Number = None
+
+    class DebtByInstitution(Record):
+        eval_inst: Optional[DebtStatistics] = None
+
+    class DebtByStudents(Record):
+        all: Optional[DebtByInstitution] = None
+
+    class ProgramDebt(Record):
+        staff_grad_plus: Optional[DebtByStudents] = None
+
+    class Program(Record):
+        code: Text = None
+        title: Text = None
+        credential: Optional[Credential] = None
+        counts: Optional[ProgramCounts] = None
+        earnings: Optional[ProgramEarnings] = None
+        debt: Optional[ProgramDebt] = None
+        school: Optional[ProgramSchool] = None
+
+    class Programs(Record):
+        cip_4_digit: Optional[List[Program]] = None
+
+    class Latest(Record):
+        school: Optional[School] = None
+        student: Optional[Student] = None
+        admissions: Optional[Admissions] = None
+        cost: Optional[Cost] = None
+        aid: Optional[Aid] = None
+        completion: Optional[Completion] = None
+        programs: Optional[Programs] = None
+
+    class SchoolRecord(Record):
+        id: Optional[int] = None
+        latest: Optional[Latest] = None
+
+    class Page(msgspec.Struct):
+        metadata: dict = {}
+        results: List[SchoolRecord] = []
+
+    # Lax mode accepts numbers sent as strings, which the transforms coerce anyway
+    _page_decoder = msgspec.json.Decoder(Page, strict=False)
+    _untyped_decoder = msgspec.json.Decoder()
+
+    DECODER = 'msgspec'
+elif orjson is not None:
+    DECODER = 'orjson'
+else:
+    DECODER = 'json'
+
+
+def is_typed(record):
+    """
+    :return: Whether ``record`` is a decoded SchoolRecord rather than a dictionary
+    """
+    return msgspec is not None and isinstance(record, msgspec.Struct)
+
+
+def get_path(record, path):
+    """
+    Value at a dotted API path of a record, typed or not
+
+    :param record: School record (dictionary or SchoolRecord)
+    :param path: Dotted API field path, e.g. ``latest.school.state``
+    :return: The value, or None if any part of the path is missing
+    """
+    value = record
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif is_typed(value):
+            names = dict(zip(value.__struct_encode_fields__, value.__struct_fields__))
+            value = getattr(value, names.get(key, key), None)
+        else:
+            return None
+    return value
+
+
+def encode(payload):
+    """
+    Serialize decoded pages or records, typed or not, back to JSON
+
+    SchoolRecords are written with their API field names, so the output reads
+    back (with json.loads or decode_page) into the same nested layout.
+
+    :param payload: Page, list of records or record
+    :return: JSON document (bytes)
+    """
+    if msgspec is not None:
+        return msgspec.json.encode(payload)
+    return json.dumps(payload).encode('utf-8')
+
+
+def _declared(field_type):
+    # The struct or container type behind Optional[...]
+    args = [arg for arg in typing.get_args(field_type) if arg is not type(None)]
+    return args[0] if typing.get_origin(field_type) is typing.Union and len(args) == 1 else field_type
+
+
+def _is_struct(field_type):
+    return isinstance(field_type, type) and issubclass(field_type, msgspec.Struct)
+
+
+def _compile(struct_type, parts):
+    """
+    Placement of one projected field inside a SchoolRecord
+
+    :param struct_type: Struct the remaining path starts from
+    :param parts: Remaining API path parts
+    :return: (setter(target, value), declared type of the projected value),
+        or None if the schema does not declare the path
+    """
+    attribute = dict(zip(struct_type.__struct_encode_fields__, struct_type.__struct_fields__)).get(parts[0])
+    if attribute is None:
+        return None
+    field_type = typing.get_type_hints(struct_type)[attribute]
+    declared, rest = _declared(field_type), parts[1:]
+    if not rest:
+        return (lambda target, value: setattr(target, attribute, value)), field_type
+
+    if _is_struct(declared):
+        inner = _compile(declared, rest)
+        if inner is None:
+            return None
+        set_inner, value_type = inner
+
+        def set_child(target, value):
+            child = getattr(target, attribute)
+            if child is None:
+                child = declared()
+                setattr(target, attribute, child)
+            set_inner(child, value)
+        return set_child, value_type
+
+    if typing.get_origin(declared) is list and _is_struct(typing.get_args(declared)[0]):
+        # Sub-field of an array of objects: the API sends one list per sub-field
+        item_type = typing.get_args(declared)[0]
+        inner = _compile(item_type, rest)
+        if inner is None:
+            return None
+        set_inner, value_type = inner
+
+        def set_items(target, values):
+            items = getattr(target, attribute)
+            if items is None:
+                items = []
+                setattr(target, attribute, items)
+            values = values or []
+            items.extend(item_type() for _ in range(len(values) - len(items)))
+            for item, value in zip(items, values):
+                set_inner(item, value)
+        return set_items, Optional[List[value_type]]
+
+    if typing.get_origin(declared) is dict and len(rest) == 2:
+        # ScoreTable leaf, e.g. act_scores.midpoint.math
+        group, name = rest
+
+        def set_score(target, value):
+            table = getattr(target, attribute)
+            if table is None:
+                table = {}
+                setattr(target, attribute, table)
+            table.setdefault(group, {})[name] = value
+        return set_score, typing.get_args(typing.get_args(declared)[1])[1]
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _projected_decoder(fields):
+    """
+    Typed decoder for pages projected to ``fields``
+
+    :param fields: Tuple of API field paths
+    :return: (msgspec decoder, setters in field order), or None if a field is
+        not declared in the schema (e.g. one of EXTRA_FIELDS)
+    """
+    placements = [_compile(SchoolRecord, field.split('.')) for field in fields]
+    if any(placement is None for placement in placements):
+        return None
+    attributes = [f"field_{number}" for number in range(len(fields))]
+    flat_record = msgspec.defstruct(
+        'ProjectedRecord',
+        [(attribute, value_type, None) for attribute, (_, value_type) in zip(attributes, placements)],
+        rename=dict(zip(attributes, fields)),
+        gc=False
+    )
+    flat_page = msgspec.defstruct('ProjectedPage', [('metadata', dict, {}), ('results', List[flat_record], [])])
+    return msgspec.json.Decoder(flat_page, strict=False), [setter for setter, _ in placements]
+
+
+def _nest(flat_records, setters):
+    # SchoolRecords built from flat projected records; every requested path exists, as in extract.unflatten_record
+    records = []
+    for flat in flat_records:
+        record = SchoolRecord()
+        for setter, value in zip(setters, msgspec.structs.astuple(flat)):
+            setter(record, value)
+        records.append(record)
+    return records
+
+
+def decode_page(body, fields=(), fast=True):
+    """
+    Decode one /schools response body
+
+    With msgspec installed records are decoded straight into typed
+    SchoolRecord structs, which process_data and transform_fact_programs read
+    directly. Whole records skip every subtree the schema does not declare
+    while parsing. Projected records (``fields=``, flat dotted keys) are
+    decoded into typed flat structs and nested into SchoolRecords, with every
+    requested path present, as extract.unflatten_record does for dicts. A
+    page whose values do not fit the declared types, or projected to a field
+    the schema does not declare, is decoded untyped instead. Without msgspec
+    the body is parsed with orjson, or the stdlib json module.
+
+    :param body: Raw response body (bytes)
+    :param fields: API field paths of the request's ``fields=`` projection, if any
+    :param fast: Use the fastest available decoder; False always uses the stdlib
+        json module and keeps every field of every record
+    :return: Dictionary with ``metadata`` and ``results``; untyped projected
+        records are still flat, for extract.unflatten_record
+    :raises ValueError: If the body is not valid JSON (e.g. truncated)
+    """
+    if not fast:
+        return json.loads(body)
+    if DECODER == 'msgspec':
+        projection = _projected_decoder(tuple(fields)) if fields else None
+        try:
+            if not fields or projection is not None:
+                try:
+                    if projection is None:
+                        page = _page_decoder.decode(body)
+                        return {'metadata': page.metadata, 'results': page.results}
+                    decoder, setters = projection
+                    page = decoder.decode(body)
+                    return {'metadata': page.metadata, 'results': _nest(page.results, setters)}
+                except msgspec.ValidationError as e:
+                    logging.warning(f"Page does not match the declared schema ({e}); decoding it untyped")
+            return _untyped_decoder.decode(body)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid page body: {e}") from e
+    if DECODER == 'orjson':
+        return orjson.loads(body)
+    return json.loads(body)
@@ -1,8 +1,10 @@
 import logging
-import pandas as pd
+import decode
 import extract
 import transform
 import load
+import sink
+from artifacts import ArtifactStore
 from config import URL, DATABASE_URI    
 
 # Configure logging
@@ -17,13 +19,13 @@ def extract_college_data():
     Extract college data from the College Scorecard API
     
     Returns:
-        pd.DataFrame: Raw college data
+        list: Raw college records
     """
     try:
         logger.info("Starting data extraction from College Scorecard API")
         raw_data = extract.request_data(URL)
         
-        if raw_data is None or raw_data.empty:
+        if not raw_data:
             logger.error("No data extracted from the API")
             raise ValueError("No data retrieved from College Scorecard API")
         
@@ -39,18 +41,18 @@ def validate_data(raw_data):
     Validate the extracted data
     
     Args:
-        raw_data (pd.DataFrame): Raw extracted data
+        raw_data (list): Raw college records
     
     Returns:
-        pd.DataFrame: Validated data
+        list: Validated records
     """
     try:
         logger.info("Starting data validation")
         
         # Check basic validation criteria
-        if raw_data is None or raw_data.empty:
-            logger.error("Empty DataFrame received")
-            raise ValueError("Cannot validate empty DataFrame")
+        if not raw_data:
+            logger.error("No records received")
+            raise ValueError("Cannot validate empty data")
         
         # Check for minimum required columns
         required_columns = [
@@ -58,17 +60,18 @@ def validate_data(raw_data):
             'latest.student.size', 'latest.admissions.admission_rate.overall'
         ]
         
-        missing_columns = [col for col in required_columns if col not in raw_data.columns]
+        columns = {col: [decode.get_path(record, col) for record in raw_data] for col in required_columns}
+        missing_columns = [col for col, values in columns.items() if all(value is None for value in values)]
         
         if missing_columns:
             logger.error(f"Missing critical columns: {missing_columns}")
             raise ValueError(f"Missing critical columns: {missing_columns}")
         
         # Additional validation checks
-        if raw_data['id'].isnull().sum() > 0:
+        if any(value is None for value in columns['id']):
             logger.warning("Some records have missing school IDs")
         
-        if raw_data['latest.school.state'].nunique() < 10:
+        if len(set(columns['latest.school.state']) - {None}) < 10:
             logger.warning("Unusually low number of unique states")
         
         logger.info("Data validation completed successfully")
@@ -83,7 +86,7 @@ def transform_college_data(validated_data):
     Transform the validated college data
     
     Args:
-        validated_data (pd.DataFrame): Validated raw data
+        validated_data (list): Validated raw records
     
     Returns:
         dict: Transformed data tables
@@ -96,6 +99,14 @@ def transform_college_data(validated_data):
         
         comprehensive_transforms = transform.transform_schools_data(cleaned_tables)
         
+        # Programs are exploded from the raw records; keep those of loaded schools only
+        fact_programs = transform.transform_fact_programs(validated_data)
+        fact_programs = fact_programs[fact_programs['school_id'].isin(comprehensive_transforms['dim_school']['id'])]
+        comprehensive_transforms['fact_programs'] = fact_programs
+        
+        # Parquet by default (OUTPUT_FORMAT=csv keeps the old CSV files)
+        sink.write_tables(comprehensive_transforms)
+        
         logger.info("Data transformation completed successfully")
         return comprehensive_transforms
     
@@ -128,6 +139,49 @@ def load_college_data(transformed_data):
         logger.error(f"Data loading failed: {e}")
         raise
 
+# Airflow task callables: each stage reads its input from the artifact store
+# and pushes only the artifact references (paths and checksums) to XCom
+
+def extract_stage():
+    """
+    Extract and store the raw records
+    
+    Returns:
+        dict: Artifact reference of the raw records
+    """
+    return ArtifactStore().put_records('raw', extract_college_data())
+
+def validate_stage(ti):
+    """
+    Validate the stored raw records; they are passed on unchanged
+    
+    Returns:
+        dict: Artifact reference of the validated records
+    """
+    reference = ti.xcom_pull(task_ids='extract_college_data')
+    validate_data(ArtifactStore.get_records(reference))
+    return reference
+
+def transform_stage(ti):
+    """
+    Transform the validated records and store each table
+    
+    Returns:
+        dict: Artifact references keyed by table
+    """
+    records = ArtifactStore.get_records(ti.xcom_pull(task_ids='validate_extracted_data'))
+    return ArtifactStore().put_tables('transformed', transform_college_data(records))
+
+def load_stage(ti):
+    """
+    Load the stored tables into the database
+    
+    Returns:
+        dict: Number of rows loaded into each table
+    """
+    tables = ArtifactStore.get_tables(ti.xcom_pull(task_ids='transform_college_data'))
+    return load_college_data(tables)
+
 # Optional: Main block for standalone execution
 if __name__ == "__main__":
     try:
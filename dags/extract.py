@@ -1,11 +1,14 @@
 import logging
-import requests
-import time
-import json
 import os
 from dotenv import load_dotenv
-import pandas as pd
-from config import URL
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import URL, PAGE_SIZE, REQUEST_CONCURRENCY, REQUEST_QUOTA_PER_HOUR, REQUEST_BURST
+from config import FIELD_PROJECTION, EXTRA_FIELDS, CACHE_ENABLED, FAIL_ON_MISSING_PAGES, FAST_DECODE
+import decode
+from cache import ResponseCache, cache_key
+from journal import ExtractionJournal
+from transport import TokenBucket, Transport, create_session
 import transform
 import load
 from config import DATABASE_URI
@@ -13,6 +16,9 @@ load_dotenv()
 
 API_KEY = os.getenv('API_KEY')
 
+# Summary of the most recent request_data call, picked up by the run report
+last_run_report = {}
+
 # def request_data(url, params):
 #     base_url = "https://api.data.gov/ed/collegescorecard/v1/schools"
 #     logging.info(f"Requesting data from {base_url}")
@@ -25,59 +31,270 @@ API_KEY = os.getenv('API_KEY')
 #     logging.info("Request failed but requesting one more time")
 #     return request_data(url, params)
 
-def request_data(url):
-    total_pages = 64  # Total number of pages to fetch
-    results = []
-    for pg in range(total_pages):  # Loop through all pages (0 to 65)
-        logging.info(f"Requesting data for page {pg}")
-        
-        # Construct the URL with pagination
-        paginated_url = f"{url}&page={pg}&per_page={100}"
-        
-        # Retry mechanism
-        max_retries = 5
-        retry_count = 0
-        success = False
-        
-        while retry_count < max_retries:
-            try:
-                # Fetch data for the current page
-                response = requests.get(paginated_url)
-                
-                if response.ok:
-                    # Log the success status code
-                    logging.info(f"Successfully fetched data for page {pg}. Status code: {response.status_code}")
-                    
-                    # Parse and accumulate the data
-                    data = response.json()
-                    data = data['results']
-                    # fetched_data = pd.concat([all_data, results], ignore_index=True)
-                    results.extend(data)  
-                    logging.info(f"Fetched {len(results)} records for page {pg}.")
-                    success = True
-                    break  # Exit the retry loop if successful
-                
-                else:
-                    # Log the failure status code and retry
-                    logging.warning(f"Failed to fetch data for page {pg}. Status code: {response.status_code}. Retrying ({retry_count + 1}/{max_retries})...")
-                    retry_count += 1
-                    time.sleep(10)  # Wait 10 seconds before retrying
-            
-            except requests.exceptions.RequestException as e:
-                # Handle connection errors or timeouts
-                logging.error(f"Request failed for page {pg}: {e}. Retrying ({retry_count + 1}/{max_retries})...")
-                retry_count += 1
-                time.sleep(10)  # Wait 10 seconds before retrying
-        
-        if not success:
-            # Log the failure after exhausting all retries
-            logging.error(f"Failed to fetch data for page {pg} after {max_retries} attempts.")
-        
-        # Sleep to avoid hitting API rate limits
-        time.sleep(15)
+def with_fields(url, fields):
+    """
+    Append a ``fields=`` projection to the API URL
+
+    :param url: Base API URL including query parameters
+    :param fields: API field paths to request; falsy requests whole records
+    :return: URL restricted to the given fields
+    """
+    if not fields:
+        return url
+    return f"{url}&fields={','.join(fields)}"
+
+
+def _set_path(target, parts, value):
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    target[parts[-1]] = value
+
+
+def unflatten_record(record, fields=()):
+    """
+    Rebuild the nested record layout from a projected API response
+
+    With ``fields=`` the API returns flat dotted keys ("latest.school.name").
+    They are nested again so process_data reads projected and whole records
+    alike, and every requested field is present (as None when the API left it out).
+
+    :param record: A single school record from the API
+    :param fields: API field paths that were requested
+    :return: Nested school record
+    """
+    nested = {}
+    for key, value in record.items():
+        array_field = next((f for f in transform.ARRAY_FIELDS if key.startswith(f + '.')), None)
+        if array_field and isinstance(value, list):
+            # Sub-field of an array of objects, e.g. latest.programs.cip_4_digit.school.type
+            parts = array_field.split('.')
+            items = nested
+            for part in parts:
+                items = items.setdefault(part, {} if part != parts[-1] else [])
+            items.extend({} for _ in range(len(value) - len(items)))
+            for item, item_value in zip(items, value):
+                _set_path(item, key[len(array_field) + 1:].split('.'), item_value)
+        else:
+            _set_path(nested, key.split('.'), value)
+
+    for field in fields:
+        array_field = next((f for f in transform.ARRAY_FIELDS if field.startswith(f + '.')), None)
+        parts = (array_field or field).split('.')
+        target = nested
+        for part in parts[:-1]:
+            if not isinstance(target.get(part), dict):
+                target[part] = {}
+            target = target[part]
+        if target.get(parts[-1]) is None:
+            target[parts[-1]] = [] if array_field else None
+    return nested
+
+
+def fetch_page(transport, url, pg, per_page, fields=(), cache=None):
+    """
+    Fetch a single page of results through the shared transport
+
+    A fresh cached copy is returned without touching the API. A stale copy is
+    revalidated with ETag/Last-Modified and reused if the server answers 304.
+
+    :param transport: Transport that retries, paces and times requests
+    :param url: Base API URL including query parameters
+    :param pg: Page number to fetch
+    :param per_page: Number of records per page
+    :param fields: API field paths requested in the URL's projection
+    :param cache: Optional ResponseCache in front of the API
+    :return: Parsed page payload (metadata and results), or None if every attempt failed
+    """
+    logging.info(f"Requesting data for page {pg}")
+
+    # Construct the URL with pagination
+    paginated_url = f"{url}&page={pg}&per_page={per_page}"
+
+    key = cache_key(paginated_url) if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None and cached['fresh']:
+        logging.info(f"Using cached response for page {pg}")
+        data = decode.decode_page(cached['body'], fields=fields, fast=FAST_DECODE)
+    else:
+        headers = cache.conditional_headers(cached) if cached is not None else None
+        response = transport.get(
+            paginated_url,
+            headers=headers,
+            parse=lambda r: decode.decode_page(r.content, fields=fields, fast=FAST_DECODE)
+        )
+        if response is None or not response.ok:
+            status = response.status_code if response is not None else None
+            logging.error(f"Failed to fetch data for page {pg}. Status code: {status}")
+            return None
+
+        # Log the success status code
+        logging.info(f"Successfully fetched data for page {pg}. Status code: {response.status_code}")
+        if response.status_code == 304:
+            cache.refresh(key)
+            data = decode.decode_page(cached['body'], fields=fields, fast=FAST_DECODE)
+        else:
+            data = response.parsed
+            if cache is not None:
+                cache.put(key, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    if fields:
+        data['results'] = [
+            record if decode.is_typed(record) else unflatten_record(record, fields)
+            for record in data['results']
+        ]
+    logging.info(f"Fetched {len(data['results'])} records for page {pg}.")
+    return data
+
+
+def plan_pages(metadata, per_page):
+    """
+    Work out the exact page set from the API response metadata
+
+    :param metadata: The ``metadata`` block of a page response
+    :param per_page: Page size that was requested
+    :return: Number of pages needed to cover every record
+    """
+    total = int(metadata.get('total') or 0)
+    return -(-total // per_page) if per_page else 0
+
+
+def iter_pages(url, concurrency=REQUEST_CONCURRENCY, quota_per_hour=REQUEST_QUOTA_PER_HOUR,
+               per_page=PAGE_SIZE, fields=None, use_cache=CACHE_ENABLED, run_id=None):
+    """
+    Yield the records of every page of the College Scorecard API, in page order
+
+    The first page is fetched on its own and its ``metadata`` decides how many
+    pages to request. The remaining pages are fetched concurrently and paced by
+    a token bucket that follows the API's rate-limit headers, over one pooled
+    session with timeouts and jittered retries. Pages are yielded in page
+    order as soon as they are available, with at most ``2 * concurrency``
+    pages held in memory, so the output is the same regardless of the order
+    in which pages complete.
+
+    Every completed page is recorded in the run's ExtractionJournal, so a
+    retried run only fetches the pages the previous attempt did not finish.
+    The journal is removed once no page is missing, so a later run with the
+    same run id asks the API again.
+
+    :param url: Base API URL including query parameters
+    :param concurrency: Number of pages fetched in parallel
+    :param quota_per_hour: Request quota used until the server reports its own
+    :param per_page: Number of records requested per page
+    :param fields: API field paths to request; defaults to the projection derived
+        from the transform mappings when FIELD_PROJECTION is enabled
+    :param use_cache: Serve pages from the on-disk response cache when possible
+    :param run_id: Journal to resume; defaults to the Airflow run or today's date
+    :return: Generator of per-page lists of school records
+    :raises RuntimeError: If pages are still missing and FAIL_ON_MISSING_PAGES is set
+    """
+    if fields is None:
+        fields = transform.projection_fields(EXTRA_FIELDS) if FIELD_PROJECTION else []
+    url = with_fields(url, fields)
+    logging.info(f"Requesting {len(fields) or 'all'} fields per school")
+
+    journal = ExtractionJournal(run_id)
+    completed = journal.completed_pages()
+    if completed:
+        logging.warning(
+            f"Resuming unfinished run {journal.run_id} (started {journal.started_at()}): replaying "
+            f"{len(completed)} pages from {journal.directory} instead of requesting them from the API. "
+            f"Set EXTRACT_RUN_ID to start a fresh run."
+        )
+
+    limiter = TokenBucket(rate=quota_per_hour / 3600, capacity=REQUEST_BURST)
+    transport = Transport(session=create_session(pool_size=max(1, concurrency)), limiter=limiter)
+    cache = ResponseCache() if use_cache else None
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    try:
+        if 0 in completed:
+            first_page = journal.load_page(0)
+        else:
+            first_page = fetch_page(transport, url, 0, per_page, fields=fields, cache=cache)
+            if first_page is None:
+                raise ConnectionError("Could not fetch the first page to plan the extraction")
+            journal.record_page(0, first_page)
+
+        metadata = first_page.get('metadata', {})
+        # The API may cap the page size below what was requested
+        per_page = int(metadata.get('per_page') or per_page)
+        total_pages = plan_pages(metadata, per_page)
+        journal.record_plan(total_pages, per_page, metadata.get('total'))
+        logging.info(f"API reports {metadata.get('total')} schools; planning {total_pages} pages of {per_page}")
+
+        fetched_records = len(first_page['results'])
+        yield first_page['results']
+        first_page = None
+
+        pending = deque(pg for pg in range(1, total_pages) if pg not in completed)
+        requested = len(pending)
+        futures = {}
+        window = 2 * max(1, concurrency)
+        for pg in range(1, total_pages):
+            # Keep a bounded number of pages in flight ahead of the consumer
+            while pending and len(futures) < window:
+                next_pg = pending.popleft()
+                futures[next_pg] = executor.submit(fetch_page, transport, url, next_pg, per_page,
+                                                   fields=fields, cache=cache)
+
+            if pg in completed:
+                page = journal.load_page(pg)
+            else:
+                page = futures.pop(pg).result()
+                if page is not None:
+                    journal.record_page(pg, page)
+
+            if page:
+                fetched_records += len(page['results'])
+                yield page['results']
+
+        transport.latency.log(f"Latency across {requested + (0 not in completed)} page requests")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        transport.close()
+        if cache is not None:
+            cache.flush()
+
+    missing_pages = journal.missing_pages(total_pages)
+
+    last_run_report.clear()
+    last_run_report.update({
+        'run_id': journal.run_id,
+        'total_records': metadata.get('total'),
+        'per_page': per_page,
+        'planned_pages': total_pages,
+        'resumed_pages': len(completed),
+        'fetched_records': fetched_records,
+        'missing_pages': missing_pages,
+        'request_latency': transport.latency.summary(),
+        'cache': cache.summary() if cache is not None else None,
+        'decoder': decode.DECODER if FAST_DECODE else 'json',
+    })
 
     # Log the total number of records fetched across all pages
-    logging.info(f"Fetched {len(results)} schools across {total_pages} pages.")
+    logging.info(f"Fetched {fetched_records} schools across {total_pages} pages "
+                 f"({len(completed)} replayed from the journal).")
+    if missing_pages:
+        logging.error(f"Pages missing after extraction: {missing_pages}")
+        if FAIL_ON_MISSING_PAGES:
+            raise RuntimeError(f"Extraction incomplete, missing pages {missing_pages}; rerun run {journal.run_id} to fetch only these")
+    else:
+        journal.discard()
+
+
+def request_data(url, **kwargs):
+    """
+    Fetch every page of results from the College Scorecard API into one list
+
+    :param url: Base API URL including query parameters
+    :param kwargs: Options passed through to iter_pages
+    :return: List of school records across all pages, in page order
+    """
+    results = []
+    for records in iter_pages(url, **kwargs):
+        results.extend(records)
     return results
 
 # def request_data(url, params, max_retries=5, backoff_factor=2):
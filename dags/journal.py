@@ -0,0 +1,169 @@
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+from config import JOURNAL_DIR, RUN_RETENTION_DAYS
+import decode
+
+
+def default_run_id():
+    """
+    Identify the current extraction run
+
+    Airflow exports AIRFLOW_CTX_DAG_RUN_ID to the task process, so a retried
+    task finds the journal of the attempt it replaces. Outside Airflow the run
+    is keyed by date, so a rerun on the same day resumes as well.
+
+    :return: Run identifier safe to use as a directory name
+    """
+    run_id = (
+        os.getenv('EXTRACT_RUN_ID')
+        or os.getenv('AIRFLOW_CTX_DAG_RUN_ID')
+        or datetime.now().strftime('%Y%m%d')
+    )
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)
+
+
+def expire_runs(directory, keep=None, retention_days=RUN_RETENTION_DAYS):
+    """
+    Remove the run directories under ``directory`` that nothing wrote to lately
+
+    :param directory: Parent of the per-run directories (JOURNAL_DIR or ARTIFACT_DIR)
+    :param keep: Run id never to remove, e.g. the current run
+    :param retention_days: Age, from the newest file of a run, after which it is removed
+    :return: List of removed run ids
+    """
+    if not os.path.isdir(directory):
+        return []
+    cutoff = time.time() - retention_days * 86400
+    removed = []
+    for run_id in sorted(os.listdir(directory)):
+        path = os.path.join(directory, run_id)
+        if run_id == keep or not os.path.isdir(path):
+            continue
+        newest = max([os.path.getmtime(path)] + [
+            os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)
+        ])
+        if newest < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(run_id)
+    if removed:
+        logging.info(f"Removed {len(removed)} run directories older than {retention_days:g} days from {directory}: {removed}")
+    return removed
+
+
+class ExtractionJournal:
+    """
+    Durable per-run record of the pages an extraction has completed.
+
+    Each completed page is written to its own compressed file and then
+    appended to ``journal.jsonl``; both are fsynced before the page counts as
+    done. A retried run reads the journal and only fetches the pages missing from it.
+    The journal is discarded once an extraction completes, so only unfinished
+    runs are ever replayed; journals of runs abandoned for RUN_RETENTION_DAYS
+    are removed when a new journal is opened.
+    """
+
+    def __init__(self, run_id=None, directory=JOURNAL_DIR):
+        self.run_id = run_id or default_run_id()
+        self.directory = os.path.join(directory, self.run_id)
+        self.manifest_path = os.path.join(self.directory, 'journal.jsonl')
+        self.lock = threading.Lock()
+        expire_runs(directory, keep=self.run_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _page_path(self, pg):
+        return os.path.join(self.directory, f"page_{pg:05d}.json.gz")
+
+    def _append(self, entry):
+        with self.lock:
+            with open(self.manifest_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self):
+        """
+        Read every journal entry, skipping a torn last line from a crashed write
+
+        :return: List of journal entries in the order they were written
+        """
+        if not os.path.exists(self.manifest_path):
+            return []
+        entries = []
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Ignoring incomplete journal line in {self.manifest_path}")
+        return entries
+
+    def completed_pages(self):
+        """
+        :return: Set of page numbers whose payload is safely on disk
+        """
+        return {
+            entry['page'] for entry in self.entries()
+            if entry.get('event') == 'page' and os.path.exists(self._page_path(entry['page']))
+        }
+
+    def record_plan(self, total_pages, per_page, total_records):
+        self._append({
+            'event': 'plan',
+            'total_pages': total_pages,
+            'per_page': per_page,
+            'total_records': total_records,
+            'at': datetime.now().isoformat()
+        })
+
+    def record_page(self, pg, payload):
+        """
+        Durably store a fetched page and mark it complete
+
+        :param pg: Page number
+        :param payload: Parsed page payload (metadata and results, typed or not)
+        """
+        path = self._page_path(pg)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            f.write(decode.encode(payload))
+            f.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        self._append({
+            'event': 'page',
+            'page': pg,
+            'records': len(payload.get('results', [])),
+            'at': datetime.now().isoformat()
+        })
+
+    def load_page(self, pg):
+        with gzip.open(self._page_path(pg), 'rb') as f:
+            return json.loads(f.read())
+
+    def started_at(self):
+        """
+        :return: When the journal's first entry was written (ISO format), or None
+        """
+        entries = self.entries()
+        return entries[0].get('at') if entries else None
+
+    def discard(self):
+        """Remove the journal once its extraction completed; a rerun then starts afresh"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logging.info(f"Extraction run {self.run_id} complete; removed its journal {self.directory}")
+
+    def missing_pages(self, total_pages):
+        """
+        :param total_pages: Number of pages in the plan
+        :return: Sorted list of planned pages not yet completed
+        """
+        completed = self.completed_pages()
+        return [pg for pg in range(total_pages) if pg not in completed]
@@ -1,14 +1,58 @@
+import io
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine, text, Column, Integer, String  # add other components as needed
+import numpy as np
+from sqlalchemy import bindparam, create_engine, text, Column, Integer, String, MetaData, Table, inspect, select, tuple_  # add other components as needed
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import SQLAlchemyError
 import sys
 sys.path.append("C:\DEC_Code\DEC-Hackathon-Team-5\config.py")
-from config import DATABASE_URI, URL
+from config import (
+    DATABASE_URI,
+    URL,
+    LOAD_MODE,
+    LOAD_BATCH_SIZE,
+    LOAD_CONCURRENCY,
+    STAGING_SCHEMA,
+    SWAP_LOCK_TIMEOUT_MS
+)
 import transform
 import extract
+from schema import declared_tables, managed_indexes, conform_dataframe
 import time
 
+# Transformed table keys and their database tables, Dim_School first for the foreign keys
+TABLE_MAPPINGS = {
+    'dim_school': 'Dim_School',
+    'dim_demographics': 'Dim_Demographics',
+    'dim_admission': 'Dim_Admission',
+    'dim_test_scores': 'Dim_TestScores',
+    'dim_transfer_rate': 'Dim_TransferRate',
+    'fact_college_metrics': 'Fact_CollegeMetrics',
+    'fact_programs': 'Fact_Programs'
+}
+
+# Columns identifying a row of each table in incremental mode
+TABLE_KEYS = {
+    'dim_school': ['id'],
+    'dim_demographics': ['school_id'],
+    'dim_admission': ['school_id'],
+    'dim_test_scores': ['school_id'],
+    'dim_transfer_rate': ['school_id'],
+    'fact_college_metrics': ['school_id'],
+    'fact_programs': ['school_id', 'cip_code', 'credential_level']
+}
+
+# Content hash of every row written by an incremental load
+ROW_HASH_TABLE = 'load_row_hashes'
+
+# Table referenced by every other table's foreign key; loaded before the rest
+PARENT_TABLE = 'dim_school'
+
+# Timings of the most recent load, for the pipeline report
+last_load_report = {}
+
 def setup_logging():
     """Configure logging for the data loader"""
     logging.basicConfig(
@@ -17,16 +61,18 @@ def setup_logging():
     )
     return logging.getLogger(__name__)
 
-def create_db_engine(conn):
+def create_db_engine(conn, pool_size=LOAD_CONCURRENCY):
     """
     Safely create a database engine and test the connection
     
     :param conn: Connection string or SQLAlchemy database URL
+    :param pool_size: Connections kept in the pool, one per concurrent table load
     :return: SQLAlchemy engine object
     """
     try:
-        # Use create_engine with proper configuration
-        engine = create_engine(conn, pool_pre_ping=True)
+        # Use create_engine with proper configuration; no overflow keeps the pool bounded
+        pool_options = {} if make_url(conn).get_backend_name() == 'sqlite' else {'pool_size': pool_size, 'max_overflow': 0}
+        engine = create_engine(conn, pool_pre_ping=True, **pool_options)
         
         # Use text() to properly prepare the SQL statement
         with engine.connect() as connection:
@@ -39,27 +85,74 @@ def create_db_engine(conn):
         print(f"Database connection error: {e}")
         raise ConnectionError(f"Failed to establish database connection: {e}")
 
-def load_dataframe(engine, dataframe, table_name, if_exists='replace'):
+def copy_dataframe(connection, dataframe, table_name, batch_size=LOAD_BATCH_SIZE, schema=None):
+    """
+    Stream a DataFrame into an existing PostgreSQL table with COPY FROM STDIN
+    
+    Each batch is rendered to CSV in memory straight from the typed columns,
+    with NaN/None written as the COPY NULL marker, and handed to the driver.
+    
+    :param connection: Open SQLAlchemy connection to PostgreSQL
+    :param dataframe: Pandas DataFrame to load
+    :param table_name: Name of the target database table
+    :param batch_size: Rows rendered per buffer
+    :param schema: Schema of the table, or None for the default schema
+    :return: Number of rows copied
+    """
+    preparer = connection.dialect.identifier_preparer
+    columns = ', '.join(preparer.quote(col) for col in dataframe.columns)
+    target = preparer.quote(table_name) if schema is None else f"{preparer.quote_schema(schema)}.{preparer.quote(table_name)}"
+    sql = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    
+    cursor = connection.connection.cursor()
+    try:
+        for start in range(0, len(dataframe), batch_size):
+            buffer = io.StringIO()
+            dataframe.iloc[start:start + batch_size].to_csv(buffer, index=False, header=False, na_rep='\\N')
+            buffer.seek(0)
+            if hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+    return len(dataframe)
+
+def load_dataframe(engine, dataframe, table_name, if_exists='replace', batch_size=LOAD_BATCH_SIZE, schema=None):
     """
     Load a DataFrame into a specified database table
     
+    PostgreSQL targets are bulk-loaded with COPY FROM STDIN; other databases
+    get INSERTs batched ``batch_size`` rows at a time. NaN is written as NULL
+    either way, without copying the frame to object dtype first.
+    
     :param engine: SQLAlchemy database engine
     :param dataframe: Pandas DataFrame to load
     :param table_name: Name of the target database table
     :param if_exists: Action if table exists ('fail', 'replace', 'append')
+    :param batch_size: Rows per COPY buffer or INSERT batch
+    :param schema: Schema to load into, or None for the default schema
     :return: Number of rows inserted
     """
     try:
-        # Remove any NaN values to prevent database insertion errors
-        dataframe = dataframe.where(pd.notnull(dataframe), None)
-        
-        # Load DataFrame to SQL
-        rows_affected = dataframe.to_sql(
-            name=table_name, 
-            con=engine, 
-            if_exists=if_exists,
-            index=False
-        )
+        with engine.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                # Create (or replace) the table from the frame's dtypes, then COPY the rows
+                dataframe.head(0).to_sql(name=table_name, con=connection, if_exists=if_exists, index=False, schema=schema)
+                rows_affected = copy_dataframe(connection, dataframe, table_name, batch_size, schema)
+            else:
+                # pandas turns NaN into NULL and the driver batches each chunk
+                rows_affected = dataframe.to_sql(
+                    name=table_name, 
+                    con=connection, 
+                    if_exists=if_exists,
+                    index=False,
+                    chunksize=batch_size,
+                    schema=schema
+                )
         
         logging.info(f"Loaded {rows_affected} rows into {table_name}")
         return rows_affected
@@ -67,13 +160,454 @@ def load_dataframe(engine, dataframe, table_name, if_exists='replace'):
         logging.error(f"Error loading data into {table_name}: {e}")
         raise
 
-def load_college_data(raw_data, conn=DATABASE_URI):
+def row_keys(dataframe, key_columns):
+    """
+    Render each row's key as a string, joining composite keys
+    
+    :param dataframe: DataFrame holding the key columns
+    :param key_columns: Key column names
+    :return: Series of key strings aligned with the DataFrame
+    """
+    keys = dataframe[key_columns[0]].astype(str)
+    if len(key_columns) > 1:
+        keys = keys.str.cat([dataframe[col].astype(str) for col in key_columns[1:]], sep='\x1f')
+    return keys
+
+def row_hashes(dataframe):
+    """
+    Hash each row's content
+    
+    :param dataframe: DataFrame to hash
+    :return: Series of signed 64-bit hashes, one per row
+    """
+    hashes = pd.util.hash_pandas_object(dataframe, index=False)
+    return pd.Series(hashes.to_numpy().view('int64'), index=dataframe.index)
+
+def ensure_row_hash_table(connection):
+    """Create the table holding the content hash of every loaded row"""
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {ROW_HASH_TABLE} ("
+        "table_name VARCHAR(100) NOT NULL, "
+        "row_key VARCHAR(255) NOT NULL, "
+        "row_hash BIGINT NOT NULL, "
+        "PRIMARY KEY (table_name, row_key))"
+    ))
+
+def clear_row_hashes(connection, table_names):
+    """
+    Forget the stored row hashes of tables that were rewritten wholesale
+    
+    Replace and swap loads bypass the hashes, so the next incremental load
+    must treat every row of those tables as changed.
+    
+    :param connection: Open connection inside the transaction rewriting the tables
+    :param table_names: Names of the rewritten database tables
+    """
+    if not table_names or not inspect(connection).has_table(ROW_HASH_TABLE):
+        return
+    connection.execute(
+        text(f"DELETE FROM {ROW_HASH_TABLE} WHERE table_name IN :table_names").bindparams(
+            bindparam('table_names', expanding=True)),
+        {'table_names': list(table_names)}
+    )
+
+def _records(dataframe):
+    # Plain Python values with NaN as NULL for executemany
+    return dataframe.astype(object).where(dataframe.notna(), None).to_dict('records')
+
+def _upsert_rows(connection, table, rows, key_columns):
+    dialect = connection.dialect.name
+    keyed = sorted(col.name for col in table.primary_key.columns) == sorted(key_columns)
+    if keyed and dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif keyed and dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # ON CONFLICT needs a primary key on the key columns (tables written by
+        # to_sql in replace mode have none): replace the affected keys instead
+        _delete_keys(connection, table, key_columns, [tuple(row[col] for col in key_columns) for row in rows])
+        connection.execute(table.insert(), rows)
+        return
+    
+    stmt = insert(table)
+    updates = {col.name: stmt.excluded[col.name] for col in table.columns if col.name not in key_columns}
+    if updates:
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=updates)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+    connection.execute(stmt, rows)
+
+def _delete_keys(connection, table, key_columns, keys, batch_size=500):
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        if len(key_columns) == 1:
+            condition = table.c[key_columns[0]].in_([key[0] for key in batch])
+        else:
+            condition = tuple_(*(table.c[col] for col in key_columns)).in_(batch)
+        connection.execute(table.delete().where(condition))
+
+def upsert_dataframe(connection, dataframe, table_name, key_columns):
+    """
+    Bring a table in line with a DataFrame, writing only what changed
+    
+    Each row's content hash is compared with the hash stored for its key on
+    the previous run. New and changed rows are written with
+    INSERT ... ON CONFLICT DO UPDATE; unchanged rows are left alone. Keys
+    present in the table but missing from the DataFrame are returned rather
+    than deleted, so the caller can delete children before their parents.
+    
+    :param connection: Open connection inside a transaction
+    :param dataframe: Current content of the table
+    :param table_name: Name of the target database table
+    :param key_columns: Columns identifying a row
+    :return: Tuple of (counts dictionary, list of stale key tuples)
+    """
+    dataframe = dataframe.drop_duplicates(subset=key_columns)
+    declared = declared_tables({name: name for name in TABLE_MAPPINGS.values()}).get(table_name)
+    if declared is not None:
+        dataframe = conform_dataframe(dataframe, declared)
+    if not inspect(connection).has_table(table_name):
+        # Both declare the primary key ON CONFLICT needs
+        if declared is not None:
+            declared.create(connection)
+            for index in managed_indexes({table_name: declared}):
+                index.create(connection)
+        else:
+            connection.execute(text(pd.io.sql.get_schema(dataframe, table_name, keys=key_columns, con=connection)))
+    table = Table(table_name, MetaData(), autoload_with=connection)
+    
+    keys = row_keys(dataframe, key_columns)
+    hashes = row_hashes(dataframe)
+    
+    existing = {}
+    for row in connection.execute(select(*(table.c[col] for col in key_columns))):
+        existing['\x1f'.join(str(value) for value in row)] = tuple(row)
+    stored = dict(connection.execute(
+        text(f"SELECT row_key, row_hash FROM {ROW_HASH_TABLE} WHERE table_name = :table_name"),
+        {'table_name': table_name}
+    ).fetchall())
+    
+    new = ~keys.isin(existing).to_numpy()
+    changed = np.fromiter(
+        (stored.get(key) != row_hash for key, row_hash in zip(keys, hashes.tolist())),
+        dtype=bool, count=len(keys)
+    ) & ~new
+    stale_keys = [existing[key] for key in existing.keys() - set(keys)]
+    
+    written = new | changed
+    if written.any():
+        _upsert_rows(connection, table, _records(dataframe[written]), key_columns)
+        
+        hash_rows = [
+            {'table_name': table_name, 'row_key': key, 'row_hash': row_hash}
+            for key, row_hash in zip(keys[written], hashes[written].tolist())
+        ]
+        _upsert_rows(connection, Table(ROW_HASH_TABLE, MetaData(), autoload_with=connection), hash_rows, ['table_name', 'row_key'])
+    
+    counts = {
+        'inserted': int(new.sum()),
+        'updated': int(changed.sum()),
+        'deleted': len(stale_keys),
+        'unchanged': int(len(dataframe) - new.sum() - changed.sum())
+    }
+    return counts, stale_keys
+
+def delete_rows(connection, table_name, key_columns, keys):
+    """
+    Delete rows by key together with their stored hashes
+    
+    :param connection: Open connection inside a transaction
+    :param table_name: Name of the target database table
+    :param key_columns: Columns identifying a row
+    :param keys: List of key tuples to delete
+    """
+    if not keys:
+        return
+    _delete_keys(connection, Table(table_name, MetaData(), autoload_with=connection), key_columns, keys)
+    hash_keys = [(table_name, '\x1f'.join(str(value) for value in key)) for key in keys]
+    _delete_keys(connection, Table(ROW_HASH_TABLE, MetaData(), autoload_with=connection), ['table_name', 'row_key'], hash_keys)
+
+def load_college_data_incremental(transformed_data, conn=DATABASE_URI, engine=None):
+    """
+    Incrementally load transformed tables, writing only new or changed rows
+    
+    Tables are upserted parents first and stale rows are deleted children
+    first, all in one transaction, so foreign keys hold and a failed run
+    leaves the previous load intact.
+    
+    :param transformed_data: Dictionary of transformed DataFrames keyed like TABLE_MAPPINGS
+    :param conn: Database connection configuration
+    :param engine: Engine to reuse instead of creating one from ``conn``
+    :return: Dictionary of inserted, updated, deleted and unchanged counts per table
+    """
+    logger = setup_logging()
+    engine = engine or create_db_engine(conn)
+    
+    load_results = {}
+    stale_keys = {}
+    with engine.begin() as connection:
+        ensure_row_hash_table(connection)
+        for key, table_name in TABLE_MAPPINGS.items():
+            if key not in transformed_data:
+                continue
+            load_results[key], stale_keys[key] = upsert_dataframe(
+                connection,
+                transformed_data[key],
+                table_name,
+                TABLE_KEYS[key]
+            )
+            logger.info(f"{table_name}: {load_results[key]}")
+        
+        for key in reversed(list(stale_keys)):
+            delete_rows(connection, TABLE_MAPPINGS[key], TABLE_KEYS[key], stale_keys[key])
+    
+    logger.info("Incremental data loading completed successfully")
+    return load_results
+
+def create_declared_tables(engine, keys, table_names=TABLE_MAPPINGS, schema=None):
+    """
+    Recreate the tables declared in init.sql with their types and keys
+    
+    Existing tables are dropped children first, then the declared ones are
+    created parents first. Tables init.sql does not declare are left to pandas.
+    When production tables are recreated, their stored row hashes are cleared
+    in the same transaction.
+    
+    :param engine: SQLAlchemy database engine
+    :param keys: Keys of the tables to create, parents first
+    :param table_names: Database table name per key
+    :param schema: Schema to create them in, or None for the default schema
+    :return: Dictionary of created Table per key
+    """
+    tables = declared_tables({TABLE_MAPPINGS[key]: table_names[key] for key in keys}, schema)
+    declared = {key: tables[TABLE_MAPPINGS[key]] for key in keys if TABLE_MAPPINGS[key] in tables}
+    rewritten = [TABLE_MAPPINGS[key] for key in keys if schema is None and table_names[key] == TABLE_MAPPINGS[key]]
+    if not declared and not rewritten:
+        return declared
+    
+    # CASCADE drops the foreign keys of tables outside this load that point here
+    cascade = ' CASCADE' if engine.dialect.name == 'postgresql' else ''
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for key in reversed(keys):
+            if key in declared:
+                connection.execute(text(f"DROP TABLE IF EXISTS {preparer.format_table(declared[key])}{cascade}"))
+        for key in keys:
+            if key in declared:
+                declared[key].create(connection)
+        clear_row_hashes(connection, rewritten)
+    return declared
+
+def build_indexes(engine, declared):
+    """
+    Create the managed indexes of loaded tables
+    
+    :param engine: SQLAlchemy database engine
+    :param declared: Dictionary of Table per key, as from create_declared_tables()
+    :return: Seconds spent building the indexes
+    """
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for index in managed_indexes({TABLE_MAPPINGS[key]: table for key, table in declared.items()}):
+            index.create(connection)
+    return round(time.perf_counter() - started, 3)
+
+def load_tables(engine, transformed_data, concurrency=LOAD_CONCURRENCY, table_names=TABLE_MAPPINGS, schema=None,
+                create_indexes=True):
+    """
+    Load the star-schema tables, Dim_School first and the dependent tables concurrently
+    
+    Tables are created from init.sql's declared types and keys before they
+    are filled, and the managed indexes are built once the data is in.
+    Every dependent table references Dim_School, so it is loaded on its own
+    first; the others share the engine's pool, ``concurrency`` at a time.
+    SQLite allows a single writer, so it loads them one after another.
+    
+    :param engine: SQLAlchemy database engine
+    :param transformed_data: Dictionary of transformed DataFrames keyed like TABLE_MAPPINGS
+    :param concurrency: Maximum number of tables loaded at once
+    :param table_names: Database table name per key, TABLE_MAPPINGS unless loading elsewhere
+    :param schema: Schema to load into, or None for the default schema
+    :param create_indexes: Build the managed indexes after loading
+    :return: Dictionary of rows loaded per table
+    """
+    if engine.dialect.name == 'sqlite':
+        concurrency = 1
+    table_seconds = {}
+    started = time.perf_counter()
+    declared = create_declared_tables(engine, [key for key in TABLE_MAPPINGS if key in transformed_data], table_names, schema)
+    
+    def load_one(key):
+        started = time.perf_counter()
+        if key in declared:
+            dataframe = conform_dataframe(transformed_data[key], declared[key])
+            rows = load_dataframe(engine, dataframe, table_names[key], if_exists='append', schema=schema)
+        else:
+            rows = load_dataframe(engine, transformed_data[key], table_names[key], schema=schema)
+        table_seconds[key] = round(time.perf_counter() - started, 3)
+        logging.info(f"Loaded {table_names[key]} in {table_seconds[key]}s")
+        return rows
+    
+    load_results = {}
+    if PARENT_TABLE in transformed_data:
+        load_results[PARENT_TABLE] = load_one(PARENT_TABLE)
+    
+    dependents = [key for key in TABLE_MAPPINGS if key != PARENT_TABLE and key in transformed_data]
+    # Largest first, so the slowest table never waits for a free connection
+    dependents.sort(key=lambda key: len(transformed_data[key]), reverse=True)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(dependents)))) as executor:
+        for key, rows in zip(dependents, executor.map(load_one, dependents)):
+            load_results[key] = rows
+    
+    index_seconds = build_indexes(engine, declared) if create_indexes else 0
+    
+    last_load_report.clear()
+    last_load_report.update({
+        'concurrency': concurrency,
+        'table_seconds': table_seconds,
+        'index_seconds': index_seconds,
+        'wall_seconds': round(time.perf_counter() - started, 3)
+    })
+    logging.info(f"Loaded {len(load_results)} tables in {last_load_report['wall_seconds']}s "
+                 f"(slowest table {max(table_seconds.values(), default=0)}s)")
+    return load_results
+
+def staging_table_names(engine):
+    """
+    Staging table name per key
+    
+    PostgreSQL stages under the production names in STAGING_SCHEMA; SQLite has
+    no schemas, so its staging tables carry a ``staging_`` prefix instead.
+    
+    :param engine: SQLAlchemy database engine
+    :return: Tuple of (table name per key, staging schema or None)
+    """
+    if engine.dialect.name == 'postgresql':
+        return dict(TABLE_MAPPINGS), STAGING_SCHEMA
+    return {key: f"staging_{table_name}" for key, table_name in TABLE_MAPPINGS.items()}, None
+
+def swap_staging_tables(engine, keys, table_names, schema, retries=3):
+    """
+    Replace the production tables with the staged ones in one transaction
+    
+    Only drops and renames run inside the transaction, so readers block for
+    milliseconds; if it fails, the previous tables are left as they were.
+    The swapped tables' row hashes are cleared in the same transaction.
+    SQLite index names are global rather than per schema, so there the
+    managed indexes are built inside the swap, under the production names.
+    On PostgreSQL the swap gives up after SWAP_LOCK_TIMEOUT_MS waiting behind
+    a long-running reader and tries again. Views and foreign keys of other
+    objects that depend on a production table are dropped with it on
+    PostgreSQL, as create_declared_tables does; SQLite views are recreated.
+    
+    :param engine: SQLAlchemy database engine
+    :param keys: Keys of the staged tables, parents first
+    :param table_names: Staging table name per key
+    :param schema: Staging schema, or None when staged by prefix
+    :param retries: Attempts before the error is raised
+    """
+    # CASCADE drops the views and foreign keys of objects outside this load that depend on production
+    cascade = ' CASCADE' if engine.dialect.name == 'postgresql' else ''
+    preparer = engine.dialect.identifier_preparer
+    for attempt in range(retries):
+        started = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                if schema is not None:
+                    connection.execute(text(f"SET LOCAL lock_timeout = {int(SWAP_LOCK_TIMEOUT_MS)}"))
+                    production = connection.dialect.default_schema_name
+                else:
+                    # pysqlite only opens a transaction by itself before DML
+                    connection.exec_driver_sql("BEGIN")
+                    # SQLite re-checks every view on a rename and has no CASCADE, so the
+                    # views are set aside and recreated over the swapped tables
+                    views = connection.execute(text(
+                        "SELECT name, sql FROM sqlite_master WHERE type = 'view'"
+                    )).fetchall()
+                    for name, _ in views:
+                        connection.execute(text(f"DROP VIEW {preparer.quote(name)}"))
+                
+                # Children first, so no foreign key points at a dropped table
+                for key in reversed(keys):
+                    connection.execute(text(f"DROP TABLE IF EXISTS {preparer.quote(TABLE_MAPPINGS[key])}{cascade}"))
+                for key in keys:
+                    if schema is not None:
+                        connection.execute(text(
+                            f"ALTER TABLE {preparer.quote_schema(schema)}.{preparer.quote(table_names[key])} "
+                            f"SET SCHEMA {preparer.quote_schema(production)}"
+                        ))
+                    else:
+                        connection.execute(text(
+                            f"ALTER TABLE {preparer.quote(table_names[key])} RENAME TO {preparer.quote(TABLE_MAPPINGS[key])}"
+                        ))
+                if schema is None:
+                    for _, sql in views:
+                        connection.exec_driver_sql(sql)
+                    production_tables = declared_tables({TABLE_MAPPINGS[key]: TABLE_MAPPINGS[key] for key in keys})
+                    for index in managed_indexes(production_tables):
+                        index.create(connection)
+                clear_row_hashes(connection, [TABLE_MAPPINGS[key] for key in keys])
+            logging.info(f"Swapped {len(keys)} staged tables in {time.perf_counter() - started:.3f}s")
+            return
+        except SQLAlchemyError as e:
+            if attempt + 1 == retries:
+                raise
+            logging.warning(f"Table swap failed: {e}. Retrying ({attempt + 1}/{retries})...")
+            time.sleep(1)
+
+def reset_staging(engine, table_names, schema):
+    """
+    Clear what a failed staged load may have left behind
+    
+    :param engine: SQLAlchemy database engine
+    :param table_names: Staging table name per key
+    :param schema: Staging schema, or None when staged by prefix
+    """
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        if schema is not None:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {preparer.quote_schema(schema)} CASCADE"))
+            connection.execute(text(f"CREATE SCHEMA {preparer.quote_schema(schema)}"))
+        else:
+            for key in reversed(list(table_names)):
+                connection.execute(text(f"DROP TABLE IF EXISTS {preparer.quote(table_names[key])}"))
+
+def load_college_data_swap(transformed_data, conn=DATABASE_URI, engine=None):
+    """
+    Load every table into staging, then swap them into production at once
+    
+    Staging tables are created from init.sql with their keys, so bad data
+    fails before production is touched, and the keys move with the tables.
+    Production keeps serving the previous snapshot, FK chain included, for
+    the whole load; a run that fails before the swap leaves it untouched.
+    
+    :param transformed_data: Dictionary of transformed DataFrames keyed like TABLE_MAPPINGS
+    :param conn: Database connection configuration
+    :param engine: Engine to reuse instead of creating one from ``conn``
+    :return: Dictionary of rows loaded per table
+    """
+    logger = setup_logging()
+    engine = engine or create_db_engine(conn)
+    table_names, schema = staging_table_names(engine)
+    keys = [key for key in TABLE_MAPPINGS if key in transformed_data]
+    reset_staging(engine, table_names, schema)
+    load_results = load_tables(engine, transformed_data, table_names=table_names, schema=schema,
+                               create_indexes=schema is not None)
+    
+    swap_staging_tables(engine, keys, table_names, schema)
+    logger.info("Staged data loading completed successfully")
+    return load_results
+
+def load_college_data(raw_data, conn=DATABASE_URI, mode=LOAD_MODE):
     """
     Comprehensive function to transform and load college data
     
-    :param raw_data: Input DataFrame with college data
+    :param raw_data: Input DataFrame with college data, or the dictionary of
+        tables transform_schools_data already produced
     :param DATABASE_URI: Database connection configuration
-    :return: Dictionary of rows loaded per table
+    :param mode: 'replace' rewrites every table, 'incremental' upserts changed rows only,
+        'swap' loads into staging and swaps the tables in atomically
+    :return: Dictionary of rows loaded per table (counts per table in incremental mode)
     """
     # Setup logging
     logger = setup_logging()
@@ -85,28 +619,15 @@ def load_college_data(raw_data, conn=DATABASE_URI):
         from transform import transform_schools_data
         
         # Transform data
-        transformed_data = transform_schools_data(raw_data)
-        
-        # Create database engine
-        engine = create_db_engine(conn)
+        transformed_data = raw_data if isinstance(raw_data, dict) else transform_schools_data(raw_data)
         
-        # Load each transformed DataFrame
-        load_results = {}
-        table_mappings = {
-            'dim_school': 'Dim_School',
-            'dim_demographics': 'Dim_Demographics',
-            'dim_admission': 'Dim_Admission',
-            'dim_test_scores': 'Dim_TestScores',
-            'dim_transfer_rate': 'Dim_TransferRate',
-            'fact_college_metrics': 'Fact_CollegeMetrics'
-        }
+        if mode == 'incremental':
+            return load_college_data_incremental(transformed_data, conn, engine=engine)
+        if mode == 'swap':
+            return load_college_data_swap(transformed_data, conn, engine=engine)
         
-        for key, table_name in table_mappings.items():
-            load_results[key] = load_dataframe(
-                engine, 
-                transformed_data[key], 
-                table_name
-            )
+        # Load each transformed DataFrame (Fact_Programs is only present when built from the raw records)
+        load_results = load_tables(engine, transformed_data)
         
         logger.info("Data loading completed successfully")
         return load_results
@@ -118,6 +639,99 @@ def load_college_data(raw_data, conn=DATABASE_URI):
         logger.error(f"Error in data loading process: {e}")
         raise
 
+def load_stream_incremental(engine, table_chunks):
+    """
+    Upsert chunked tables in one transaction, then delete the rows no chunk carried
+    
+    :param engine: SQLAlchemy database engine
+    :param table_chunks: Iterable of dictionaries of transformed DataFrames
+    :return: Dictionary of inserted, updated, deleted and unchanged counts per table
+    """
+    load_results = {}
+    stale_keys = {}
+    with engine.begin() as connection:
+        ensure_row_hash_table(connection)
+        for tables in table_chunks:
+            for key, table_name in TABLE_MAPPINGS.items():
+                if key not in tables or tables[key].empty:
+                    continue
+                counts, stale = upsert_dataframe(connection, tables[key], table_name, TABLE_KEYS[key])
+                # Rows written by earlier chunks look stale to later ones, but
+                # not to the chunk that wrote them: stale means stale for every chunk
+                stale_keys[key] = stale_keys.get(key, set(stale)) & set(stale)
+                totals = load_results.setdefault(key, dict.fromkeys(counts, 0))
+                for name, value in counts.items():
+                    totals[name] += value
+        
+        for key in reversed(list(stale_keys)):
+            delete_rows(connection, TABLE_MAPPINGS[key], TABLE_KEYS[key], list(stale_keys[key]))
+            load_results[key]['deleted'] = len(stale_keys[key])
+    return load_results
+
+def load_college_data_stream(table_chunks, conn=DATABASE_URI, mode=LOAD_MODE):
+    """
+    Load star-schema tables that arrive in chunks, e.g. from transform.stream_schools_data
+    
+    Only one chunk is held in memory at a time, and the tables end up as
+    load_college_data would leave them in ``mode``. 'replace' recreates the
+    declared tables before the first chunk, appends every chunk conformed to
+    its declared types, Dim_School first, and builds the managed indexes at
+    the end. 'swap' does the same in the staging tables and swaps them in
+    once the stream is done. 'incremental' upserts each chunk in a single
+    transaction, held open for the whole stream, and then deletes the rows
+    no chunk carried.
+    
+    :param table_chunks: Iterable of dictionaries of transformed DataFrames
+    :param conn: Database connection configuration
+    :param mode: 'replace', 'incremental' or 'swap', as for load_college_data
+    :return: Dictionary of rows loaded per table (counts per table in incremental mode)
+    """
+    logger = setup_logging()
+    engine = create_db_engine(conn)
+    started = time.perf_counter()
+    if mode == 'incremental':
+        load_results = load_stream_incremental(engine, table_chunks)
+        logger.info(f"Streaming incremental load completed: {load_results}")
+        return load_results
+    
+    keys = list(TABLE_MAPPINGS)
+    table_names, schema = staging_table_names(engine) if mode == 'swap' else (TABLE_MAPPINGS, None)
+    declared = None
+    load_results = {}
+    for tables in table_chunks:
+        if declared is None:
+            # Tables are only recreated once data arrives; an empty stream leaves them alone
+            if mode == 'swap':
+                reset_staging(engine, table_names, schema)
+            declared = create_declared_tables(engine, keys, table_names, schema)
+        for key in keys:
+            if key not in tables or tables[key].empty:
+                continue
+            if key in declared:
+                dataframe = conform_dataframe(tables[key], declared[key])
+                rows = load_dataframe(engine, dataframe, table_names[key], if_exists='append', schema=schema)
+            else:
+                if_exists = 'append' if key in load_results else 'replace'
+                rows = load_dataframe(engine, tables[key], table_names[key], if_exists=if_exists, schema=schema)
+            load_results[key] = load_results.get(key, 0) + (rows or 0)
+    
+    if declared is None:
+        logger.warning("Streaming load received no rows; the existing tables were left as they were")
+        return load_results
+    
+    # SQLite staging builds its indexes inside the swap (see swap_staging_tables)
+    index_seconds = build_indexes(engine, declared) if mode != 'swap' or schema is not None else 0
+    if mode == 'swap':
+        swap_staging_tables(engine, keys, table_names, schema)
+    
+    last_load_report.clear()
+    last_load_report.update({
+        'index_seconds': index_seconds,
+        'wall_seconds': round(time.perf_counter() - started, 3)
+    })
+    logger.info(f"Streaming load completed: {load_results}")
+    return load_results
+
 # Example usage
 def main():
     # Example database configuration
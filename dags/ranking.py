@@ -0,0 +1,661 @@
+import json
+import logging
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from config import RANKING_WEIGHTS
+
+# Metrics the ranking score is built from. For each: the process_data columns
+# it can be read from (the first one present wins), whether a lower value is
+# better, the column its normalized score is stored in and its default weight
+METRICS = {
+    'admission': {'columns': ['Admission_Rate_Overall'], 'reverse': True,
+                  'score_column': 'admission_score', 'weight': 0.25},
+    'completion': {'columns': ['Completion_Rate'], 'reverse': False,
+                   'score_column': 'completion_score', 'weight': 0.20},
+    'sat': {'columns': ['SAT_Score', 'SAT_average_overall'], 'reverse': False,
+            'score_column': 'sat_score', 'weight': 0.15},
+    'act': {'columns': ['ACT_Score', 'ACT_midpoint_cumulative'], 'reverse': False,
+            'score_column': 'act_score', 'weight': 0.10},
+    'size': {'columns': ['Student_Size'], 'reverse': False,
+             'score_column': 'size_score', 'weight': 0.10},
+    'tuition': {'columns': ['In_State_Tuition'], 'reverse': True,
+                'score_column': 'in_state_tuition_score', 'weight': 0.10},
+    'financial_aid': {'columns': ['Pell_Grant_Rate'], 'reverse': False,
+                      'score_column': 'financial_aid_score', 'weight': 0.10}
+}
+
+# Segments ranked on their own, and the column each segment's rank is stored in
+SEGMENTS = {
+    'State': 'State_Rank',
+    'type_of_school': 'Type_Rank'
+}
+
+
+def resolve_weights(weights=None):
+    """
+    Merge weight overrides into the default METRICS weights
+
+    Args:
+        weights (dict): Weight per metric name, RANKING_WEIGHTS by default
+
+    Returns:
+        dict: Weight per metric, for every metric in METRICS
+    """
+    weights = RANKING_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown ranking metrics {sorted(unknown)}; expected some of {sorted(METRICS)}")
+    resolved = {metric: float(weights.get(metric, spec['weight'])) for metric, spec in METRICS.items()}
+    if any(weight < 0 for weight in resolved.values()):
+        raise ValueError(f"Ranking weights must not be negative: {resolved}")
+    return resolved
+
+
+def input_columns():
+    """
+    Returns:
+        list: Every column the ranking may read, segment columns included
+    """
+    columns = [col for spec in METRICS.values() for col in spec['columns']]
+    return columns + list(SEGMENTS)
+
+
+def metric_sources(columns, weights):
+    """
+    Map each weighted metric to the first of its columns present in the input
+
+    Metrics with no weight, or none of whose columns exist, are left out
+    (and logged) rather than scored as zero.
+
+    Args:
+        columns (iterable): Column names of the input DataFrame
+        weights (dict): Weight per metric, as from resolve_weights()
+
+    Returns:
+        dict: Source column per metric, in METRICS order
+    """
+    available = set(columns)
+    sources = {}
+    for metric, spec in METRICS.items():
+        if not weights[metric]:
+            continue
+        source = next((col for col in spec['columns'] if col in available), None)
+        if source is None:
+            logging.warning(f"No column for ranking metric {metric} ({', '.join(spec['columns'])}); it is left out")
+            continue
+        sources[metric] = source
+    return sources
+
+
+def metric_values(df, sources):
+    """
+    Returns:
+        np.ndarray: float64 raw values of shape (rows, metrics), column-major, NaN where missing
+    """
+    block = np.empty((len(df), len(sources)), dtype='float64', order='F')
+    for i, col in enumerate(sources.values()):
+        block[:, i] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return block
+
+
+def metric_bounds(block):
+    """
+    Returns:
+        tuple: Per-metric minimum and maximum of ``block``, NaN for a metric nobody reports
+    """
+    if not len(block):
+        return np.full(block.shape[1], np.nan), np.full(block.shape[1], np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+
+
+def scale_metrics(block, low, high, metrics):
+    """
+    Min-max scale raw metric values to [0, 1] in place, reversing the metrics where lower is better
+
+    Returns:
+        np.ndarray: ``block``
+    """
+    span = high - low
+    # After subtracting the minimum a single-valued metric is already 0
+    np.subtract(block, low, out=block)
+    np.divide(block, span, out=block, where=span > 0)
+    reverse = np.array([METRICS[metric]['reverse'] for metric in metrics], dtype=bool)
+    block[:, reverse] = 1 - block[:, reverse]
+    return block
+
+
+def normalized_scores(df, sources):
+    """
+    Min-max scale every metric to [0, 1] as one 2-D block
+
+    Metrics where lower is better are reversed. A missing value stays NaN,
+    and a metric with a single distinct value scores 0 everywhere.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame
+        sources (dict): Source column per metric, as from metric_sources()
+
+    Returns:
+        np.ndarray: float64 array of shape (rows, metrics), columns in ``sources`` order
+    """
+    block = metric_values(df, sources)
+    if not len(df):
+        return block
+    return scale_metrics(block, *metric_bounds(block), list(sources))
+
+
+def weighted_score(block, weights):
+    """
+    Combine normalized metric scores into one score per row
+
+    A missing metric is scored at that metric's median, so a school is
+    neither rewarded nor penalised for not reporting it. Weights are scaled
+    to sum to 1, so the score stays in [0, 1].
+
+    Args:
+        block (np.ndarray): Normalized scores, as from normalized_scores()
+        weights (np.ndarray): Weight per column of ``block``
+
+    Returns:
+        np.ndarray: float64 score per row
+    """
+    weights = np.asarray(weights, dtype='float64')
+    if not block.shape[1] or not weights.sum():
+        return np.zeros(len(block))
+    return impute_medians(block) @ (weights / weights.sum())
+
+
+def metric_medians(block):
+    """
+    Returns:
+        np.ndarray: Per-metric median of ``block``, 0 for a metric nobody reports
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nan_to_num(np.nanmedian(block, axis=0)) if len(block) else np.zeros(block.shape[1])
+
+
+def impute_medians(block):
+    """
+    Returns:
+        np.ndarray: Copy of ``block`` with each missing score replaced by its metric's median (0 if none)
+    """
+    return np.where(np.isnan(block), metric_medians(block), block)
+
+
+def score_order(scores):
+    """
+    Returns:
+        np.ndarray: Row positions by descending score; ties keep input order
+    """
+    return np.argsort(-scores, kind='stable')
+
+
+def segment_ranks(order, codes):
+    """
+    Rank rows within segments, reusing the national score order
+
+    A stable sort of the segment codes taken in score order groups the rows
+    by segment and keeps them in score order within it (small integer codes
+    are radix-sorted); each row's rank is then its position minus the
+    position where its segment starts.
+
+    Args:
+        order (np.ndarray): Row positions by descending score, as from score_order()
+        codes (np.ndarray): Integer segment code per row, -1 where the segment is missing
+
+    Returns:
+        pd.arrays.IntegerArray: Rank within the row's segment, NA where the segment is missing
+    """
+    n = len(order)
+    ranks = np.zeros(n, dtype='int64')
+    if n:
+        if codes.max() < np.iinfo('int16').max:
+            codes = codes.astype('int16')
+        by_segment = np.argsort(codes[order], kind='stable')
+        segment_order = order[by_segment]
+        sorted_codes = codes[segment_order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        segment_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+        ranks[segment_order] = np.arange(n) - segment_start + 1
+    return pd.arrays.IntegerArray(ranks, codes < 0)
+
+
+def rank_colleges(df, weights=None, segments=None):
+    """
+    Score and rank colleges nationally and within each segment
+
+    The input is not copied or reordered: the result is the input's columns
+    plus one score column per metric, ``ranking_score``, the national ``Rank``
+    and a rank column per segment (see SEGMENTS). Use top_k() to read the
+    best-ranked rows.
+
+    Args:
+        df (pd.DataFrame): Output of process_data (or clean_college_data)
+        weights (dict): Weight per metric, RANKING_WEIGHTS over the METRICS defaults by default
+        segments (dict): Rank column per segment column, SEGMENTS by default
+
+    Returns:
+        pd.DataFrame: Ranked frame, sharing its input columns with ``df``
+    """
+    weights = resolve_weights(weights)
+    sources = metric_sources(df.columns, weights)
+
+    block = normalized_scores(df, sources)
+    scores = weighted_score(block, [weights[metric] for metric in sources])
+
+    # One sort by score serves the national rank and every segment's rank
+    order = score_order(scores)
+    national = np.empty(len(order), dtype='int64')
+    national[order] = np.arange(1, len(order) + 1)
+    return _ranked_frame(df, sources, block, scores, national, order, segments)
+
+
+def _ranked_frame(df, sources, block, scores, national, order, segments=None):
+    # The input's columns plus score columns, ranking_score, Rank and segment ranks
+    segments = SEGMENTS if segments is None else segments
+    columns = dict(df.items())
+    for i, metric in enumerate(sources):
+        columns[METRICS[metric]['score_column']] = block[:, i]
+    columns['ranking_score'] = scores
+    columns['Rank'] = national
+    for segment, rank_column in segments.items():
+        if segment in df.columns:
+            codes, _ = pd.factorize(df[segment])
+            columns[rank_column] = segment_ranks(order, codes)
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def top_k(ranked, k, score_column='ranking_score'):
+    """
+    Best ``k`` rows by score without sorting the whole frame
+
+    np.partition finds the k-th highest score in linear time; only the k
+    rows selected with it are then sorted. Ties go to the earlier row, as
+    with nlargest. Filter ``ranked`` first for a segment's top k, e.g.
+    ``top_k(ranked[ranked['State'] == 'NY'], 10)``.
+
+    Args:
+        ranked (pd.DataFrame): Output of rank_colleges
+        k (int): Number of rows
+        score_column (str): Column to rank by
+
+    Returns:
+        pd.DataFrame: Up to ``k`` rows, highest score first
+    """
+    scores = np.nan_to_num(ranked[score_column].to_numpy(dtype='float64', na_value=np.nan), nan=-np.inf)
+    k = min(k, len(scores))
+    if k <= 0:
+        return ranked.iloc[:0]
+    if k < len(scores):
+        # Everything above the k-th best score, then the first rows tied with it
+        threshold = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > threshold)
+        candidates = np.r_[above, np.flatnonzero(scores == threshold)[:k - len(above)]]
+    else:
+        candidates = np.arange(len(scores))
+    # Sort only the selected rows, by score and then by position
+    best = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return ranked.iloc[best]
+
+
+def weight_matrix(weight_sets, metrics):
+    """
+    Stack weight scenarios into one matrix
+
+    Args:
+        weight_sets (list): Weight per metric per scenario, as from resolve_weights()
+        metrics (list): Metrics to keep, in column order
+
+    Returns:
+        np.ndarray: float64 array of shape (metrics, scenarios), each column scaled to sum to 1
+    """
+    weights = np.array([[weight_set[metric] for metric in metrics] for weight_set in weight_sets],
+                       dtype='float64').T.reshape(len(metrics), len(weight_sets))
+    totals = weights.sum(axis=0)
+    if not totals.all():
+        raise ValueError("Every weight scenario needs a positive weight on a metric the data has")
+    return weights / totals
+
+
+def what_if_ranks(df, weight_sets):
+    """
+    Rank every school under many weight scenarios at once
+
+    The metric matrix is normalized (and its gaps imputed) once, then all
+    scenarios are scored with a single (schools x metrics) @ (metrics x
+    scenarios) matrix product. Each scenario's ranks match rank_colleges
+    with the same weights, except that scores closer than 1e-12 count as tied.
+
+    Args:
+        df (pd.DataFrame): Output of process_data (or clean_college_data)
+        weight_sets (list): Weight overrides per scenario, e.g.
+            ``[{'completion': w} for w in np.linspace(0, 0.6, 1000)]``
+
+    Returns:
+        np.ndarray: int32 array of shape (scenarios, schools) with 1-based ranks, schools in ``df`` order
+    """
+    weight_sets = [resolve_weights(weight_set) for weight_set in weight_sets]
+    # Every metric any scenario weights, so scenarios share one metric matrix
+    any_weight = {metric: max(weight_set[metric] for weight_set in weight_sets) for metric in METRICS}
+    sources = metric_sources(df.columns, any_weight)
+    filled = impute_medians(normalized_scores(df, sources))
+    # (scenarios x schools) in row-major order, so each scenario's scores are contiguous
+    scores = weight_matrix(weight_sets, list(sources)).T @ filled.T
+    return _rank_rows(scores)
+
+
+# Bits of the sort key holding the school's position; the score takes the
+# next _SCORE_BITS, so the largest key, 2**63 - 1, still fits in an int64
+_POSITION_BITS = 23
+_SCORE_BITS = 40
+
+
+def _rank_rows(scores):
+    # Rank each row of a (scenarios, schools) score matrix, highest first and
+    # ties in school order. Scores lie in [0, 1], so (1 - score) quantized to
+    # 2**40 - 1 steps with the position in the low bits is a unique, positive
+    # int64 key (a score of 0 must not reach the sign bit), and
+    # an unstable sort of the keys is far cheaper than a stable argsort.
+    n_scenarios, n_schools = scores.shape
+    positions = np.arange(1, n_schools + 1, dtype='int32')
+    ranks = np.empty((n_scenarios, n_schools), dtype='int32')
+    for row, row_scores in enumerate(scores):
+        if n_schools >= 1 << _POSITION_BITS:
+            order = np.argsort(-row_scores, kind='stable')
+        else:
+            keys = np.rint((1 - np.clip(row_scores, 0, 1)) * float(2 ** _SCORE_BITS - 1)).astype('int64')
+            keys <<= _POSITION_BITS
+            keys |= np.arange(n_schools)
+            keys.sort()
+            order = keys & ((1 << _POSITION_BITS) - 1)
+        ranks[row, order] = positions
+    return ranks
+
+
+def rank_stability(df, weight_sets, k=50):
+    """
+    Summarise how each school's rank moves across weight scenarios
+
+    Args:
+        df (pd.DataFrame): Output of process_data (or clean_college_data)
+        weight_sets (list): Weight overrides per scenario, as for what_if_ranks
+        k (int): Size of the top list whose membership is measured
+
+    Returns:
+        pd.DataFrame: Per school (indexed like ``df``): its rank under the
+        configured weights (``base_rank``), best, worst, median and mean rank,
+        rank standard deviation, and ``top_k_share``, the share of scenarios
+        that place it in the top ``k``
+    """
+    ranks = what_if_ranks(df, [RANKING_WEIGHTS, *weight_sets])
+    base, scenarios = ranks[0], ranks[1:]
+    return pd.DataFrame({
+        'base_rank': base,
+        'best_rank': scenarios.min(axis=0),
+        'worst_rank': scenarios.max(axis=0),
+        'median_rank': np.median(scenarios, axis=0),
+        'mean_rank': scenarios.mean(axis=0),
+        'rank_std': scenarios.std(axis=0),
+        'top_k_share': (scenarios <= k).mean(axis=0)
+    }, index=df.index)
+
+
+class RankingState:
+    """
+    National ranking kept between runs and updated instead of rebuilt.
+
+    The state holds every school's raw metric values, the per-metric min/max
+    its scores were normalized with, the medians missing metrics are imputed
+    with, and the sorted score index: state rows ordered by (-score, row).
+    rank() diffs a frame against the stored values and re-scores only the
+    changed, new and removed schools, moving each one in the index found by
+    binary search (O(k log n) searches for k changed schools, plus an array
+    shift). Only the ranks between a school's old and new position are
+    rewritten. A change that moves a metric's min or max shifts every score,
+    so it triggers a full renormalization, as does a change in the metric
+    columns. Imputation medians are only refreshed then, so after
+    incremental updates the ranks can differ slightly from a fresh
+    rank_colleges. Ties go to the school seen first.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = resolve_weights(weights)
+        self.sources = None
+        self.ids = pd.Index([])
+        self.values = np.empty((0, 0))
+        self.active = np.empty(0, dtype=bool)
+        self.low = self.high = self.medians = np.empty(0)
+        self.scores = np.empty(0)
+        self.ranks = np.empty(0, dtype='int64')
+        # Sorted score index: -score and row of every ranked school, best first
+        self.order_scores = np.empty(0)
+        self.order_rows = np.empty(0, dtype='int64')
+        # What the last rank() call did, for logging and the pipeline report
+        self.last_update = {}
+
+    # Arrays save() writes next to the JSON header
+    ARRAYS = ('values', 'active', 'low', 'high', 'medians', 'scores', 'ranks', 'order_scores', 'order_rows')
+
+    @classmethod
+    def load(cls, path, weights=None):
+        """
+        Read a saved state
+
+        The file holds plain arrays (np.savez, read without pickle), so
+        loading it cannot run code.
+
+        Args:
+            path (str): File written by save()
+            weights (dict): Weight overrides the state must have been built with
+
+        Returns:
+            RankingState: The saved state, or an empty one if there is none, it
+            cannot be read, or it was built with other weights
+        """
+        state = cls(weights)
+        if not os.path.exists(path):
+            return state
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                header = json.loads(saved['header'].item())
+                if header['weights'] != state.weights:
+                    logging.info(f"Ranking weights changed since {path} was saved; ranking from scratch")
+                    return state
+                state.sources = header['sources']
+                state.ids = pd.Index(saved['ids'])
+                for name in cls.ARRAYS:
+                    setattr(state, name, saved[name])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Could not read the ranking state {path} ({e}); ranking from scratch")
+            return cls(weights)
+        return state
+
+    def save(self, path):
+        """
+        Write the state atomically (temporary file, then rename)
+
+        Args:
+            path (str): Target file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        ids = self.ids.to_numpy()
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        header = json.dumps({'weights': self.weights, 'sources': self.sources})
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, header=np.array(header), ids=ids, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    def _score(self, values):
+        # Scale raw values with the stored bounds, impute with the stored medians, and weight
+        block = scale_metrics(np.array(values, dtype='float64', order='F'), self.low, self.high, list(self.sources))
+        weights = np.array([self.weights[metric] for metric in self.sources], dtype='float64')
+        if not block.shape[1] or not weights.sum():
+            return block, np.zeros(len(block))
+        filled = np.where(np.isnan(block), self.medians, block)
+        return block, filled @ (weights / weights.sum())
+
+    def _renormalize(self):
+        self.low, self.high = metric_bounds(self.values[self.active])
+        block = scale_metrics(np.array(self.values[self.active], order='F'), self.low, self.high, list(self.sources))
+        self.medians = metric_medians(block)
+        _, self.scores = self._score(self.values)
+
+        rows = np.flatnonzero(self.active)
+        order = rows[np.argsort(-self.scores[rows], kind='stable')]
+        self.order_scores, self.order_rows = -self.scores[order], order
+        self.ranks = np.zeros(len(self.ids), dtype='int64')
+        self.ranks[order] = np.arange(1, len(order) + 1)
+
+    def _position(self, neg_score, row):
+        # Binary search for (neg_score, row) in the sorted score index
+        lo = np.searchsorted(self.order_scores, neg_score, side='left')
+        hi = np.searchsorted(self.order_scores, neg_score, side='right')
+        return int(lo + np.searchsorted(self.order_rows[lo:hi], row))
+
+    def _move(self, row, score):
+        # Take the row out of the index (if ranked) and insert it at its new
+        # score (unless dropped); returns the positions whose school changed
+        positions = []
+        if self.ranks[row]:
+            i = self._position(-self.scores[row], row)
+            self.order_scores = np.delete(self.order_scores, i)
+            self.order_rows = np.delete(self.order_rows, i)
+            positions.append(i)
+        if score is not None:
+            j = self._position(-score, row)
+            self.order_scores = np.insert(self.order_scores, j, -score)
+            self.order_rows = np.insert(self.order_rows, j, row)
+            positions.append(j)
+        if len(positions) == 2:
+            return min(positions), max(positions)
+        # Adding or dropping a school shifts every position after it
+        return positions[0], len(self.order_rows) - 1
+
+    def _bounds_move(self, rows, values, added, removed):
+        # Could the change move a metric's min or max? A new value outside the
+        # bounds does; so does a school leaving a value that sits on a bound
+        low, high = self.low, self.high
+        incoming = np.vstack([values, added])
+        if ((incoming < low) | (incoming > high) | (np.isnan(low) & ~np.isnan(incoming))).any():
+            return True
+        live = self.active[rows]
+        old = self.values[rows[live]]
+        left = ~((old == values[live]) | (np.isnan(old) & np.isnan(values[live])))
+        leaving = np.vstack([np.where(left, old, np.nan), self.values[removed]])
+        return bool(((leaving == low) | (leaving == high)).any())
+
+    def _rebuild(self, ids, values):
+        self.ids = pd.Index(ids)
+        self.values = np.array(values, order='C')
+        self.active = np.ones(len(ids), dtype=bool)
+        self._renormalize()
+        self.last_update = {'schools': len(ids), 'changed': len(ids), 'renormalized': True,
+                            'ranks_rewritten': len(ids)}
+
+    def _update(self, rows, values, added_ids, added_values):
+        # rows/values: state row and current values of every school already known
+        old = self.values[rows]
+        changed = ~((old == values) | (np.isnan(old) & np.isnan(values))).all(axis=1) | ~self.active[rows]
+        changed_rows, changed_values = rows[changed], values[changed]
+        present = np.zeros(len(self.ids), dtype=bool)
+        present[rows] = True
+        removed = np.flatnonzero(self.active & ~present)
+        renormalize = self._bounds_move(changed_rows, changed_values, added_values, removed)
+
+        spans = []
+        for row in removed:
+            spans.append(self._move(row, None))
+        self.ranks[removed] = 0
+        self.active[removed] = False
+        self.values[changed_rows] = changed_values
+        start = len(self.ids)
+        if len(added_ids):
+            self.ids = self.ids.append(pd.Index(added_ids))
+            self.values = np.vstack([self.values, added_values])
+            self.active = np.r_[self.active, np.zeros(len(added_ids), dtype=bool)]
+            self.scores = np.r_[self.scores, np.zeros(len(added_ids))]
+            self.ranks = np.r_[self.ranks, np.zeros(len(added_ids), dtype='int64')]
+        moved = np.r_[changed_rows, np.arange(start, len(self.ids))].astype('int64')
+        self.active[moved] = True
+
+        if renormalize:
+            self._renormalize()
+            rewritten = int(self.active.sum())
+        else:
+            _, new_scores = self._score(self.values[moved])
+            for row, score in zip(moved.tolist(), new_scores.tolist()):
+                spans.append(self._move(row, score))
+                self.scores[row] = score
+            # A move only shifts the schools between its old and new position,
+            # so only the union of the spans needs its ranks rewritten
+            rewritten, end = 0, -1
+            for lo, hi in sorted(spans):
+                lo, hi = max(lo, end + 1), min(hi, len(self.order_rows) - 1)
+                if hi >= lo:
+                    self.ranks[self.order_rows[lo:hi + 1]] = np.arange(lo + 1, hi + 2)
+                    rewritten += hi - lo + 1
+                end = max(end, hi)
+        self.last_update = {
+            'schools': int(self.active.sum()),
+            'changed': int(len(moved) + len(removed)),
+            'renormalized': bool(renormalize),
+            'ranks_rewritten': rewritten
+        }
+
+    def rank(self, df, segments=None):
+        """
+        Bring the state up to date with ``df`` and rank it
+
+        Schools are matched on ``Id`` (or ``school_id``). Schools missing
+        from ``df`` are dropped from the ranking; rows without an id get no
+        rank, and a repeated id gets the rank of its first row. The result
+        has the same columns as rank_colleges' output.
+
+        Args:
+            df (pd.DataFrame): Output of process_data (or clean_college_data)
+            segments (dict): Rank column per segment column, SEGMENTS by default
+
+        Returns:
+            pd.DataFrame: Ranked frame, sharing its input columns with ``df``
+        """
+        id_col = 'Id' if 'Id' in df.columns else 'school_id'
+        known = df[id_col].notna().to_numpy()
+        keys = df[id_col].to_numpy()
+        sources = metric_sources(df.columns, self.weights)
+        values = metric_values(df, sources)
+
+        if sources != self.sources or not len(self.ids):
+            self.sources = sources
+            first = np.flatnonzero(known & ~df[id_col].duplicated().to_numpy())
+            self._rebuild(keys[first], values[first])
+        else:
+            rows = self.ids.get_indexer(keys)
+            # First row of each known school, and of each new one
+            existing = np.flatnonzero((rows >= 0) & ~pd.Series(rows).duplicated().to_numpy())
+            new = np.flatnonzero(known & (rows < 0))
+            new = new[~pd.Series(keys[new]).duplicated().to_numpy()]
+            self._update(rows[existing], values[existing], keys[new], values[new])
+
+        # Scores and ranks for every row of df, repeated ids included
+        rows = self.ids.get_indexer(keys)
+        rows[~known] = -1
+        ranked = rows >= 0
+        block = np.full(values.shape, np.nan, order='F')
+        scores = np.full(len(df), np.nan)
+        block[ranked], scores[ranked] = self._score(self.values[rows[ranked]])
+        national = np.where(ranked, self.ranks[rows], 0)
+        if ranked.all() and len(df) == len(self.order_rows):
+            # df holds each ranked school once: read the order off the score index
+            df_position = np.empty(len(self.ids), dtype='int64')
+            df_position[rows] = np.arange(len(df))
+            order = df_position[self.order_rows]
+        else:
+            order = np.argsort(np.where(ranked, national, len(self.ids) + 1), kind='stable')
+        return _ranked_frame(df, sources, block, scores, pd.arrays.IntegerArray(national, ~ranked), order, segments)
@@ -0,0 +1,219 @@
+import logging
+import os
+import re
+import numpy as np
+from sqlalchemy import MetaData, Table, Column, Index, ForeignKeyConstraint, PrimaryKeyConstraint
+from sqlalchemy import String, Numeric, Integer, BigInteger, SmallInteger, Text, Float, Boolean, Date, DateTime
+from config import INIT_SQL_PATH
+
+# SQL types used in init.sql and the SQLAlchemy types they map to
+SQL_TYPES = {
+    'VARCHAR': String,
+    'CHAR': String,
+    'TEXT': Text,
+    'DECIMAL': Numeric,
+    'NUMERIC': Numeric,
+    'INTEGER': Integer,
+    'INT': Integer,
+    'BIGINT': BigInteger,
+    'SMALLINT': SmallInteger,
+    'REAL': Float,
+    'FLOAT': Float,
+    'BOOLEAN': Boolean,
+    'DATE': Date,
+    'TIMESTAMP': DateTime
+}
+
+# Indexes built after each load for the dashboard's filters and sorts; the
+# primary keys already index every school_id join
+MANAGED_INDEXES = {
+    'Dim_School': [['state'], ['type_of_school']],
+    'Fact_CollegeMetrics': [['rank']],
+    'Fact_Programs': [['cip_code']]
+}
+
+CREATE_TABLE_PATTERN = re.compile(r'CREATE\s+TABLE\s+(\w+)\s*\((.*?)\)\s*;', re.IGNORECASE | re.DOTALL)
+COLUMN_PATTERN = re.compile(r'(\w+)\s+(\w+)(?:\s*\(([\d\s,]+)\))?(.*)', re.DOTALL)
+REFERENCES_PATTERN = re.compile(r'REFERENCES\s+(\w+)\s*\(\s*(\w+)\s*\)', re.IGNORECASE)
+
+
+def _split_definitions(body):
+    # Split on commas outside parentheses, e.g. not inside DECIMAL(5,2)
+    parts, depth, current = [], 0, ''
+    for char in body:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += (char == '(') - (char == ')')
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _column_list(text):
+    return [name.strip() for name in text.split(',')]
+
+
+def parse_schema(sql, metadata=None):
+    """
+    Build SQLAlchemy tables from the CREATE TABLE statements of a SQL script
+
+    Column types, inline and table-level PRIMARY KEY and FOREIGN KEY clauses
+    are kept; everything else in the script is ignored.
+
+    Args:
+        sql (str): SQL script, e.g. the contents of init.sql
+        metadata (MetaData): Metadata to add the tables to
+
+    Returns:
+        MetaData: Metadata holding one Table per CREATE TABLE statement
+    """
+    metadata = metadata or MetaData()
+    sql = re.sub(r'--[^\n]*', '', sql)
+
+    for table_name, body in CREATE_TABLE_PATTERN.findall(sql):
+        columns, constraints = [], []
+        for definition in _split_definitions(body):
+            upper = definition.upper()
+            if upper.startswith('PRIMARY KEY'):
+                constraints.append(PrimaryKeyConstraint(*_column_list(re.search(r'\((.*?)\)', definition).group(1))))
+            elif upper.startswith('FOREIGN KEY'):
+                local = _column_list(re.search(r'\((.*?)\)', definition).group(1))
+                target_table, target_column = REFERENCES_PATTERN.search(definition).groups()
+                constraints.append(ForeignKeyConstraint(local, [f"{target_table}.{target_column}"]))
+            else:
+                name, type_name, args, rest = COLUMN_PATTERN.match(definition).groups()
+                type_class = SQL_TYPES.get(type_name.upper())
+                if type_class is None:
+                    raise ValueError(f"Unsupported type {type_name} for {table_name}.{name}")
+                type_args = [int(arg) for arg in args.split(',')] if args else []
+                columns.append(Column(name, type_class(*type_args), primary_key='PRIMARY KEY' in rest.upper()))
+                reference = REFERENCES_PATTERN.search(rest)
+                if reference:
+                    constraints.append(ForeignKeyConstraint([name], ['.'.join(reference.groups())]))
+
+        Table(table_name, metadata, *columns, *constraints)
+
+    return metadata
+
+
+def load_schema(path=INIT_SQL_PATH):
+    """
+    Read the declared star schema from init.sql
+
+    Args:
+        path (str): Path of the SQL script
+
+    Returns:
+        MetaData: Declared tables, or None if the script is missing so callers
+        can fall back to pandas-inferred tables
+    """
+    if not os.path.exists(path):
+        logging.warning(f"{path} not found; tables will be created from the DataFrame dtypes")
+        return None
+    with open(path) as f:
+        return parse_schema(f.read())
+
+
+def declared_tables(table_names, schema=None, declared=None):
+    """
+    Copy declared tables under new names and/or into another schema
+
+    Foreign keys are pointed at the copies of the tables they reference, so
+    staging tables reference staging tables. Keys referencing a table outside
+    ``table_names`` are left out.
+
+    Args:
+        table_names (dict): Target name per declared table name
+        schema (str): Schema of the copies, or None for the default schema
+        declared (MetaData): Declared tables, DECLARED_SCHEMA by default
+
+    Returns:
+        dict: Copied Table per declared table name, for the tables that are declared
+    """
+    declared = declared if declared is not None else DECLARED_SCHEMA
+    if declared is None:
+        return {}
+
+    metadata = MetaData()
+    prefix = f"{schema}." if schema else ''
+    tables = {}
+    for source_name, target_name in table_names.items():
+        source = declared.tables.get(source_name)
+        if source is None:
+            continue
+        columns = [Column(column.name, column.type, primary_key=column.primary_key) for column in source.columns]
+        foreign_keys = []
+        for constraint in source.foreign_key_constraints:
+            local = [element.parent.name for element in constraint.elements]
+            targets = [element.target_fullname.split('.') for element in constraint.elements]
+            if all(parent in table_names for parent, _ in targets):
+                foreign_keys.append(ForeignKeyConstraint(
+                    local, [f"{prefix}{table_names[parent]}.{column}" for parent, column in targets]
+                ))
+        tables[source_name] = Table(target_name, metadata, *columns, *foreign_keys, schema=schema)
+    return tables
+
+
+def managed_indexes(tables):
+    """
+    Build the MANAGED_INDEXES of the given tables
+
+    Args:
+        tables (dict): Table per declared table name, as from declared_tables()
+
+    Returns:
+        list: Index objects ready to create, named after the target tables
+    """
+    indexes = []
+    for source_name, table in tables.items():
+        for index_columns in MANAGED_INDEXES.get(source_name, []):
+            indexes.append(Index(f"ix_{table.name}_{'_'.join(index_columns)}".lower(), *(table.c[col] for col in index_columns)))
+    return indexes
+
+
+def _widen_float32(values):
+    # float32 holds 7 significant digits: round to them when widening, so a
+    # rate read as 0.1608 reaches the database as 0.1608 rather than
+    # 0.16079999506; the declared DECIMAL scale then rounds what is stored
+    wide = values.astype('float64')
+    magnitude = np.floor(np.log10(np.abs(wide.where(wide != 0, 1))))
+    scale = 10.0 ** (6 - magnitude)
+    return (wide * scale).round() / scale
+
+
+def conform_dataframe(dataframe, table):
+    """
+    Shape a DataFrame to a declared table
+
+    Columns are put in the declared order. Integer columns, and string
+    columns holding whole-number codes, that pandas keeps as float because of
+    missing values become nullable integers, so they are written as 3 rather
+    than 3.0. float32 columns are widened to float64 at their own precision.
+
+    Args:
+        dataframe (pd.DataFrame): Transformed table
+        table (Table): Declared table
+
+    Returns:
+        pd.DataFrame: DataFrame with the declared columns
+    """
+    dataframe = dataframe[[column.name for column in table.columns]]
+    casts = {}
+    for column in table.columns:
+        values = dataframe[column.name]
+        if values.dtype.kind != 'f':
+            continue
+        if values.dtype == 'float32':
+            values = casts[column.name] = _widen_float32(values)
+        if isinstance(column.type, Integer):
+            casts[column.name] = values.round().astype('Int64')
+        elif isinstance(column.type, String) and (values.dropna() % 1 == 0).all():
+            casts[column.name] = values.astype('Int64')
+    return dataframe.assign(**casts) if casts else dataframe
+
+
+# Tables declared in init.sql, parsed once per process
+DECLARED_SCHEMA = load_schema()
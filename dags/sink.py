@@ -0,0 +1,133 @@
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from config import OUTPUT_DIR, OUTPUT_FORMAT, OUTPUT_COMPRESSION, OUTPUT_PARTITION_BY, OUTPUT_CONCURRENCY
+
+# File extension per output format
+EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+# Bytes and seconds per table of the most recent write, for the pipeline report
+last_write_report = {}
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _remove(path):
+    # Clear the previous run's output so no stale partition survives
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_table(dataframe, name, directory=OUTPUT_DIR, fmt=OUTPUT_FORMAT, compression=OUTPUT_COMPRESSION,
+                partition_by=None):
+    """
+    Write one table in the configured format
+
+    Parquet and Arrow IPC keep the DataFrame's dtypes and are compressed
+    (zstd by default); CSV is written as plain text. With ``partition_by``
+    the table becomes a Hive-partitioned directory (``state=NY/...``) instead
+    of a single file; CSV output is never partitioned.
+
+    :param dataframe: DataFrame to write
+    :param name: Table name, used for the file or directory name
+    :param directory: Output directory
+    :param fmt: 'parquet', 'arrow' or 'csv'
+    :param compression: Codec for Parquet/Arrow, e.g. 'zstd', 'lz4' or 'none'
+    :param partition_by: Column to partition by, or None
+    :return: Dictionary with path, rows, bytes and seconds
+    """
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unsupported output format {fmt}; expected one of {sorted(EXTENSIONS)}")
+
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    partitioned = bool(partition_by) and fmt != 'csv' and partition_by in dataframe.columns
+    path = os.path.join(directory, name if partitioned else f"{name}{EXTENSIONS[fmt]}")
+    _remove(path)
+
+    if fmt == 'csv':
+        dataframe.to_csv(path, index=False)
+    else:
+        table = pa.Table.from_pandas(dataframe, preserve_index=False)
+        codec = None if compression == 'none' else compression
+        if partitioned:
+            file_format = ds.ParquetFileFormat() if fmt == 'parquet' else ds.IpcFileFormat()
+            ds.write_dataset(
+                table,
+                path,
+                format=file_format,
+                partitioning=[partition_by],
+                partitioning_flavor='hive',
+                file_options=file_format.make_write_options(compression=codec)
+            )
+        elif fmt == 'parquet':
+            pq.write_table(table, path, compression=codec or 'none')
+        else:
+            feather.write_feather(table, path, compression=codec or 'uncompressed')
+
+    report = {
+        'path': path,
+        'rows': len(dataframe),
+        'bytes': _size(path),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    logging.info(f"Wrote {name}: {report['rows']} rows, {report['bytes']} bytes in {report['seconds']}s")
+    return report
+
+
+def write_tables(tables, directory=OUTPUT_DIR, fmt=OUTPUT_FORMAT, compression=OUTPUT_COMPRESSION,
+                 partition_by=OUTPUT_PARTITION_BY, concurrency=OUTPUT_CONCURRENCY):
+    """
+    Write the star-schema tables concurrently
+
+    When partitioning by a column only Dim_School carries (``state``), the
+    tables keyed by school_id get it looked up from dim_school, so every
+    table is partitioned the same way.
+
+    :param tables: Dictionary of DataFrames keyed by table name
+    :param directory: Output directory
+    :param fmt: 'parquet', 'arrow' or 'csv'
+    :param compression: Codec for Parquet/Arrow
+    :param partition_by: Column to partition by, or None/'' for single files
+    :param concurrency: Maximum number of tables written at once
+    :return: Dictionary of per-table reports from write_table
+    """
+    tables = dict(tables)
+    if partition_by and fmt != 'csv' and 'dim_school' in tables and partition_by in tables['dim_school']:
+        lookup = tables['dim_school'].drop_duplicates('id').set_index('id')[partition_by]
+        for name, dataframe in tables.items():
+            if partition_by not in dataframe.columns and 'school_id' in dataframe.columns:
+                tables[name] = dataframe.assign(**{partition_by: dataframe['school_id'].map(lookup)})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(tables)))) as executor:
+        futures = {
+            name: executor.submit(write_table, dataframe, name, directory, fmt, compression, partition_by)
+            for name, dataframe in tables.items()
+        }
+        reports = {name: future.result() for name, future in futures.items()}
+
+    last_write_report.clear()
+    last_write_report.update({
+        'format': fmt,
+        'compression': None if fmt == 'csv' else compression,
+        'partition_by': partition_by or None,
+        'tables': reports,
+        'total_bytes': sum(report['bytes'] for report in reports.values()),
+        'wall_seconds': round(time.perf_counter() - started, 3)
+    })
+    logging.info(f"Wrote {len(reports)} tables ({last_write_report['total_bytes']} bytes) "
+                 f"in {last_write_report['wall_seconds']}s")
+    return reports
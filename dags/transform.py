@@ -1,6 +1,11 @@
+import functools
 import logging
+import numpy as np
 import pandas as pd
 import extract 
+import decode
+import ranking
+from config import RANKING_STATE_PATH
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,159 +20,342 @@ def fetch_all_data(URL):
         return college_data
 
 
-def process_data(data):
-    logging.info(f"Processing data for school")
-    processed_data = []
-    # print("data")
-    # print(data[0:5])
+# API field behind every column process_data reads unconditionally
+PROCESS_DATA_FIELDS = {
+    'Id': 'id',
+    'School_Name': 'latest.school.name',
+    'Address': 'latest.school.address',
+    'State': 'latest.school.state',
+    'City': 'latest.school.city',
+    'Highest_Degree': 'latest.school.degrees_awarded.highest',
+    'Predominant_Degree': 'latest.school.degrees_awarded.predominant',
+    'Predominant_Recoded': 'latest.school.degrees_awarded.predominant_recoded',
+    'Accreditor_Code': 'latest.school.accreditor_code',
+    'Institution_Level': 'latest.school.institutional_characteristics.level',
+    'Religious_affiliation': 'latest.school.religious_affiliation',
+    'Student_Size': 'latest.student.size',
+    'Demographics_men': 'latest.student.demographics.men',
+    'Demographics_women': 'latest.student.demographics.women',
+    'Admission_Rate_Overall': 'latest.admissions.admission_rate.overall',
+    'Admission_Rate_by_OPE_ID': 'latest.admissions.admission_rate.by_ope_id',
+    'Consumer_Admission_Rate': 'latest.admissions.admission_rate.consumer_rate',
+    'In_State_Tuition': 'latest.cost.tuition.in_state',
+    'Out_of_State_Tuition': 'latest.cost.tuition.out_of_state',
+    'Loan_Principal': 'latest.aid.loan_principal',
+    'Pell_Grant_Rate': 'latest.aid.pell_grant_rate',
+    'Federal_Loan_Rate': 'latest.aid.federal_loan_rate',
+    'Completion_Rate': 'latest.completion.consumer_rate',
+    'type_of_school': 'latest.programs.cip_4_digit.school.type',
+}
+
+# API fields behind the columns process_data builds from the act_scores,
+# sat_scores and transfer_rate subtrees. Only the ones used downstream are fetched.
+NESTED_SCORE_FIELDS = {}
+for percentile in ('25th_percentile', '75th_percentile', 'midpoint'):
+    for subject in ('cumulative', 'english', 'math', 'writing'):
+        NESTED_SCORE_FIELDS[f'ACT_{percentile}_{subject}'] = f'latest.admissions.act_scores.{percentile}.{subject}'
+    for subject in ('critical_reading', 'math', 'writing'):
+        NESTED_SCORE_FIELDS[f'SAT_{percentile}_{subject}'] = f'latest.admissions.sat_scores.{percentile}.{subject}'
+for category in ('overall', 'by_ope_id'):
+    NESTED_SCORE_FIELDS[f'SAT_average_{category}'] = f'latest.admissions.sat_scores.average.{category}'
+for category in ('4yr', 'less_than_4yr'):
+    for rate_type in ('full_time', 'full_time_pooled'):
+        NESTED_SCORE_FIELDS[f'Transfer_Rate_{category}_{rate_type}'] = f'latest.completion.transfer_rate.{category}.{rate_type}'
+
+# Fields whose value is a list of objects rather than a single object
+ARRAY_FIELDS = ('latest.programs.cip_4_digit',)
+
+# Fact_Programs columns and their path inside each cip_4_digit program
+FACT_PROGRAMS_FIELDS = {
+    'cip_code': 'code',
+    'cip_title': 'title',
+    'credential_level': 'credential.level',
+    'credential_title': 'credential.title',
+    'ipeds_awards1': 'counts.ipeds_awards1',
+    'ipeds_awards2': 'counts.ipeds_awards2',
+    'median_earnings_4yr': 'earnings.4_yr.overall_median_earnings',
+    'median_debt': 'debt.staff_grad_plus.all.eval_inst.median'
+}
+FACT_PROGRAMS_NUMERIC_COLUMNS = ['credential_level', 'ipeds_awards1', 'ipeds_awards2', 'median_earnings_4yr', 'median_debt']
+FACT_PROGRAMS_KEY = ['school_id', 'cip_code', 'credential_level']
+
+# Columns read by rank_colleges_advanced
+RANKING_INPUT_COLUMNS = ranking.input_columns()
+
+
+# Columns of process_data's output that hold text; every other column is numeric
+PROCESS_DATA_TEXT_COLUMNS = {'Id', 'School_Name', 'Address', 'State', 'City', 'Accreditor_Code', 'type_of_school'}
+
+# Compact dtypes process_data gives its columns: categoricals for codes and
+# states, nullable small integers for degree and level codes and float32 for
+# rates. Money and counts stay float64.
+PROCESS_DATA_DTYPES = {
+    'State': 'category',
+    'Accreditor_Code': 'category',
+    'type_of_school': 'category',
+    'Highest_Degree': 'Int8',
+    'Predominant_Degree': 'Int8',
+    'Predominant_Recoded': 'Int8',
+    'Institution_Level': 'Int8',
+    'Religious_affiliation': 'Int16',
+    'Demographics_men': 'float32',
+    'Demographics_women': 'float32',
+    'Admission_Rate_Overall': 'float32',
+    'Admission_Rate_by_OPE_ID': 'float32',
+    'Consumer_Admission_Rate': 'float32',
+    'Pell_Grant_Rate': 'float32',
+    'Federal_Loan_Rate': 'float32',
+    'Completion_Rate': 'float32'
+}
+# Test scores and transfer rates (the act_scores, sat_scores and transfer_rate subtrees) are float32 too
+FLOAT32_PREFIXES = ('ACT_', 'SAT_', 'Transfer_Rate_')
+
+def _to_float_column(values):
+    try:
+        return np.array(values, dtype='float64')
+    except (TypeError, ValueError):
+        return values
+
+def compact_column(col, values):
+    """
+    Cast one of process_data's columns to its compact dtype
+    
+    Columns without a planned dtype are returned unchanged, as are columns
+    whose values do not fit it (e.g. a non-integral or out-of-range code).
+    
+    Args:
+        col (str): Column name
+        values (array-like): Column values
+    
+    Returns:
+        array-like: Values in the PROCESS_DATA_DTYPES (or FLOAT32_PREFIXES) dtype
+    """
+    dtype = PROCESS_DATA_DTYPES.get(col)
+    if dtype is None and col.startswith(FLOAT32_PREFIXES):
+        dtype = 'float32'
+    if dtype is None:
+        return values
+    try:
+        if dtype == 'float32':
+            return np.asarray(values, dtype='float32')
+        return pd.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        logging.warning(f"Keeping {col} as {getattr(values, 'dtype', 'object')}; its values do not fit {dtype}")
+        return values
+
+def _subtree(value, key):
+    # A subtree that is missing, or null (as typed records store a missing one), drops the record
+    if value is None:
+        raise KeyError(key)
+    return value
+
+def _record_fields(result):
+    # What process_data reads from one nested record: its PROCESS_DATA_FIELDS row,
+    # the act_scores, sat_scores and transfer_rate subtrees and its programs
+    latest = _subtree(result['latest'], 'latest')
+    school = _subtree(latest['school'], 'school')
+    student = _subtree(latest['student'], 'student')
+    admission = _subtree(latest['admissions'], 'admissions')
+    cost = _subtree(latest['cost'], 'cost')
+    aid = _subtree(latest['aid'], 'aid')
+    completion = _subtree(latest['completion'], 'completion')
+    degrees = _subtree(school['degrees_awarded'], 'degrees_awarded')
+    characteristics = _subtree(school['institutional_characteristics'], 'institutional_characteristics')
+    demographics = _subtree(student['demographics'], 'demographics')
+    admission_rate = _subtree(admission['admission_rate'], 'admission_rate')
+    tuition = _subtree(cost['tuition'], 'tuition')
+    
+    row = (
+        result.get('id'),
+        school['name'],
+        school['address'],
+        school['state'],
+        school['city'],
+        degrees['highest'],
+        degrees['predominant'],
+        degrees['predominant_recoded'],
+        school['accreditor_code'],
+        characteristics['level'],
+        school['religious_affiliation'],
+        student['size'],
+        demographics['men'],
+        demographics['women'],
+        admission_rate.get('overall'),
+        admission_rate.get('by_ope_id'),
+        admission_rate.get('consumer_rate'),
+        tuition.get('in_state'),
+        tuition.get('out_of_state'),
+        aid.get('loan_principal'),
+        aid.get('pell_grant_rate'),
+        aid.get('federal_loan_rate'),
+        completion.get('consumer_rate')
+    )
+    cip_programs = (latest.get('programs') or {}).get('cip_4_digit') or []
+    return (row, admission.get('act_scores', {}), admission.get('sat_scores', {}),
+            completion.get('transfer_rate', {}), cip_programs)
+
+def _typed_record_fields(result):
+    # _record_fields for a decode.SchoolRecord, read by attribute
+    latest = _subtree(result.latest, 'latest')
+    school = _subtree(latest.school, 'school')
+    student = _subtree(latest.student, 'student')
+    admission = _subtree(latest.admissions, 'admissions')
+    cost = _subtree(latest.cost, 'cost')
+    aid = _subtree(latest.aid, 'aid')
+    completion = _subtree(latest.completion, 'completion')
+    degrees = _subtree(school.degrees_awarded, 'degrees_awarded')
+    characteristics = _subtree(school.institutional_characteristics, 'institutional_characteristics')
+    demographics = _subtree(student.demographics, 'demographics')
+    admission_rate = _subtree(admission.admission_rate, 'admission_rate')
+    tuition = _subtree(cost.tuition, 'tuition')
+    
+    row = (
+        result.id,
+        school.name,
+        school.address,
+        school.state,
+        school.city,
+        degrees.highest,
+        degrees.predominant,
+        degrees.predominant_recoded,
+        school.accreditor_code,
+        characteristics.level,
+        school.religious_affiliation,
+        student.size,
+        demographics.men,
+        demographics.women,
+        admission_rate.overall,
+        admission_rate.by_ope_id,
+        admission_rate.consumer_rate,
+        tuition.in_state,
+        tuition.out_of_state,
+        aid.loan_principal,
+        aid.pell_grant_rate,
+        aid.federal_loan_rate,
+        completion.consumer_rate
+    )
+    cip_programs = (latest.programs.cip_4_digit if latest.programs is not None else None) or []
+    return (row, admission.act_scores or {}, admission.sat_scores or {},
+            completion.transfer_rate or {}, cip_programs)
+
+def process_data(data, compact=True):
+    """
+    Flatten nested Scorecard school records into one row per school.
+
+    Values are appended straight into per-column lists in a single pass, and
+    numeric columns are materialised as float64 arrays, so no per-row dict is
+    built and pandas does not re-infer the numeric columns. With ``compact``
+    each column then gets its PROCESS_DATA_DTYPES dtype (see compact_column),
+    which clean_college_data and the star-schema tables keep. Columns built from
+    the act_scores, sat_scores and transfer_rate subtrees (and type_of_school)
+    only store their non-null values, and are created in the order they are
+    first seen, exactly as building the frame from per-row dicts would.
+    Typed records from decode.decode_page are read by attribute, without
+    converting them to dicts.
+    
+    Args:
+        data (iterable): School records as returned by extract.request_data
+        compact (bool): Apply the compact dtype plan; False keeps object and float64 columns
+    
+    Returns:
+        pd.DataFrame: One row per school
+    """
+    logging.info("Processing data for school")
+    base_columns = list(PROCESS_DATA_FIELDS)[:-1]  # type_of_school is only set when programs exist
+    columns = {col: [] for col in base_columns}
+    base_values = [columns[col] for col in base_columns]
+    # Nested columns are sparse: column name -> (row numbers, non-null values)
+    nested_columns = {}
+    nested_slots = {}
+    n_rows = 0
+    
+    def add_subtree(prefix, subtree, row):
+        # Flattens {group: {name: value}} into '<prefix>_<group>_<name>' columns
+        for group, values in subtree.items():
+            key = (prefix, group, tuple(values))
+            slots = nested_slots.get(key)
+            if slots is None:
+                slots = nested_slots[key] = [
+                    nested_columns.setdefault(f'{prefix}_{group}_{name}', ([], [])) for name in key[2]
+                ]
+            for slot, value in zip(slots, values.values()):
+                if value is not None:
+                    slot[0].append(row)
+                    slot[1].append(value)
+    
     for result in data:
-        
         try:
-            # print("result[0:5]")
-            # print(result['latest']['school'])
-            # print(result.dtypes)
-            school = result['latest']['school']
-            student = result['latest']['student']
-            admission = result['latest']['admissions']
-            cost = result['latest']['cost']
-            aid = result['latest']['aid']
-            completion = result['latest']['completion']
-            
-            
-            row = {
-               'Id':result.get('id'),
-                'School_Name': school['name'],
-                'Address': school['address'],
-                'State': school['state'],
-                'City': school['city'],
-                'Highest_Degree': school['degrees_awarded']['highest'],
-                'Predominant_Degree': school['degrees_awarded']['predominant'],
-                'Predominant_Recoded': school['degrees_awarded']['predominant_recoded'],
-                'Accreditor_Code':school['accreditor_code'],
-                'Institution_Level': school['institutional_characteristics']['level'],
-                'Religious_affiliation':school['religious_affiliation'],
-                'Student_Size': student['size'],
-                'Demographics_men':student['demographics']['men'],
-                'Demographics_women':student['demographics']['women'],
-                'Admission_Rate_Overall': admission['admission_rate'].get('overall'),
-                'Admission_Rate_by_OPE_ID': admission['admission_rate'].get('by_ope_id'),
-                'Consumer_Admission_Rate': admission['admission_rate'].get('consumer_rate'),
-                'In_State_Tuition': cost['tuition'].get('in_state'),
-                'Out_of_State_Tuition': cost['tuition'].get('out_of_state'),
-                'Loan_Principal': aid.get('loan_principal'),
-                'Pell_Grant_Rate': aid.get('pell_grant_rate'),
-                'Federal_Loan_Rate': aid.get('federal_loan_rate'),
-                'Completion_Rate': completion.get('consumer_rate')
-            }
-            
-            # Extract ACT scores
-            for percentile, subjects in admission.get('act_scores', {}).items():
-                for subject, score in subjects.items():
-                    row[f'ACT_{percentile}_{subject}'] = score
-            
-            # Extract SAT scores
-            for score_type, scores in admission.get('sat_scores', {}).items():
-                if score_type == 'average':
-                    for category, score in scores.items():
-                        row[f'SAT_{score_type}_{category}'] = score
-                else:
-                    for subject, score in scores.items():
-                        row[f'SAT_{score_type}_{subject}'] = score
-            
-            # Extract transfer rates -- retention rate
-            for category, rates in completion.get('transfer_rate', {}).items():
-                for rate_type, rate in rates.items():
-                    row[f'Transfer_Rate_{category}_{rate_type}'] = rate
-
-            #Extract type of school
-            if 'latest' in result and 'programs' in result['latest']:
-                cip_programs = result['latest']['programs'].get('cip_4_digit')
-                for item in cip_programs:
-                    program_type = item.get('school')
-                    row['type_of_school'] = program_type.get('type')
-            
-            processed_data.append(row)
-        
+            if decode.is_typed(result):
+                row, act_scores, sat_scores, transfer_rate, cip_programs = _typed_record_fields(result)
+            else:
+                row, act_scores, sat_scores, transfer_rate, cip_programs = _record_fields(result)
         except KeyError as e:
             logging.error(f"Missing key in data: {e}")
+            continue
+        
+        for values, value in zip(base_values, row):
+            values.append(value)
+        
+        # Extract ACT and SAT scores and transfer rates -- retention rate
+        add_subtree('ACT', act_scores, n_rows)
+        add_subtree('SAT', sat_scores, n_rows)
+        add_subtree('Transfer_Rate', transfer_rate, n_rows)
+        
+        # Extract type of school (the last program's value wins)
+        if cip_programs:
+            last = cip_programs[-1]
+            if decode.is_typed(last):
+                school_type = last.school.type if last.school is not None else None
+            else:
+                school_type = (last.get('school') or {}).get('type')
+            rows, non_null = nested_columns.setdefault('type_of_school', ([], []))
+            rows.append(n_rows)
+            non_null.append(school_type)
+        
+        n_rows += 1
     
+    for col in base_columns:
+        if col not in PROCESS_DATA_TEXT_COLUMNS:
+            columns[col] = _to_float_column(columns[col])
     
-    df = pd.DataFrame(processed_data)
+    for col, (rows, non_null) in nested_columns.items():
+        values = np.full(n_rows, np.nan)
+        try:
+            values[rows] = non_null
+        except (TypeError, ValueError):
+            # Text (type_of_school) or an unexpected nested object; keep it as
+            # is, with NaN for the rows that lack it, as a frame of dicts would
+            values = np.full(n_rows, np.nan, dtype=object)
+            values[rows] = non_null
+        columns[col] = values
+    
+    if compact:
+        columns = {col: compact_column(col, values) for col, values in columns.items()}
+    
+    df = pd.DataFrame(columns)
     logging.info("Data processing complete.")
-    # print(df.head())
     return df
 
 
 def rank_colleges_advanced(processed_data):
     """
     Ranks colleges based on a weighted score derived from various metrics.
-    """
-    import pandas as pd
-    
-    # Convert processed_data to a DataFrame if it's not already
-    ranking_df = pd.DataFrame(processed_data)
-    
-    # Define weights for different ranking factors
-    weights = {
-        'admission_weight': 0.25,
-        'completion_weight': 0.20,
-        'sat_weight': 0.15,
-        'act_weight': 0.10,
-        'size_weight': 0.10,
-        'tuition_weight': 0.10,
-        'financial_aid_weight': 0.10
-    }
     
-    # Normalize a column, optionally reversing the scale
-    def normalize_column(series, reverse=False):
-        series = pd.to_numeric(series, errors='coerce').fillna(0)
-        if reverse:
-            return 1 - (series - series.min()) / (series.max() - series.min() + 1e-10)
-        return (series - series.min()) / (series.max() - series.min() + 1e-10)
-    
-    # Ensure required columns exist
-    required_columns = [
-        'Admission_Rate_Overall', 'Completion_Rate', 'SAT_Score', 'ACT_Score',
-        'Student_Size', 'In_State_Tuition', 'Pell_Grant_Rate'
-    ]
-    
-    for col in required_columns:
-        if col not in ranking_df.columns:
-            ranking_df[col] = 0  # Default missing columns to zero
-    
-    # Calculate normalized scores for each metric
-    ranking_df['admission_score'] = normalize_column(ranking_df['Admission_Rate_Overall'], reverse=True)
-    ranking_df['completion_score'] = normalize_column(ranking_df['Completion_Rate'])
-    ranking_df['sat_score'] = normalize_column(ranking_df['SAT_Score'])
-    ranking_df['act_score'] = normalize_column(ranking_df['ACT_Score'])
-    ranking_df['size_score'] = normalize_column(ranking_df['Student_Size'])
-    ranking_df['in_state_tuition_score'] = normalize_column(ranking_df['In_State_Tuition'], reverse=True)
-    ranking_df['financial_aid_score'] = normalize_column(ranking_df['Pell_Grant_Rate'])
-    
-    # Compute the comprehensive ranking score
-    ranking_df['ranking_score'] = (
-        weights['admission_weight'] * ranking_df['admission_score'] +
-        weights['completion_weight'] * ranking_df['completion_score'] +
-        weights['sat_weight'] * ranking_df['sat_score'] +
-        weights['act_weight'] * ranking_df['act_score'] +
-        weights['size_weight'] * ranking_df['size_score'] +
-        weights['tuition_weight'] * ranking_df['in_state_tuition_score'] +
-        weights['financial_aid_weight'] * ranking_df['financial_aid_score']
-    )
-    
-    # Sort by ranking score and assign ranks
-    ranked_colleges = ranking_df.sort_values('ranking_score', ascending=False)
-    ranked_colleges['Rank'] = range(1, len(ranked_colleges) + 1)
-    
-    # Select relevant columns for the final output
-    # output_columns = [
-    #     'Rank', 'School_Name', 'State', 'City', 
-    #     'ranking_score', 'Admission_Rate_Overall', 
-    #     'Completion_Rate', 'Student_Size', 
-    #     'In_State_Tuition', 'Pell_Grant_Rate'
-    # ]
-    
-    return ranked_colleges #[output_columns]
+    See ranking.rank_colleges: weights come from RANKING_WEIGHTS over the
+    ranking.METRICS defaults, and per-state and per-type ranks are added.
+    With RANKING_STATE_PATH set, the saved ranking.RankingState is updated
+    instead. Rows keep their input order; sort by ``Rank`` or use ranking.top_k.
+    """
+    ranking_df = processed_data if isinstance(processed_data, pd.DataFrame) else pd.DataFrame(processed_data)
+    if not RANKING_STATE_PATH:
+        return ranking.rank_colleges(ranking_df)
+    
+    # Re-score only the schools that changed since the saved state
+    state = ranking.RankingState.load(RANKING_STATE_PATH)
+    ranked_colleges = state.rank(ranking_df)
+    state.save(RANKING_STATE_PATH)
+    logging.info(f"Ranking state updated: {state.last_update}")
+    return ranked_colleges
 
 
 def process_and_rank_colleges(processed_data):
@@ -186,7 +374,71 @@ def process_and_rank_colleges(processed_data):
     return ranked_colleges
 
 
+# Role of each column clean_college_data touches:
+#   id          school key; rows without one, and repeated ones, are dropped
+#   text        free text; empty strings become missing
+#   rate        fraction in [0, 1], sometimes reported as a percentage
+#   percentage  share of students in [0, 1], sometimes reported as a percentage
+# Rates and percentages are normalized together; columns with no role pass through.
+COLUMN_ROLES = {
+    'Id': 'id',
+    'School_Name': 'text',
+    'Address': 'text',
+    'City': 'text',
+    'Demographics_men': 'percentage',
+    'Demographics_women': 'percentage',
+    'Admission_Rate_Overall': 'rate',
+    'Admission_Rate_by_OPE_ID': 'rate',
+    'Consumer_Admission_Rate': 'rate',
+    'Pell_Grant_Rate': 'rate',
+    'Federal_Loan_Rate': 'rate',
+    'Completion_Rate': 'rate'
+}
+
+def _float_values(series):
+    if series.dtype.kind == 'f':
+        return series.to_numpy()
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+def normalize_rates(df, columns):
+    """
+    Scale rate and percentage columns to [0, 1] as one 2-D block
+    
+    Values above 1 are taken as percentages and divided by 100, then every
+    value is clipped to [0, 1]; missing values stay missing. The block is
+    column-major, so each normalized column is a contiguous slice of it.
+    
+    Args:
+        df (pd.DataFrame): Input DataFrame
+        columns (list): Columns to normalize, all present in ``df``
+    
+    Returns:
+        dict: Normalized values per column, float32 when every input column is float32, else float64
+    """
+    if not columns:
+        return {}
+    dtype = np.result_type(*(df[col].dtype if df[col].dtype.kind == 'f' else np.float64 for col in columns))
+    block = np.empty((len(df), len(columns)), dtype=dtype, order='F')
+    for i, col in enumerate(columns):
+        block[:, i] = _float_values(df[col])
+    np.divide(block, 100, out=block, where=block > 1)
+    np.clip(block, 0, 1, out=block)
+    return {col: block[:, i] for i, col in enumerate(columns)}
+
 def clean_college_data(processed_df):
+    """
+    Clean the processed (or ranked) school frame according to COLUMN_ROLES
+    
+    The input is not copied: the result is assembled from the input's own
+    columns plus the normalized ones, and only rows without an id, or with a
+    repeated one, are filtered out. Treat the result's columns as read-only.
+    
+    Args:
+        processed_df (pd.DataFrame): Output of process_data or rank_colleges_advanced
+    
+    Returns:
+        pd.DataFrame: Cleaned frame with ``Id`` renamed to ``school_id``
+    """
     # Input validation 
     if not isinstance(processed_df, pd.DataFrame):
         raise ValueError("Input must be a pandas DataFrame")
@@ -197,39 +449,25 @@ def clean_college_data(processed_df):
     
     logging.info("Starting data cleaning process for College Scorecard data")
     
-    # Copy the input DataFrame to avoid modifying the original
-    df = processed_df.copy()
-    
-    # Demographic percentages
-    demo_cols = ['Demographics_men', 'Demographics_women']
-    for col in demo_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        mask = df[col] > 1
-        df.loc[mask, col] = df.loc[mask, col] / 100
-        df[col] = df[col].clip(lower=0, upper=1)
-    
-    # Admission rates
-    admission_cols = ['Admission_Rate_Overall', 'Admission_Rate_by_OPE_ID', 'Consumer_Admission_Rate']
-    for col in admission_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        mask = df[col] > 1
-        df.loc[mask, col] = df.loc[mask, col] / 100
-        df[col] = df[col].clip(lower=0, upper=1)
-    
-    # Rate columns in college metrics
-    rate_cols = ['Pell_Grant_Rate', 'Federal_Loan_Rate', 'Completion_Rate']
-    for col in rate_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        mask = df[col] > 1
-        df.loc[mask, col] = df.loc[mask, col] / 100
-        df[col] = df[col].clip(lower=0, upper=1)
-    
-    # Clean School Name and ID
-    df['School_Name'] = df['School_Name'].replace('', None)
-    df = df[df['Id'].notna()].drop_duplicates(subset=['Id'])
+    roles = {col: COLUMN_ROLES.get(col) for col in processed_df.columns}
+    rate_columns = [col for col, role in roles.items() if role in ('rate', 'percentage')]
+    columns = dict(processed_df.items())
+    columns.update(normalize_rates(processed_df, rate_columns))
+    for col, role in roles.items():
+        if role == 'text':
+            columns[col] = processed_df[col].replace('', None)
     
     # Rename 'Id' column to be more explicit
-    df.rename(columns={'Id': 'school_id'}, inplace=True)
+    id_col = next((col for col, role in roles.items() if role == 'id'), None)
+    if id_col is None:
+        raise ValueError("Input has no Id column to identify schools by")
+    columns = {'school_id' if col == id_col else col: values for col, values in columns.items()}
+    df = pd.DataFrame(columns, index=processed_df.index, copy=False)
+    
+    # Drop rows without an id, and repeated ids, only when there are any
+    keep = df['school_id'].notna().to_numpy() & ~df['school_id'].duplicated().to_numpy()
+    if not keep.all():
+        df = df[keep]
     
     return df
 
@@ -242,30 +480,9 @@ def transform_schools_data(raw_data):
     """
     logging.info("Starting comprehensive data transformation")
     
-    # Prepare dataframes for each dimension and fact table
-    df_school = transform_dim_school(raw_data)
-    df_demographics = transform_dim_demographics(raw_data)
-    df_admission = transform_dim_admission(raw_data)
-    df_test_scores = transform_dim_test_scores(raw_data)
-    df_transfer_rate = transform_dim_transfer_rate(raw_data)
-    df_college_metrics = transform_fact_college_metrics(raw_data)
-    
-    # Optional: Save each DataFrame to CSV
-    save_to_csv(df_school, 'dim_school.csv')
-    save_to_csv(df_demographics, 'dim_demographics.csv')
-    save_to_csv(df_admission, 'dim_admission.csv')
-    save_to_csv(df_test_scores, 'dim_test_scores.csv')
-    save_to_csv(df_transfer_rate, 'dim_transfer_rate.csv')
-    save_to_csv(df_college_metrics, 'fact_college_metrics.csv')
-    
-    return {
-        'dim_school': df_school,
-        'dim_demographics': df_demographics,
-        'dim_admission': df_admission,
-        'dim_test_scores': df_test_scores,
-        'dim_transfer_rate': df_transfer_rate,
-        'fact_college_metrics': df_college_metrics
-    }
+    # Prepare dataframes for each dimension and fact table in one pass;
+    # output files are written by sink.write_tables once every table is built
+    return split_star_schema(raw_data)
 
 def safe_extract_columns(df, column_mappings):
     """
@@ -292,149 +509,438 @@ def safe_extract_columns(df, column_mappings):
     
     return pd.DataFrame(extracted_data)
 
+# Resolved column plans keyed by (input column set, table mappings contents)
+@functools.lru_cache(maxsize=32)
+def _resolve_plan(available, mappings_key):
+    # Column plan for one input column set; mappings_key is the mappings as nested tuples
+    return {
+        table: [
+            (desired, next((col for col in candidates if col in available), None))
+            for desired, candidates in mappings
+        ]
+        for table, mappings in mappings_key
+    }
+
+def column_plan(columns, table_mappings):
+    """
+    Resolve every table's source columns once per input schema
+    
+    For each desired column the first candidate present in the input wins,
+    as in safe_extract_columns. The last 32 plans are cached by the input's
+    column set and the mappings' contents, so chunks and reruns with the
+    same columns skip resolution, and edited mappings get a fresh plan.
+    
+    Args:
+        columns (iterable): Column names of the input DataFrame
+        table_mappings (dict): Column mappings keyed by table name
+    
+    Returns:
+        dict: Per table, a list of (desired column, source column or None)
+    """
+    mappings_key = tuple(
+        (table, tuple((desired, tuple(candidates)) for desired, candidates in mappings.items()))
+        for table, mappings in table_mappings.items()
+    )
+    return _resolve_plan(frozenset(columns), mappings_key)
+
+def split_star_schema(df, table_mappings=None):
+    """
+    Split a cleaned, ranked DataFrame into the star-schema tables in one pass
+    
+    Each table is assembled from the input's own column Series without
+    copying them, so the tables share memory with ``df`` (and each other):
+    replace columns rather than modify them in place. Columns missing from
+    the input are typed nulls, float64 NaN or object None for text columns.
+    
+    Args:
+        df (pd.DataFrame): Input DataFrame
+        table_mappings (dict): Column mappings keyed by table name, STAR_SCHEMA_COLUMNS by default
+    
+    Returns:
+        dict: DataFrame per table
+    """
+    table_mappings = table_mappings or STAR_SCHEMA_COLUMNS
+    plan = column_plan(df.columns, table_mappings)
+    
+    nulls = {}
+    def null_column(dtype):
+        # One shared null column per dtype
+        if dtype not in nulls:
+            fill = None if dtype == 'object' else np.nan
+            nulls[dtype] = pd.Series(np.full(len(df), fill, dtype=dtype), index=df.index)
+        return nulls[dtype]
+    
+    tables = {}
+    for table, columns in plan.items():
+        data = {
+            desired: df[source] if source is not None
+            else null_column('object' if desired in STAR_SCHEMA_TEXT_COLUMNS else 'float64')
+            for desired, source in columns
+        }
+        tables[table] = pd.DataFrame(data, index=df.index, copy=False)
+    return tables
+
+# Possible column names for each desired column
+DIM_SCHOOL_COLUMNS = {
+    'id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    'school_name': ['School_Name', 'school_name', 'name'],
+    'address': ['Address', 'address', 'school_address'],
+    'city': ['City', 'city', 'school_city'],
+    'state': ['State', 'state', 'school_state'],
+    'highest_degree': ['Highest_Degree', 'highest_degree', 'school_highest_degree'],
+    'predominant_degree': ['Predominant_Degree', 'predominant_degree', 'school_predominant_degree'],
+    'predominant_recoded': ['Predominant_Recoded', 'predominant_recoded', 'school_predominant_recoded'],
+    'accreditor_code': ['Accreditor_Code', 'accreditor_code', 'school_accreditor_code'],
+    'institution_level': ['Institution_Level', 'institution_level', 'school_institution_level'],
+    'religious_affiliation': ['Religious_affiliation', 'religious_affiliation', 'school_religious_affiliation'],
+    'type_of_school': ['type_of_school', 'Type_of_School', 'school_type']
+}
+
 def transform_dim_school(raw_data):
     """Transform raw data into Dim_School table"""
     logging.info("Transforming Dim_School data")
     
-    # Possible column names for each desired column
-    school_column_mappings = {
-        'id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        'school_name': ['School_Name', 'school_name', 'name'],
-        'address': ['Address', 'address', 'school_address'],
-        'city': ['City', 'city', 'school_city'],
-        'state': ['State', 'state', 'school_state'],
-        'highest_degree': ['Highest_Degree', 'highest_degree', 'school_highest_degree'],
-        'predominant_degree': ['Predominant_Degree', 'predominant_degree', 'school_predominant_degree'],
-        'predominant_recoded': ['Predominant_Recoded', 'predominant_recoded', 'school_predominant_recoded'],
-        'accreditor_code': ['Accreditor_Code', 'accreditor_code', 'school_accreditor_code'],
-        'institution_level': ['Institution_Level', 'institution_level', 'school_institution_level'],
-        'religious_affiliation': ['Religious_affiliation', 'religious_affiliation', 'school_religious_affiliation'],
-        'type_of_school': ['type_of_school', 'Type_of_School', 'school_type']
-    }
-    
-    # Use safe extraction method
-    df_school = safe_extract_columns(raw_data, school_column_mappings)
+    # Use the cached column plan
+    df_school = split_star_schema(raw_data, {'dim_school': DIM_SCHOOL_COLUMNS})['dim_school']
     
     return df_school
 
+DIM_DEMOGRAPHICS_COLUMNS = {
+    'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    'student_size': ['Student_Size', 'student_size', 'size'],
+    'demographics_men_pct': ['Demographics_men', 'demographics_men', 'men_percentage'],
+    'demographics_women_pct': ['Demographics_women', 'demographics_women', 'women_percentage']
+}
+
 def transform_dim_demographics(raw_data):
     """Transform raw data into Dim_Demographics table"""
     logging.info("Transforming Dim_Demographics data")
     
-    demographics_column_mappings = {
-        'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        'student_size': ['Student_Size', 'student_size', 'size'],
-        'demographics_men_pct': ['Demographics_men', 'demographics_men', 'men_percentage'],
-        'demographics_women_pct': ['Demographics_women', 'demographics_women', 'women_percentage']
-    }
-    
-    df_demographics = safe_extract_columns(raw_data, demographics_column_mappings)
+    df_demographics = split_star_schema(raw_data, {'dim_demographics': DIM_DEMOGRAPHICS_COLUMNS})['dim_demographics']
     
     return df_demographics
 
+DIM_ADMISSION_COLUMNS = {
+    'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    'admission_rate_overall': ['Admission_Rate_Overall', 'admission_rate_overall', 'overall_admission_rate'],
+    'admission_rate_by_ope_id': ['Admission_Rate_by_OPE_ID', 'admission_rate_by_ope_id'],
+    'consumer_admission_rate': ['Consumer_Admission_Rate', 'consumer_admission_rate'],
+    'admission_score': ['admission_score', 'Admission_Score']
+}
+
 def transform_dim_admission(raw_data):
     """Transform raw data into Dim_Admission table"""
     logging.info("Transforming Dim_Admission data")
     
-    admission_column_mappings = {
-        'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        'admission_rate_overall': ['Admission_Rate_Overall', 'admission_rate_overall', 'overall_admission_rate'],
-        'admission_rate_by_ope_id': ['Admission_Rate_by_OPE_ID', 'admission_rate_by_ope_id'],
-        'consumer_admission_rate': ['Consumer_Admission_Rate', 'consumer_admission_rate'],
-        'admission_score': ['admission_score', 'Admission_Score']
-    }
-    
-    df_admission = safe_extract_columns(raw_data, admission_column_mappings)
+    df_admission = split_star_schema(raw_data, {'dim_admission': DIM_ADMISSION_COLUMNS})['dim_admission']
     
     return df_admission
 
+DIM_TEST_SCORES_COLUMNS = {
+    'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    # ACT midpoint scores
+    'act_midpoint_math': ['ACT_midpoint_math', 'act_midpoint_math'],
+    'act_midpoint_english': ['ACT_midpoint_english', 'act_midpoint_english'],
+    'act_midpoint_writing': ['ACT_midpoint_writing', 'act_midpoint_writing'],
+    'act_midpoint_cumulative': ['ACT_midpoint_cumulative', 'act_midpoint_cumulative'],
+    
+    # ACT percentile scores
+    'act_25th_percentile_math': ['ACT_25th_percentile_math', 'act_25th_percentile_math'],
+    'act_25th_percentile_english': ['ACT_25th_percentile_english', 'act_25th_percentile_english'],
+    'act_25th_percentile_writing': ['ACT_25th_percentile_writing', 'act_25th_percentile_writing'],
+    
+    'act_50th_percentile_math': ['ACT_50th_percentile_math', 'act_50th_percentile_math'],
+    'act_50th_percentile_english': ['ACT_50th_percentile_english', 'act_50th_percentile_english'],
+    
+    'act_75th_percentile_math': ['ACT_75th_percentile_math', 'act_75th_percentile_math'],
+    'act_75th_percentile_writing': ['ACT_75th_percentile_writing', 'act_75th_percentile_writing'],
+    
+    # SAT midpoint scores
+    'sat_midpoint_math': ['SAT_midpoint_math', 'sat_midpoint_math'],
+    'sat_midpoint_writing': ['SAT_midpoint_writing', 'sat_midpoint_writing'],
+    'sat_midpoint_critical_reading': ['SAT_midpoint_critical_reading', 'sat_midpoint_critical_reading'],
+    
+    # SAT percentile scores
+    'sat_25th_percentile_math': ['SAT_25th_percentile_math', 'sat_25th_percentile_math'],
+    'sat_25th_percentile_writing': ['SAT_25th_percentile_writing', 'sat_25th_percentile_writing'],
+    'sat_25th_percentile_critical_reading': ['SAT_25th_percentile_critical_reading', 'sat_25th_percentile_critical_reading'],
+    
+    'sat_50th_percentile_math': ['SAT_50th_percentile_math', 'sat_50th_percentile_math'],
+    'sat_75th_percentile_math': ['SAT_75th_percentile_math', 'sat_75th_percentile_math'],
+    'sat_75th_percentile_writing': ['SAT_75th_percentile_writing', 'sat_75th_percentile_writing'],
+    
+    # Overall scores
+    'act_score': ['ACT_Score', 'act_score'],
+    'sat_score': ['SAT_Score', 'sat_score']
+}
+
 def transform_dim_test_scores(raw_data):
     """Transform raw data into Dim_TestScores table"""
     logging.info("Transforming Dim_TestScores data")
     
-    test_score_column_mappings = {
-        'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        # ACT midpoint scores
-        'act_midpoint_math': ['ACT_midpoint_math', 'act_midpoint_math'],
-        'act_midpoint_english': ['ACT_midpoint_english', 'act_midpoint_english'],
-        'act_midpoint_writing': ['ACT_midpoint_writing', 'act_midpoint_writing'],
-        'act_midpoint_cumulative': ['ACT_midpoint_cumulative', 'act_midpoint_cumulative'],
-        
-        # ACT percentile scores
-        'act_25th_percentile_math': ['ACT_25th_percentile_math', 'act_25th_percentile_math'],
-        'act_25th_percentile_english': ['ACT_25th_percentile_english', 'act_25th_percentile_english'],
-        'act_25th_percentile_writing': ['ACT_25th_percentile_writing', 'act_25th_percentile_writing'],
-        
-        'act_50th_percentile_math': ['ACT_50th_percentile_math', 'act_50th_percentile_math'],
-        'act_50th_percentile_english': ['ACT_50th_percentile_english', 'act_50th_percentile_english'],
-        
-        'act_75th_percentile_math': ['ACT_75th_percentile_math', 'act_75th_percentile_math'],
-        'act_75th_percentile_writing': ['ACT_75th_percentile_writing', 'act_75th_percentile_writing'],
-        
-        # SAT midpoint scores
-        'sat_midpoint_math': ['SAT_midpoint_math', 'sat_midpoint_math'],
-        'sat_midpoint_writing': ['SAT_midpoint_writing', 'sat_midpoint_writing'],
-        'sat_midpoint_critical_reading': ['SAT_midpoint_critical_reading', 'sat_midpoint_critical_reading'],
-        
-        # SAT percentile scores
-        'sat_25th_percentile_math': ['SAT_25th_percentile_math', 'sat_25th_percentile_math'],
-        'sat_25th_percentile_writing': ['SAT_25th_percentile_writing', 'sat_25th_percentile_writing'],
-        'sat_25th_percentile_critical_reading': ['SAT_25th_percentile_critical_reading', 'sat_25th_percentile_critical_reading'],
-        
-        'sat_50th_percentile_math': ['SAT_50th_percentile_math', 'sat_50th_percentile_math'],
-        'sat_75th_percentile_math': ['SAT_75th_percentile_math', 'sat_75th_percentile_math'],
-        'sat_75th_percentile_writing': ['SAT_75th_percentile_writing', 'sat_75th_percentile_writing'],
-        
-        # Overall scores
-        'act_score': ['ACT_Score', 'act_score'],
-        'sat_score': ['SAT_Score', 'sat_score']
-    }
-    
-    df_test_scores = safe_extract_columns(raw_data, test_score_column_mappings)
+    df_test_scores = split_star_schema(raw_data, {'dim_test_scores': DIM_TEST_SCORES_COLUMNS})['dim_test_scores']
     
     return df_test_scores
 
+DIM_TRANSFER_RATE_COLUMNS = {
+    'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    'transfer_rate_4yr_full_time': ['Transfer_Rate_4yr_full_time', 'transfer_rate_4yr_full_time'],
+    'transfer_rate_4yr_full_time_pooled': ['Transfer_Rate_4yr_full_time_pooled', 'transfer_rate_4yr_full_time_pooled'],
+    'transfer_rate_cohort_4yr_full_time': ['Transfer_Rate_cohort_4yr_full_time', 'transfer_rate_cohort_4yr_full_time'],
+    'transfer_rate_less_than_4yr_full_time': ['Transfer_Rate_less_than_4yr_full_time', 'transfer_rate_less_than_4yr_full_time'],
+    'transfer_rate_less_than_4yr_full_time_pooled': ['Transfer_Rate_less_than_4yr_full_time_pooled', 'transfer_rate_less_than_4yr_full_time_pooled']
+}
+
 def transform_dim_transfer_rate(raw_data):
     """Transform raw data into Dim_TransferRate table"""
     logging.info("Transforming Dim_TransferRate data")
     
-    transfer_rate_column_mappings = {
-        'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        'transfer_rate_4yr_full_time': ['Transfer_Rate_4yr_full_time', 'transfer_rate_4yr_full_time'],
-        'transfer_rate_4yr_full_time_pooled': ['Transfer_Rate_4yr_full_time_pooled', 'transfer_rate_4yr_full_time_pooled'],
-        'transfer_rate_cohort_4yr_full_time': ['Transfer_Rate_cohort_4yr_full_time', 'transfer_rate_cohort_4yr_full_time'],
-        'transfer_rate_less_than_4yr_full_time': ['Transfer_Rate_less_than_4yr_full_time', 'transfer_rate_less_than_4yr_full_time'],
-        'transfer_rate_less_than_4yr_full_time_pooled': ['Transfer_Rate_less_than_4yr_full_time_pooled', 'transfer_rate_less_than_4yr_full_time_pooled']
-    }
-    
-    df_transfer_rate = safe_extract_columns(raw_data, transfer_rate_column_mappings)
+    df_transfer_rate = split_star_schema(raw_data, {'dim_transfer_rate': DIM_TRANSFER_RATE_COLUMNS})['dim_transfer_rate']
     
     return df_transfer_rate
 
+FACT_COLLEGE_METRICS_COLUMNS = {
+    'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
+    'in_state_tuition': ['In_State_Tuition', 'in_state_tuition'],
+    'out_of_state_tuition': ['Out_of_State_Tuition', 'out_of_state_tuition'],
+    'loan_principal': ['Loan_Principal', 'loan_principal'],
+    'pell_grant_rate': ['Pell_Grant_Rate', 'pell_grant_rate'],
+    'federal_loan_rate': ['Federal_Loan_Rate', 'federal_loan_rate'],
+    'completion_rate': ['Completion_Rate', 'completion_rate'],
+    'completion_score': ['Completion_Score', 'completion_score'],
+    'size_score': ['Size_Score', 'size_score'],
+    'in_state_tuition_score': ['In_State_Tuition_Score', 'in_state_tuition_score'],
+    'financial_aid_score': ['Financial_Aid_Score', 'financial_aid_score'],
+    'ranking_score': ['Ranking_Score', 'ranking_score'],
+    'rank': ['Rank', 'rank'],
+    'state_rank': ['State_Rank', 'state_rank'],
+    'type_rank': ['Type_Rank', 'type_rank']
+}
+
 def transform_fact_college_metrics(raw_data):
     """Transform raw data into Fact_CollegeMetrics table"""
     logging.info("Transforming Fact_CollegeMetrics data")
     
-    metrics_column_mappings = {
-        'school_id': ['id', 'school_id', 'School_Id', 'School_ID'],
-        'in_state_tuition': ['In_State_Tuition', 'in_state_tuition'],
-        'out_of_state_tuition': ['Out_of_State_Tuition', 'out_of_state_tuition'],
-        'loan_principal': ['Loan_Principal', 'loan_principal'],
-        'pell_grant_rate': ['Pell_Grant_Rate', 'pell_grant_rate'],
-        'federal_loan_rate': ['Federal_Loan_Rate', 'federal_loan_rate'],
-        'completion_rate': ['Completion_Rate', 'completion_rate'],
-        'completion_score': ['Completion_Score', 'completion_score'],
-        'size_score': ['Size_Score', 'size_score'],
-        'in_state_tuition_score': ['In_State_Tuition_Score', 'in_state_tuition_score'],
-        'financial_aid_score': ['Financial_Aid_Score', 'financial_aid_score'],
-        'ranking_score': ['Ranking_Score', 'ranking_score'],
-        'rank': ['Rank', 'rank']
-    }
-    
-    df_college_metrics = safe_extract_columns(raw_data, metrics_column_mappings)
+    df_college_metrics = split_star_schema(raw_data, {'fact_college_metrics': FACT_COLLEGE_METRICS_COLUMNS})['fact_college_metrics']
     
     return df_college_metrics
 
+# Column mappings of every star-schema table, keyed like transform_schools_data's output
+STAR_SCHEMA_COLUMNS = {
+    'dim_school': DIM_SCHOOL_COLUMNS,
+    'dim_demographics': DIM_DEMOGRAPHICS_COLUMNS,
+    'dim_admission': DIM_ADMISSION_COLUMNS,
+    'dim_test_scores': DIM_TEST_SCORES_COLUMNS,
+    'dim_transfer_rate': DIM_TRANSFER_RATE_COLUMNS,
+    'fact_college_metrics': FACT_COLLEGE_METRICS_COLUMNS
+}
+
+# Star-schema columns holding text; missing ones become object None rather than float NaN
+STAR_SCHEMA_TEXT_COLUMNS = {'school_name', 'address', 'city', 'state', 'accreditor_code', 'type_of_school'}
+
+def projection_fields(extra_fields=()):
+    """
+    Build the API ``fields`` projection from the columns the pipeline uses
+
+    Every field process_data reads is always requested, plus the program
+    fields Fact_Programs is built from. Fields behind the act_scores,
+    sat_scores and transfer_rate subtrees are only requested when a
+    star-schema mapping or the ranking reads the column built from them.
+
+    Args:
+        extra_fields (iterable): Additional API field paths to request
+
+    Returns:
+        list: Sorted API field paths
+    """
+    used_columns = set(RANKING_INPUT_COLUMNS)
+    for column_mappings in STAR_SCHEMA_COLUMNS.values():
+        for possible_cols in column_mappings.values():
+            used_columns.update(possible_cols)
+    
+    fields = set(PROCESS_DATA_FIELDS.values())
+    fields.update(path for col, path in NESTED_SCORE_FIELDS.items() if col in used_columns)
+    fields.update(f'latest.programs.cip_4_digit.{path}' for path in FACT_PROGRAMS_FIELDS.values())
+    fields.update(extra_fields)
+    return sorted(fields)
+
+def chunk_records(pages, chunk_size):
+    """
+    Regroup per-page record lists into chunks of roughly ``chunk_size`` schools
+
+    Args:
+        pages (iterable): Lists of school records, e.g. from extract.iter_pages
+        chunk_size (int): Target number of schools per chunk
+
+    Yields:
+        list: School records
+    """
+    chunk = []
+    for records in pages:
+        chunk.extend(records)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _typed_program_columns(records):
+    # FACT_PROGRAMS_FIELDS columns read by attribute from decode.SchoolRecords, one row per program
+    columns = {col: [] for col in ['school_id', *FACT_PROGRAMS_FIELDS]}
+    for result in records:
+        latest = result.latest
+        programs = latest.programs.cip_4_digit if latest is not None and latest.programs is not None else None
+        for program in programs or []:
+            credential, counts, earnings, debt = program.credential, program.counts, program.earnings, program.debt
+            four_yr = earnings.four_yr if earnings is not None else None
+            eval_inst = debt.staff_grad_plus if debt is not None else None
+            eval_inst = eval_inst.all if eval_inst is not None else None
+            eval_inst = eval_inst.eval_inst if eval_inst is not None else None
+            columns['school_id'].append(result.id)
+            columns['cip_code'].append(program.code)
+            columns['cip_title'].append(program.title)
+            columns['credential_level'].append(credential.level if credential is not None else None)
+            columns['credential_title'].append(credential.title if credential is not None else None)
+            columns['ipeds_awards1'].append(counts.ipeds_awards1 if counts is not None else None)
+            columns['ipeds_awards2'].append(counts.ipeds_awards2 if counts is not None else None)
+            columns['median_earnings_4yr'].append(four_yr.overall_median_earnings if four_yr is not None else None)
+            columns['median_debt'].append(eval_inst.median if eval_inst is not None else None)
+    # Object columns, like the Series.str.get path, so both convert the same way
+    return {col: values if col == 'school_id' else np.array(values, dtype=object) for col, values in columns.items()}
+
+def _program_lists(records):
+    # One entry per school: its id and its cip_4_digit list (a reference, not a copy)
+    school_ids, programs = [], []
+    for result in records:
+        school_ids.append(result.get('id'))
+        programs.append(((result.get('latest') or {}).get('programs') or {}).get('cip_4_digit') or [])
+    return school_ids, programs
+
+def iter_fact_programs(records, chunk_size=1000):
+    """
+    Build Fact_Programs (one row per school and field of study) chunk by chunk
+    
+    The cip_4_digit arrays of ``chunk_size`` schools are exploded into one row
+    per program and each metric is pulled out column-wise with ``Series.str.get``,
+    so no Python loop runs per program and only one chunk is exploded at a time.
+    Typed records from decode.decode_page are read by attribute instead.
+    
+    Args:
+        records (iterable): School records as returned by extract.request_data
+        chunk_size (int): Number of schools exploded at a time
+    
+    Yields:
+        pd.DataFrame: Fact_Programs rows for one chunk of schools
+    """
+    # One single-record page per school, so lists and generators alike are cut into chunk_size schools
+    for chunk in chunk_records(([record] for record in records), chunk_size):
+        # Pages decoded untyped, or replayed from the journal, can sit next to typed ones
+        typed = [record for record in chunk if decode.is_typed(record)]
+        frames = [pd.DataFrame(_typed_program_columns(typed))] if typed else []
+        if len(typed) < len(chunk):
+            school_ids, programs = _program_lists([record for record in chunk if not decode.is_typed(record)])
+            exploded = pd.DataFrame({'school_id': school_ids, 'program': programs}).explode('program', ignore_index=True)
+            exploded = exploded[exploded['program'].notna()]
+            
+            columns = {'school_id': exploded['school_id'].to_numpy()}
+            for col, path in FACT_PROGRAMS_FIELDS.items():
+                values = exploded['program']
+                for part in path.split('.'):
+                    values = values.str.get(part)
+                columns[col] = values.to_numpy()
+            frames.append(pd.DataFrame(columns))
+        
+        df_programs = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        for col in FACT_PROGRAMS_NUMERIC_COLUMNS:
+            df_programs[col] = pd.to_numeric(df_programs[col], errors='coerce')
+        
+        # Every Fact_Programs key column must be present; the level stays integral
+        df_programs = df_programs.dropna(subset=FACT_PROGRAMS_KEY)
+        yield df_programs.astype({'credential_level': 'int64'})
+
+def transform_fact_programs(records, chunk_size=1000):
+    """
+    Transform raw school records into the Fact_Programs table
+    
+    Args:
+        records (iterable): School records as returned by extract.request_data
+        chunk_size (int): Number of schools exploded at a time
+    
+    Returns:
+        pd.DataFrame: One row per school, CIP code and credential level
+    """
+    logging.info("Transforming Fact_Programs data")
+    
+    chunks = list(iter_fact_programs(records, chunk_size))
+    if not chunks:
+        return pd.DataFrame(columns=['school_id', *FACT_PROGRAMS_FIELDS])
+    
+    df_programs = pd.concat(chunks, ignore_index=True)
+    return df_programs.drop_duplicates(subset=FACT_PROGRAMS_KEY)
+
+def stream_schools_data(pages, chunk_size=1000):
+    """
+    Streaming counterpart of process_data -> rank -> clean -> transform_schools_data
+
+    Each chunk of records is flattened, cleaned and split into the dimension
+    tables that do not depend on the ranking, so peak memory follows one chunk.
+    Ranking needs the global min/max of its inputs, so only the school_id,
+    ranking inputs and fact/admission source columns of each chunk are kept and
+    Fact_CollegeMetrics and Dim_Admission are built in a final pass over them.
+
+    Unlike the batch path, ranking runs on cleaned, de-duplicated rows, and no
+    CSV copies are written.
+
+    Args:
+        pages (iterable): Lists of school records, e.g. from extract.iter_pages
+        chunk_size (int): Number of schools flattened at a time
+
+    Yields:
+        dict: Tables keyed like transform_schools_data's output; one dict with the
+        chunk's dim_school, dim_demographics, dim_test_scores, dim_transfer_rate
+        and fact_programs rows per chunk, then a final dict with
+        fact_college_metrics and dim_admission
+    """
+    ranked_tables = {
+        'dim_admission': DIM_ADMISSION_COLUMNS,
+        'fact_college_metrics': FACT_COLLEGE_METRICS_COLUMNS
+    }
+    final_pass_columns = set(RANKING_INPUT_COLUMNS)
+    for column_mappings in ranked_tables.values():
+        for possible_cols in column_mappings.values():
+            final_pass_columns.update(possible_cols)
+    
+    seen_ids = set()
+    final_pass_parts = []
+    for records in chunk_records(pages, chunk_size):
+        cleaned = clean_college_data(process_data(records))
+        if cleaned.empty:
+            continue
+        df_programs = pd.concat(iter_fact_programs(records, chunk_size), ignore_index=True)
+        
+        # clean_college_data only de-duplicates within the chunk
+        cleaned = cleaned[~cleaned['school_id'].isin(seen_ids)]
+        seen_ids.update(cleaned['school_id'])
+        
+        final_pass_parts.append(cleaned[[col for col in cleaned.columns if col in final_pass_columns or col == 'school_id']])
+        yield {
+            'dim_school': transform_dim_school(cleaned),
+            'dim_demographics': transform_dim_demographics(cleaned),
+            'dim_test_scores': transform_dim_test_scores(cleaned),
+            'dim_transfer_rate': transform_dim_transfer_rate(cleaned),
+            'fact_programs': df_programs[df_programs['school_id'].isin(cleaned['school_id'])].drop_duplicates(subset=FACT_PROGRAMS_KEY)
+        }
+    
+    if not final_pass_parts:
+        return
+    
+    logging.info(f"Ranking {len(seen_ids)} schools in the final pass")
+    ranked = rank_colleges_advanced(pd.concat(final_pass_parts, ignore_index=True))
+    yield {
+        'dim_admission': transform_dim_admission(ranked),
+        'fact_college_metrics': transform_fact_college_metrics(ranked)
+    }
+
 def save_to_csv(dataframe, filename, directory='output'):
     import os
     import pandas as pd
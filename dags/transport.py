@@ -0,0 +1,290 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_REQUEST_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX
+)
+
+# Status codes worth another attempt; anything else is returned to the caller
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Bytes read from a response body at a time, between deadline checks
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces requests against the API quota.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    The bucket follows the API's ``X-RateLimit-*`` response headers, so the
+    pace tightens as the remaining quota runs low and pauses on ``429``.
+    """
+
+    def __init__(self, rate, capacity):
+        if rate <= 0:
+            raise ValueError(f"Request rate must be positive, got {rate}/s (check REQUEST_QUOTA_PER_HOUR)")
+        if capacity < 1:
+            raise ValueError(f"Bucket capacity must be at least 1, got {capacity} (check REQUEST_BURST)")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for ``seconds`` (e.g. from a Retry-After header)"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """
+        Adjust the bucket to the quota reported by the server
+
+        :param headers: Response headers carrying X-RateLimit-Limit/Remaining
+        """
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        with self.lock:
+            self._refill(time.monotonic())
+            if limit and limit.isdigit() and int(limit) > 0:
+                # api.data.gov quotas are per rolling hour
+                self.rate = int(limit) / 3600
+            if remaining and remaining.isdigit():
+                self.tokens = min(self.tokens, int(remaining))
+
+
+class LatencyHistogram:
+    """
+    Thread-safe histogram of request latencies.
+
+    Latencies are counted into fixed buckets (upper bounds in seconds) so the
+    distribution can be logged cheaply at the end of a run.
+    """
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf'))
+
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def summary(self):
+        """
+        Summarise the recorded latencies
+
+        :return: Dictionary with count, percentiles and per-bucket counts
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+            counts = list(self.counts)
+        if not samples:
+            return {'count': 0}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3)
+
+        return {
+            'count': len(samples),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': round(samples[-1], 3),
+            'buckets': {
+                f"<={bound}s" if bound != float('inf') else f">{self.BUCKETS[-2]}s": count
+                for bound, count in zip(self.BUCKETS, counts)
+            }
+        }
+
+    def log(self, label="HTTP request latency"):
+        logging.info(f"{label}: {self.summary()}")
+
+
+def create_session(pool_size=HTTP_POOL_SIZE):
+    """
+    Create a keep-alive session with a connection pool sized for the workers
+
+    :param pool_size: Maximum number of pooled connections per host
+    :return: requests.Session negotiating compressed JSON responses
+    """
+    session = requests.Session()
+    # Retries are handled by Transport so they can honor Retry-After and the limiter
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date
+
+    :param value: Header value, possibly None
+    :return: Seconds to wait, or None if the header is absent or malformed
+    """
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None, base=HTTP_BACKOFF_BASE, cap=HTTP_BACKOFF_MAX):
+    """
+    Delay before the next attempt: the server's Retry-After if given,
+    otherwise exponential backoff with full jitter
+
+    :param attempt: Zero-based number of the attempt that just failed
+    :param retry_after: Seconds requested by the server, if any
+    :return: Seconds to wait
+    """
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Transport:
+    """
+    Reusable HTTP transport for the extractor.
+
+    Wraps a pooled session with connect/read timeouts, a total deadline per
+    attempt, retries with jittered exponential backoff that honor Retry-After,
+    optional rate limiting and a per-request latency histogram.
+    """
+
+    def __init__(self, session=None, limiter=None, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 max_retries=HTTP_MAX_RETRIES, request_timeout=HTTP_REQUEST_TIMEOUT):
+        self.session = session or create_session()
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.latency = LatencyHistogram()
+
+    def _fetch(self, url, headers):
+        # The read timeout only bounds the gap between two reads, so a body
+        # dripped a few bytes at a time never trips it. The body is streamed
+        # instead, taking whatever has arrived on each read, and the attempt is
+        # abandoned once the total deadline has passed
+        deadline = time.monotonic() + self.request_timeout
+        response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        chunks = []
+        try:
+            while True:
+                chunk = response.raw.read1(BODY_CHUNK_SIZE, decode_content=True)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise requests.exceptions.Timeout(
+                        f"Response body not received within {self.request_timeout:g}s"
+                    )
+        except urllib3.exceptions.HTTPError as e:
+            # What requests raises for the same failures when it reads the body itself
+            raise requests.exceptions.ConnectionError(e) from e
+        finally:
+            response.close()
+        response._content = b''.join(chunks)
+        return response
+
+    def get(self, url, headers=None, parse=None):
+        """
+        GET a URL, retrying connection errors, timeouts, 429 and 5xx responses
+
+        An attempt whose response, body included, takes longer than
+        ``request_timeout`` is abandoned and retried like a timeout.
+
+        :param url: URL to fetch
+        :param headers: Extra request headers
+        :param parse: Optional callable applied to a successful response; its
+            result is stored on ``response.parsed`` and a ValueError (e.g. a
+            truncated JSON body) is retried like a failed request
+        :return: The final response, or None if every attempt failed
+        """
+        for attempt in range(self.max_retries):
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            started = time.perf_counter()
+            try:
+                response = self._fetch(url, headers)
+            except requests.exceptions.RequestException as e:
+                self.latency.observe(time.perf_counter() - started)
+                delay = backoff_delay(attempt)
+                logging.error(f"Request failed: {e}. Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})...")
+                time.sleep(delay)
+                continue
+
+            self.latency.observe(time.perf_counter() - started)
+            if self.limiter is not None:
+                self.limiter.update_from_headers(response.headers)
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                if parse is None or not response.ok or response.status_code == 304:
+                    return response
+                try:
+                    response.parsed = parse(response)
+                    return response
+                except ValueError as e:
+                    delay = backoff_delay(attempt)
+                    logging.error(f"Malformed response body: {e}. Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})...")
+                    time.sleep(delay)
+                    continue
+
+            delay = backoff_delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+            logging.warning(f"Status code {response.status_code}. Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})...")
+            if response.status_code == 429 and self.limiter is not None:
+                # Quota exhausted: hold back every worker, not just this one
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+        logging.error(f"Giving up after {self.max_retries} attempts")
+        return None
+
+    def close(self):
+        self.session.close()
@@ -5,6 +5,7 @@ CREATE DATABASE college_scorecard;
 \c college_scorecard
 
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS Fact_Programs;
 DROP TABLE IF EXISTS Fact_CollegeMetrics;
 DROP TABLE IF EXISTS Dim_School;
 DROP TABLE IF EXISTS Dim_Demographics;
@@ -32,18 +33,18 @@ CREATE TABLE Dim_School (
 CREATE TABLE Dim_Demographics (
     school_id VARCHAR(50) PRIMARY KEY,
     student_size INTEGER,
-    demographics_men_pct DECIMAL(5,2),
-    demographics_women_pct DECIMAL(5,2),
+    demographics_men_pct DECIMAL(7,4),
+    demographics_women_pct DECIMAL(7,4),
     FOREIGN KEY (school_id) REFERENCES Dim_School(id)
 );
 
 -- Dim_Admission Table
 CREATE TABLE Dim_Admission (
     school_id VARCHAR(50) PRIMARY KEY,
-    admission_rate_overall DECIMAL(5,2),
-    admission_rate_by_ope_id DECIMAL(5,2),
-    consumer_admission_rate DECIMAL(5,2),
-    admission_score DECIMAL(5,2),
+    admission_rate_overall DECIMAL(7,4),
+    admission_rate_by_ope_id DECIMAL(7,4),
+    consumer_admission_rate DECIMAL(7,4),
+    admission_score DECIMAL(7,4),
     FOREIGN KEY (school_id) REFERENCES Dim_School(id)
 );
 
@@ -70,19 +71,19 @@ CREATE TABLE Dim_TestScores (
     sat_50th_percentile_math DECIMAL(5,2),
     sat_75th_percentile_math DECIMAL(5,2),
     sat_75th_percentile_writing DECIMAL(5,2),
-    act_score DECIMAL(5,2),
-    sat_score DECIMAL(5,2),
+    act_score DECIMAL(7,4),
+    sat_score DECIMAL(7,4),
     FOREIGN KEY (school_id) REFERENCES Dim_School(id)
 );
 
 -- Dim_TransferRate Table
 CREATE TABLE Dim_TransferRate (
     school_id VARCHAR(50) PRIMARY KEY,
-    transfer_rate_4yr_full_time DECIMAL(5,2),
-    transfer_rate_4yr_full_time_pooled DECIMAL(5,2),
-    transfer_rate_cohort_4yr_full_time DECIMAL(5,2),
-    transfer_rate_less_than_4yr_full_time DECIMAL(5,2),
-    transfer_rate_less_than_4yr_full_time_pooled DECIMAL(5,2),
+    transfer_rate_4yr_full_time DECIMAL(7,4),
+    transfer_rate_4yr_full_time_pooled DECIMAL(7,4),
+    transfer_rate_cohort_4yr_full_time DECIMAL(7,4),
+    transfer_rate_less_than_4yr_full_time DECIMAL(7,4),
+    transfer_rate_less_than_4yr_full_time_pooled DECIMAL(7,4),
     FOREIGN KEY (school_id) REFERENCES Dim_School(id)
 );
 
@@ -92,15 +93,32 @@ CREATE TABLE Fact_CollegeMetrics (
     in_state_tuition DECIMAL(10,2),
     out_of_state_tuition DECIMAL(10,2),
     loan_principal DECIMAL(10,2),
-    pell_grant_rate DECIMAL(5,2),
-    federal_loan_rate DECIMAL(5,2),
-    completion_rate DECIMAL(5,2),
-    completion_score DECIMAL(5,2),
-    size_score DECIMAL(5,2),
-    in_state_tuition_score DECIMAL(5,2),
-    financial_aid_score DECIMAL(5,2),
-    ranking_score DECIMAL(5,2),
+    pell_grant_rate DECIMAL(7,4),
+    federal_loan_rate DECIMAL(7,4),
+    completion_rate DECIMAL(7,4),
+    completion_score DECIMAL(7,4),
+    size_score DECIMAL(7,4),
+    in_state_tuition_score DECIMAL(7,4),
+    financial_aid_score DECIMAL(7,4),
+    ranking_score DECIMAL(7,4),
     rank INTEGER,
+    state_rank INTEGER,
+    type_rank INTEGER,
+    FOREIGN KEY (school_id) REFERENCES Dim_School(id)
+);
+
+-- Fact_Programs Table (one row per school, field of study and credential)
+CREATE TABLE Fact_Programs (
+    school_id VARCHAR(50),
+    cip_code VARCHAR(10),
+    cip_title VARCHAR(255),
+    credential_level INTEGER,
+    credential_title VARCHAR(100),
+    ipeds_awards1 INTEGER,
+    ipeds_awards2 INTEGER,
+    median_earnings_4yr DECIMAL(10,2),
+    median_debt DECIMAL(10,2),
+    PRIMARY KEY (school_id, cip_code, credential_level),
     FOREIGN KEY (school_id) REFERENCES Dim_School(id)
 );
 
@@ -129,7 +147,8 @@ GRANT SELECT, INSERT, UPDATE, DELETE ON
     Dim_Admission, 
     Dim_TestScores, 
     Dim_TransferRate, 
-    Fact_CollegeMetrics 
+    Fact_CollegeMetrics, 
+    Fact_Programs 
 TO college_user;
 
 -- Ensure future tables get the same privileges
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The pipeline modules import each other by bare name, as Airflow loads them from dags/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'dags'), os.path.join(ROOT, 'benchmarks')]
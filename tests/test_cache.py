@@ -0,0 +1,27 @@
+from cache import ResponseCache
+
+
+def test_access_times_carry_over_to_the_next_run(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10 ** 6)
+    # Equal key lengths keep the gzip files (which embed the name) the same size
+    for key in ('page_1', 'page_2', 'page_3'):
+        cache.put(key, b'x' * 1000)
+    assert cache.get('page_1') is not None
+    cache.flush()
+
+    # A later run only has room for three entries: the one read last run stays
+    cache = ResponseCache(str(tmp_path), max_bytes=3 * cache.index['page_1']['size'])
+    cache.put('page_4', b'x' * 1000)
+    assert sorted(cache.index) == ['page_1', 'page_3', 'page_4']
+
+
+def test_stale_lookups_are_not_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    cache.put('page', b'{}')
+    assert cache.get('page')['fresh'] is False
+    assert cache.get('missing') is None
+    assert cache.summary() == {'hits': 0, 'stale': 1, 'revalidated': 0, 'misses': 1, 'evicted': 0,
+                               'lookups': 2, 'hit_rate': 0.0}
+
+    cache.refresh('page')
+    assert cache.summary()['hit_rate'] == 0.5
@@ -0,0 +1,64 @@
+import json
+import pandas as pd
+import pytest
+import decode
+import extract
+import transform
+from synthetic import generate_schools, project
+
+msgspec = pytest.importorskip('msgspec')
+
+
+@pytest.fixture
+def body():
+    records = generate_schools(40, max_programs=3)
+    del records[3]['latest']['school']
+    return json.dumps({'metadata': {'total': 40}, 'results': records}).encode('utf-8')
+
+
+def test_typed_records_transform_like_dicts(body):
+    plain = decode.decode_page(body, fast=False)['results']
+    typed = decode.decode_page(body)['results']
+    assert all(decode.is_typed(record) for record in typed)
+
+    # The record missing its school subtree is dropped on both paths
+    expected = transform.process_data(plain)
+    assert len(expected) == 39
+    pd.testing.assert_frame_equal(transform.process_data(typed), expected)
+    pd.testing.assert_frame_equal(transform.transform_fact_programs(typed),
+                                  transform.transform_fact_programs(plain))
+    mixed = typed[:20] + plain[20:]
+    pd.testing.assert_frame_equal(transform.process_data(mixed), expected)
+    pd.testing.assert_frame_equal(transform.transform_fact_programs(mixed),
+                                  transform.transform_fact_programs(plain))
+
+
+def test_typed_records_encode_to_the_api_layout(body):
+    typed = decode.decode_page(body)['results']
+    replayed = json.loads(decode.encode(typed))
+    assert replayed[0]['latest']['programs']['cip_4_digit'][0]['earnings']['4_yr'] is not None
+    assert decode.get_path(typed[0], 'latest.school.state') == replayed[0]['latest']['school']['state']
+    pd.testing.assert_frame_equal(transform.process_data(replayed), transform.process_data(typed))
+
+
+def test_projected_pages_decode_typed_like_unflattened_dicts():
+    fields = transform.projection_fields()
+    records = [project(record, fields) for record in generate_schools(40, max_programs=3)]
+    body = json.dumps({'metadata': {'total': 40}, 'results': records}).encode('utf-8')
+
+    plain = [extract.unflatten_record(record, fields) for record in json.loads(body)['results']]
+    typed = decode.decode_page(body, fields=fields)['results']
+    assert all(decode.is_typed(record) for record in typed)
+    pd.testing.assert_frame_equal(transform.process_data(typed), transform.process_data(plain))
+    pd.testing.assert_frame_equal(transform.transform_fact_programs(typed),
+                                  transform.transform_fact_programs(plain))
+
+    # A field outside the declared schema keeps the page untyped, so the field reaches the records
+    extra = decode.decode_page(body, fields=[*fields, 'latest.school.zip'])['results']
+    assert not any(decode.is_typed(record) for record in extra)
+
+
+def test_page_off_the_schema_decodes_untyped():
+    body = json.dumps({'results': [{'id': 1, 'latest': {'school': {'name': 7}}}]}).encode('utf-8')
+    record = decode.decode_page(body)['results'][0]
+    assert record == {'id': 1, 'latest': {'school': {'name': 7}}}
@@ -0,0 +1,40 @@
+import pytest
+import extract
+
+
+@pytest.mark.parametrize('metadata, per_page, pages', [
+    ({'total': 0}, 50, 0),
+    ({'total': 1}, 50, 1),
+    ({'total': 100}, 50, 2),
+    ({'total': 101}, 50, 3),
+    ({'total': '101'}, 100, 2),
+    ({}, 50, 0),
+    ({'total': None}, 50, 0),
+    ({'total': 10}, 0, 0)
+])
+def test_plan_pages_covers_every_record(metadata, per_page, pages):
+    assert extract.plan_pages(metadata, per_page) == pages
+
+
+def test_unflatten_record_nests_projected_keys():
+    record = {
+        'id': 1,
+        'latest.school.name': 'A',
+        'latest.programs.cip_4_digit.code': ['0101', '0102'],
+        'latest.programs.cip_4_digit.credential.level': [3, 5]
+    }
+    fields = list(record) + ['latest.school.city', 'latest.student.size']
+    assert extract.unflatten_record(record, fields) == {
+        'id': 1,
+        'latest': {
+            'school': {'name': 'A', 'city': None},
+            'student': {'size': None},
+            'programs': {'cip_4_digit': [{'code': '0101', 'credential': {'level': 3}},
+                                         {'code': '0102', 'credential': {'level': 5}}]}
+        }
+    }
+
+
+def test_unflatten_record_gives_an_empty_program_list_when_none_were_sent():
+    fields = ['id', 'latest.programs.cip_4_digit.code']
+    assert extract.unflatten_record({'id': 1}, fields) == {'id': 1, 'latest': {'programs': {'cip_4_digit': []}}}
@@ -0,0 +1,64 @@
+import os
+import time
+import extract
+from artifacts import ArtifactStore
+from journal import ExtractionJournal
+
+
+def fake_api(monkeypatch, total, per_page):
+    # Serve fetch_page from memory; returns the list of requested pages
+    requested = []
+
+    def fetch_page(transport, url, pg, per_page, fields=(), cache=None):
+        requested.append(pg)
+        ids = range(pg * per_page, min(total, (pg + 1) * per_page))
+        return {'metadata': {'total': total, 'per_page': per_page}, 'results': [{'id': n} for n in ids]}
+    monkeypatch.setattr(extract, 'fetch_page', fetch_page)
+    return requested
+
+
+def test_completed_extraction_discards_its_journal(tmp_path, monkeypatch):
+    # JOURNAL_DIR is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    requested = fake_api(monkeypatch, total=250, per_page=100)
+
+    # An unfinished run left two pages behind; only the third is requested
+    journal = ExtractionJournal('run')
+    for pg in (0, 1):
+        journal.record_page(pg, {'metadata': {'total': 250, 'per_page': 100}, 'results': []})
+    records = extract.request_data("http://scorecard.test/schools?api_key=test", per_page=100, use_cache=False,
+                                   run_id='run')
+    assert len(records) == 50
+    assert requested == [2]
+    assert extract.last_run_report['resumed_pages'] == 2
+    assert not os.path.exists(journal.directory)
+
+    # The same run id now asks the API again
+    records = extract.request_data("http://scorecard.test/schools?api_key=test", per_page=100, use_cache=False,
+                                   run_id='run')
+    assert len(records) == 250
+    assert requested == [2, 0, 1, 2]
+
+
+def test_old_journals_expire(tmp_path):
+    old = ExtractionJournal('old', str(tmp_path))
+    old.record_page(0, {'results': [{'id': 1}]})
+    stale = time.time() - 30 * 86400
+    for name in os.listdir(old.directory):
+        os.utime(os.path.join(old.directory, name), (stale, stale))
+    os.utime(old.directory, (stale, stale))
+
+    ExtractionJournal('recent', str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['recent']
+
+
+def test_old_artifact_runs_expire(tmp_path):
+    old = ArtifactStore('old', str(tmp_path))
+    old.put_records('raw', [{'id': 1}])
+    stale = time.time() - 30 * 86400
+    for name in os.listdir(old.directory):
+        os.utime(os.path.join(old.directory, name), (stale, stale))
+    os.utime(old.directory, (stale, stale))
+
+    ArtifactStore('recent', str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['recent']
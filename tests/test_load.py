@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+import load
+import transform
+from synthetic import generate_schools
+
+
+@pytest.fixture
+def tables():
+    data = generate_schools(20, max_programs=2)
+    ranked = transform.clean_college_data(transform.process_and_rank_colleges(transform.process_data(data)))
+    return transform.transform_schools_data(ranked)
+
+
+def renamed(tables, suffix):
+    tables = dict(tables)
+    tables['dim_school'] = tables['dim_school'].assign(school_name=tables['dim_school']['school_name'] + suffix)
+    return tables
+
+
+def school_names(uri):
+    engine = create_engine(uri)
+    with engine.connect() as connection:
+        names = pd.read_sql(text('SELECT id, school_name FROM "Dim_School" ORDER BY id'), connection)
+    engine.dispose()
+    return names['school_name'].tolist()
+
+
+@pytest.mark.parametrize('rewrite_mode', ['replace', 'swap'])
+def test_incremental_after_a_full_rewrite_writes_every_row(tmp_path, tables, rewrite_mode):
+    uri = f"sqlite:///{tmp_path / 'load.db'}"
+    first, second = renamed(tables, ' C1'), renamed(tables, ' C2')
+
+    load.load_college_data(first, uri, mode='incremental')
+    load.load_college_data(second, uri, mode=rewrite_mode)
+    assert school_names(uri) == second['dim_school'].sort_values('id')['school_name'].tolist()
+    counts = load.load_college_data(first, uri, mode='incremental')
+
+    # The rewrite cleared the stored hashes, so no row may be taken as unchanged
+    assert counts['dim_school']['unchanged'] == 0
+    expected = first['dim_school'].sort_values('id')['school_name'].tolist()
+    assert school_names(uri) == expected
+
+
+def test_swap_replaces_tables_other_objects_depend_on(tmp_path, tables):
+    uri = f"sqlite:///{tmp_path / 'swap.db'}"
+    load.load_college_data(renamed(tables, ' C1'), uri, mode='swap')
+    engine = create_engine(uri)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE VIEW school_names AS SELECT id, school_name FROM "Dim_School"'))
+        connection.execute(text('CREATE TABLE favorites (school_id INTEGER REFERENCES "Dim_School" (id))'))
+        connection.execute(text('INSERT INTO favorites SELECT id FROM "Dim_School" LIMIT 3'))
+    engine.dispose()
+
+    second = renamed(tables, ' C2')
+    load.load_college_data(second, uri, mode='swap')
+    assert school_names(uri) == second['dim_school'].sort_values('id')['school_name'].tolist()
+    engine = create_engine(uri)
+    with engine.connect() as connection:
+        viewed = connection.execute(text('SELECT school_name FROM school_names ORDER BY id')).scalars().all()
+        favorites = connection.execute(text('SELECT COUNT(*) FROM favorites')).scalar()
+    engine.dispose()
+    assert viewed == school_names(uri)
+    assert favorites == 3
+
+
+def table_counts(uri):
+    engine = create_engine(uri)
+    with engine.connect() as connection:
+        counts = {table: connection.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+                  for table in load.TABLE_MAPPINGS.values()}
+    engine.dispose()
+    return counts
+
+
+@pytest.mark.parametrize('mode', ['replace', 'swap', 'incremental'])
+def test_streaming_load_matches_the_declared_schema(tmp_path, mode):
+    uri = f"sqlite:///{tmp_path / 'stream.db'}"
+    data = generate_schools(50, max_programs=2)
+    pages = [data[start:start + 10] for start in range(0, len(data), 10)]
+
+    # A first load to rewrite, or to upsert against
+    load.load_college_data_stream(transform.stream_schools_data(pages, chunk_size=15), uri, mode=mode)
+    load.load_college_data_stream(transform.stream_schools_data(pages[:3], chunk_size=15), uri, mode=mode)
+
+    counts = table_counts(uri)
+    assert counts['Dim_School'] == 30
+    assert counts['Fact_CollegeMetrics'] == 30
+    engine = create_engine(uri)
+    primary_key = load.inspect(engine).get_pk_constraint('Dim_School')['constrained_columns']
+    engine.dispose()
+    assert primary_key == ['id']
+
+
+def test_rates_and_scores_keep_four_decimals(tmp_path, tables):
+    uri = f"sqlite:///{tmp_path / 'load.db'}"
+    tables = dict(tables)
+    tables['fact_college_metrics'] = tables['fact_college_metrics'].assign(ranking_score=0.1608)
+    load.load_college_data(tables, uri, mode='replace')
+
+    engine = create_engine(uri)
+    columns = {column['name']: column['type'] for column in load.inspect(engine).get_columns('Fact_CollegeMetrics')}
+    with engine.connect() as connection:
+        scores = connection.execute(text('SELECT DISTINCT ranking_score FROM "Fact_CollegeMetrics"')).scalars().all()
+    engine.dispose()
+    assert columns['ranking_score'].scale == 4
+    assert [float(score) for score in scores] == [0.1608]
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ranking
+import transform
+from synthetic import generate_schools
+
+
+def only(metric):
+    return {name: 0 for name in ranking.METRICS} | {metric: 1}
+
+
+def test_what_if_ranks_puts_a_zero_score_last():
+    df = pd.DataFrame({'Completion_Rate': [0.0, 0.5, 1.0, 0.25]})
+    ranks = ranking.what_if_ranks(df, [only('completion')])
+    assert ranks.tolist() == [[4, 2, 1, 3]]
+    assert ranks.tolist() == [ranking.rank_colleges(df, only('completion'), segments={})['Rank'].tolist()]
+
+
+def test_what_if_ranks_match_rank_colleges():
+    df = transform.process_data(generate_schools(500, max_programs=1))
+    # Single-metric scenarios put schools at exactly 0 and 1; the sweep mixes metrics
+    weight_sets = [only('completion'), only('admission'), {'completion': 0}, {'completion': 0.6}]
+    weight_sets += [{'completion': weight} for weight in np.linspace(0, 1, 8)]
+    ranks = ranking.what_if_ranks(df, weight_sets)
+    for row, weights in zip(ranks, weight_sets):
+        expected = ranking.rank_colleges(df, weights, segments={})['Rank'].to_numpy()
+        np.testing.assert_array_equal(row, expected)
+
+
+def schools(ids, rng):
+    # Every metric column, values strictly inside the [0, 1] bounds the sentinel rows set
+    columns = {spec['columns'][0]: rng.uniform(0.05, 0.95, len(ids)) for spec in ranking.METRICS.values()}
+    return pd.DataFrame({'Id': ids, **columns,
+                         'State': rng.choice(['NY', 'CA', 'TX'], len(ids)),
+                         'type_of_school': rng.choice(['Public', 'Private'], len(ids))})
+
+
+def assert_same_ranking(ranked, expected):
+    for column in ['Rank', 'State_Rank', 'Type_Rank']:
+        np.testing.assert_array_equal(ranked[column].to_numpy(), expected[column].to_numpy())
+    np.testing.assert_allclose(ranked['ranking_score'], expected['ranking_score'])
+
+
+def test_ranking_state_updates_match_a_fresh_ranking(tmp_path, monkeypatch):
+    monkeypatch.setattr(transform, 'RANKING_STATE_PATH', '')
+    rng = np.random.default_rng(7)
+    path = str(tmp_path / 'ranking_state.npz')
+    df = schools(np.arange(300), rng)
+    sentinels = df['Id'] < 2
+    metrics = [spec['columns'][0] for spec in ranking.METRICS.values()]
+    df.loc[sentinels, metrics] = [[0.0] * len(metrics), [1.0] * len(metrics)]
+    next_id = 300
+
+    renormalized = []
+    for step in range(30):
+        state = ranking.RankingState.load(path)
+        ranked = state.rank(df)
+        renormalized.append(state.last_update['renormalized'])
+        state.save(path)
+        assert_same_ranking(ranked, transform.rank_colleges_advanced(df))
+
+        # Change some schools, drop some, add new ones, and shuffle the rows
+        changed = rng.choice(np.flatnonzero(~sentinels), 10, replace=False)
+        df.loc[changed, metrics] = rng.uniform(0.05, 0.95, (10, len(metrics)))
+        if step % 7 == 6:
+            # Widen a bound, which rescales every score
+            df.loc[changed[0], metrics[step % len(metrics)]] = 1.5
+        dropped = df.index[~sentinels][rng.choice((~sentinels).sum(), 5, replace=False)]
+        df = pd.concat([df.drop(index=dropped), schools(np.arange(next_id, next_id + 8), rng)])
+        df = df.sample(frac=1, random_state=step).reset_index(drop=True)
+        sentinels = df['Id'] < 2
+        next_id += 8
+
+    assert not all(renormalized[1:]) and any(renormalized[1:])
+
+
+def test_ranking_state_is_rebuilt_when_weights_change(tmp_path):
+    path = str(tmp_path / 'ranking_state.npz')
+    df = schools(np.arange(20), np.random.default_rng(1))
+    state = ranking.RankingState()
+    state.rank(df)
+    state.save(path)
+
+    assert len(ranking.RankingState.load(path).ids) == 20
+    reloaded = ranking.RankingState.load(path, weights={'completion': 0.9})
+    assert len(reloaded.ids) == 0
+    ranked = reloaded.rank(df)
+    assert_same_ranking(ranked, ranking.rank_colleges(df, {'completion': 0.9}))
+
+
+def test_ranking_state_does_not_unpickle(tmp_path):
+    path = tmp_path / 'ranking_state.npz'
+    pd.to_pickle(ranking.RankingState(), path)
+    assert len(ranking.RankingState.load(str(path)).ids) == 0
+
+
+def test_segment_ranks_match_groupby_rank():
+    rng = np.random.default_rng(3)
+    # Rounded scores give ties, which both sides break by row order
+    df = pd.DataFrame({'Completion_Rate': rng.integers(0, 20, 400) / 20,
+                       'State': rng.choice(['NY', 'CA', 'TX', None], 400),
+                       'type_of_school': rng.choice(['Public', 'Private'], 400)})
+    ranked = ranking.rank_colleges(df, only('completion'))
+    for segment, rank_column in ranking.SEGMENTS.items():
+        expected = ranked.groupby(segment)['ranking_score'].rank(method='first', ascending=False)
+        np.testing.assert_array_equal(ranked[rank_column].to_numpy(dtype='float64', na_value=np.nan),
+                                      expected.to_numpy())
+
+
+@pytest.mark.parametrize('k', [1, 5, 37, 400, 1000])
+def test_top_k_matches_nlargest(k):
+    rng = np.random.default_rng(k)
+    ranked = pd.DataFrame({'ranking_score': rng.integers(0, 30, 400) / 30}, index=rng.permutation(400))
+    top = ranking.top_k(ranked, k)
+    if k < len(ranked):
+        expected = ranked.nlargest(k, 'ranking_score')
+    else:
+        # nlargest falls back to an unstable sort of every row here
+        expected = ranked.sort_values('ranking_score', ascending=False, kind='stable')
+    assert top.index.tolist() == expected.index.tolist()
+
+
+def test_missing_metrics_score_at_the_median_and_rows_keep_their_order():
+    df = pd.DataFrame({'Completion_Rate': [0.0, 1.0, None, 0.5]}, index=[10, 11, 12, 13])
+    ranked = ranking.rank_colleges(df, only('completion'), segments={})
+    # The missing rate is scored at the median of the others (0.5), not 0
+    assert ranked['ranking_score'].tolist() == [0.0, 1.0, 0.5, 0.5]
+    assert ranked.index.tolist() == [10, 11, 12, 13]
+    assert ranked['Rank'].tolist() == [4, 1, 2, 3]
@@ -0,0 +1,80 @@
+import copy
+import extract
+import pandas as pd
+import pytest
+import transform
+from bench_process_data import process_data_rowwise
+from synthetic import generate_schools, project
+
+
+def test_column_plan_follows_edited_mappings():
+    df = pd.DataFrame({'id': [1, 2], 'school.name': ['A', 'B'], 'school.alias': ['a', 'b']})
+    mappings = {'dim_school': {'id': ['id'], 'school_name': ['school.name']}}
+    assert transform.split_star_schema(df, mappings)['dim_school']['school_name'].tolist() == ['A', 'B']
+
+    # Same table names, same input columns: only the candidates changed
+    mappings = {'dim_school': {'id': ['id'], 'school_name': ['school.alias']}}
+    assert transform.split_star_schema(df, mappings)['dim_school']['school_name'].tolist() == ['a', 'b']
+
+
+def test_projection_requests_every_field_the_pipeline_reads(monkeypatch):
+    fields = transform.projection_fields(extra_fields=['latest.school.zip'])
+    assert fields == sorted(set(fields))
+    assert set(transform.PROCESS_DATA_FIELDS.values()) <= set(fields)
+    assert 'latest.school.zip' in fields
+
+    # Score subtrees are only requested for columns a mapping reads
+    column = 'ACT_25th_percentile_cumulative'
+    path = transform.NESTED_SCORE_FIELDS[column]
+    assert path not in fields
+    mappings = dict(transform.STAR_SCHEMA_COLUMNS, dim_testscores={'act_25th_cumulative': [column]})
+    monkeypatch.setattr(transform, 'STAR_SCHEMA_COLUMNS', mappings)
+    assert path in transform.projection_fields()
+
+
+def test_clean_college_data_blanks_empty_text_and_needs_an_id():
+    df = pd.DataFrame({'Id': [1, 2, 2, None], 'Address': ['1 Main St', '', 'x', 'y'],
+                       'City': ['', 'Albany', 'x', 'y']})
+    cleaned = transform.clean_college_data(df)
+    assert cleaned['school_id'].tolist() == [1, 2]
+    assert cleaned['Address'].tolist() == ['1 Main St', None]
+    assert cleaned['City'].tolist() == [None, 'Albany']
+
+    with pytest.raises(ValueError, match='Id'):
+        transform.clean_college_data(df.drop(columns='Id'))
+
+
+def test_process_data_matches_the_row_wise_flattening():
+    records = copy.deepcopy(generate_schools(60, max_programs=2))
+    # Records the row-wise version dropped (a required subtree is missing), and
+    # ones it kept with optional subtrees missing
+    del records[0]['latest']['cost']
+    del records[1]['latest']['school']['degrees_awarded']
+    del records[2]['latest']['admissions']['act_scores']
+    del records[3]['latest']['admissions']['sat_scores']
+    del records[4]['latest']['completion']['transfer_rate']
+    del records[5]['latest']['programs']
+    records[6]['latest']['programs']['cip_4_digit'] = []
+    records[7]['latest']['aid'] = {}
+
+    expected = process_data_rowwise(records)
+    # Numeric columns are float64 even where the row-wise frame inferred int64
+    pd.testing.assert_frame_equal(transform.process_data(records, compact=False), expected, check_dtype=False)
+
+
+def test_projected_records_flatten_like_whole_records():
+    records = generate_schools(30, max_programs=3)
+    fields = transform.projection_fields()
+    projected = [extract.unflatten_record(project(record, fields), fields) for record in records]
+    flattened = transform.process_data(projected)
+    pd.testing.assert_frame_equal(flattened, transform.process_data(records)[flattened.columns])
+    pd.testing.assert_frame_equal(transform.transform_fact_programs(projected),
+                                  transform.transform_fact_programs(records))
+
+
+def test_column_plan_cache_is_bounded():
+    mappings = {'dim_school': {'id': ['id']}}
+    for n in range(100):
+        transform.column_plan(['id', f'extra_{n}'], mappings)
+    info = transform._resolve_plan.cache_info()
+    assert info.currsize <= info.maxsize
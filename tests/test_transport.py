@@ -0,0 +1,102 @@
+import http.server
+import json
+import threading
+import time
+import pytest
+import transport
+from transport import TokenBucket, Transport, create_session
+
+
+class DripHandler(http.server.BaseHTTPRequestHandler):
+    # Sends one page, in 50 pieces 0.1s apart while ``slow`` is set
+    slow = True
+    body = json.dumps({'metadata': {'total': 20}, 'results': [{'id': n} for n in range(20)]}).encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        pieces = 50 if self.slow else 1
+        size = -(-len(self.body) // pieces)
+        try:
+            for start in range(0, len(self.body), size):
+                self.wfile.write(self.body[start:start + size])
+                self.wfile.flush()
+                if self.slow:
+                    time.sleep(0.1)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def test_slow_body_is_abandoned_at_the_request_deadline():
+    # Every read beats the read timeout, but the body takes 5s
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DripHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/schools?page=0"
+    client = Transport(session=create_session(1), timeout=(1, 1), max_retries=2, request_timeout=0.5)
+    try:
+        started = time.monotonic()
+        assert client.get(url) is None
+        assert time.monotonic() - started < 4
+        assert client.latency.summary()['count'] == 2
+
+        DripHandler.slow = False
+        response = client.get(url, parse=lambda r: r.json())
+        assert len(response.parsed['results']) == 20
+    finally:
+        client.close()
+        server.shutdown()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Fake monotonic clock that time.sleep advances
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr(transport.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(transport.time, 'sleep', sleep)
+    return sleeps
+
+
+def test_burst_is_free_then_requests_are_paced(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock == []
+    bucket.acquire()
+    bucket.acquire()
+    assert clock == [0.5, 0.5]
+
+
+def test_pause_holds_back_the_next_request(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.pause(30)
+    bucket.acquire()
+    assert clock == [30]
+
+
+def test_headers_set_the_rate_and_cap_the_tokens(clock):
+    bucket = TokenBucket(rate=1, capacity=10)
+    bucket.update_from_headers({'X-RateLimit-Limit': '7200', 'X-RateLimit-Remaining': '0'})
+    assert bucket.rate == 2
+    bucket.acquire()
+    assert clock == [0.5]
+
+    # A zero or malformed limit keeps the current rate
+    bucket.update_from_headers({'X-RateLimit-Limit': '0', 'X-RateLimit-Remaining': 'n/a'})
+    assert bucket.rate == 2
+
+
+@pytest.mark.parametrize('rate, capacity', [(0, 5), (-1 / 3600, 5), (1, 0)])
+def test_invalid_quota_is_rejected(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=capacity)